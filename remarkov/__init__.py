@@ -9,6 +9,9 @@ def create_model(
     order: int = 1,
     tokenizer: Optional[Tokenizer] = None,
     before_insert: Optional[Callable[[str], str]] = None,
+    intern: bool = False,
+    seed: Optional[int] = None,
+    storage: Optional[str] = None,
 ) -> "Model":
     """
     Create a new model.
@@ -16,6 +19,10 @@ def create_model(
     You can define the `order` of the Markov chain i.e. how many words to use for successor lookup.
     By default, remarkov will tokenize the sentence by words and punctuation. If this is not desired, you are free to provide a custom tokenizer.
     Each token is transformed using the `before_insert` callback before a token is added to the chain.
+    Setting `intern` stores tokens as integer ids (see `remarkov.vocabulary`) which saves memory on large models.
+    `seed` initializes the random number generator of the model for reproducible text generation.
+    `storage` selects where transitions are kept, e.g. `sqlite:model.db` for a database file or `suffix` for a suffix array
+    over the corpus. See `remarkov.storage`.
     """
     from remarkov.model import Model
     from remarkov.tokenizer import default_tokenizer
@@ -27,23 +34,116 @@ def create_model(
         order=order,
         tokenizer=tokenizer,
         before_insert=before_insert,
+        intern=intern,
+        seed=seed,
+        storage=storage,
     )
 
 
-def load_model(path: str, version: int = DEFAULT_PERSISTANCE_VERSION) -> "Model":
+def load_model(
+    path: str,
+    version: int = DEFAULT_PERSISTANCE_VERSION,
+    intern: bool = False,
+    compression: Optional[str] = None,
+) -> "Model":
     """
     Loads a serialized model.
+
+    Compressed JSON files are decompressed while they are read. The codec is `compression` or derived from the
+    file extension, see `remarkov.compression`.
+    Version 3 models are memory-mapped instead of being read. They are always frozen and interned. They are
+    recognized by their header, so `version` does not have to be given for them.
+    If the model has a delta log (see `remarkov.delta`), its deltas are merged into the loaded model.
+    Paths like `sqlite:model.db` open a database created with the `storage` argument of `remarkov.create_model`.
+    Changes to such models are written back to the database.
+    """
+
+    from remarkov.delta import finish_compaction, replay_deltas
+    from remarkov.persistance import is_binary_model
+    from remarkov.storage import SQLITE_PREFIX
+
+    if path.startswith(SQLITE_PREFIX):
+        from remarkov.model import Model
+        from remarkov.storage import SqliteTransitions
+
+        transitions = SqliteTransitions(path[len(SQLITE_PREFIX) :])
+        model = Model(order=transitions.order)
+        model.transitions = transitions
+
+        return model
+
+    finish_compaction(path)
+
+    if 3 == version or is_binary_model(path):
+        from remarkov.persistance import V3Decoder
+
+        model = V3Decoder().load(path)
+
+    else:
+        from remarkov.compression import open_text
+        from remarkov.persistance import V1Decoder, V2Decoder
+
+        decoder = V2Decoder(intern=intern) if 2 == version else V1Decoder(intern=intern)
+
+        with open_text(path, "r", compression) as fin:
+            model = decoder.load(fin)
+
+    replay_deltas(model, path)
+
+    return model
+
+
+def compact_model(
+    path: str,
+    version: int = DEFAULT_PERSISTANCE_VERSION,
+    intern: bool = False,
+    compression: Optional[str] = None,
+) -> "Model":
+    """
+    Folds the delta log of the model at `path` into a new snapshot and removes the log. Returns the model.
+
+    The snapshot is written to a temporary file first. The delta log is retired before the snapshot replaces
+    the old one, so an interrupted compaction never replays a delta twice, see `remarkov.delta`. The new snapshot
+    keeps the compression of the old one. Version 3 snapshots stay in version 3. They never have a delta log
+    as their models are frozen.
     """
 
-    with open(path, "r") as fin:
-        return parse_model(fin.read(), version=version)
+    import os
+
+    from remarkov.compression import resolve_compression
+    from remarkov.delta import COMPACTING_SUFFIX, delta_log_path
+    from remarkov.persistance import is_binary_model
+
+    if is_binary_model(path):
+        version = 3
+
+    compression = resolve_compression(path, compression)
+    model = load_model(path, version=version, intern=intern, compression=compression)
 
+    temp_path = path + COMPACTING_SUFFIX
+    model.save(temp_path, version=version, compression=compression)
 
-def parse_model(raw: str, version: int = DEFAULT_PERSISTANCE_VERSION) -> "Model":
+    log_path = delta_log_path(path)
+    retired_path = log_path + COMPACTING_SUFFIX
+
+    if os.path.exists(log_path):
+        os.replace(log_path, retired_path)
+
+    os.replace(temp_path, path)
+
+    if os.path.exists(retired_path):
+        os.remove(retired_path)
+
+    return model
+
+
+def parse_model(
+    raw: str, version: int = DEFAULT_PERSISTANCE_VERSION, intern: bool = False
+) -> "Model":
     """
     Loads a model from a JSON string.
     """
 
     from remarkov.model import Model
 
-    return Model().from_json(raw, version=version)
+    return Model().from_json(raw, version=version, intern=intern)
@@ -1,12 +1,24 @@
 #!/usr/bin/python3
 
 import sys
+import time
 
 from typing import Optional, TextIO
 
-from remarkov.tokenizer import token_to_lowercase
+from remarkov.tokenizer import read_chunks, token_to_lowercase
+from remarkov.compression import COMPRESSIONS, NO_COMPRESSION
 from remarkov.model import DEFAULT_GENERATE_WORD_AMOUNT, Model
-from remarkov import __version__, create_model, load_model, parse_model
+from remarkov.profiling import Profiler
+from remarkov.error import IncompatibleOptions, MissingOption, PruningNotSupported
+from remarkov.storage import SQLITE_PREFIX, SqliteTransitions
+from remarkov.suffix import SUFFIX_STORAGE
+from remarkov import (
+    __version__,
+    compact_model,
+    create_model,
+    load_model,
+    parse_model,
+)
 
 
 def create_build_parser(subcommands):
@@ -32,12 +44,65 @@ def create_build_parser(subcommands):
         default=False,
         help="translate all text to lowercase increasing the probability of word linkage",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="amount of processes used for reading input files",
+    )
     parser.add_argument(
         "--compress",
         action="store_true",
         default=False,
         help="disable newlines in the generated representation",
     )
+    parser.add_argument(
+        "--prune-min-count",
+        type=int,
+        default=1,
+        help="remove transitions that were observed less often",
+    )
+    parser.add_argument(
+        "--prune-top-k",
+        type=int,
+        help="keep only this amount of most frequent successors per state",
+    )
+    parser.add_argument(
+        "--prune-min-state-total",
+        type=int,
+        default=1,
+        help="remove states that were observed less often",
+    )
+    parser.add_argument(
+        "--append",
+        type=str,
+        help="append the model to the delta log of this model file instead of printing it",
+    )
+    parser.add_argument(
+        "--storage",
+        type=str,
+        help="keep the transitions in 'memory', a 'suffix' array or a database like sqlite:model.db. "
+        "databases store the model instead of printing it",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        help="write the model to this file instead of printing it, compressed if it ends with .gz, .xz or .bz2",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=[NO_COMPRESSION, *COMPRESSIONS],
+        help="compress the output file with this codec instead of the one of its extension",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="print the time spent in each phase to stderr",
+    )
 
 
 def create_generate_parser(subcommands):
@@ -48,7 +113,7 @@ def create_generate_parser(subcommands):
         "-m",
         "--model",
         type=str,
-        help="path to the model file",
+        help="path to the model file or sqlite:<path> for a model database",
     )
     parser.add_argument(
         "--words",
@@ -56,6 +121,62 @@ def create_generate_parser(subcommands):
         default=DEFAULT_GENERATE_WORD_AMOUNT,
         help="amount of words to generate",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="print the time spent in each phase to stderr",
+    )
+
+
+def create_stats_parser(subcommands):
+    parser = subcommands.add_parser(
+        "stats", help="report the shape and memory usage of a markov chain"
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        type=str,
+        help="path to the model file",
+    )
+
+
+def create_compact_parser(subcommands):
+    parser = subcommands.add_parser(
+        "compact", help="merge the delta log of a model file into the model file"
+    )
+    parser.add_argument("model", type=str, help="path to the model file")
+
+
+def create_serve_parser(subcommands):
+    from remarkov.server import DEFAULT_HOST, DEFAULT_PORT
+
+    parser = subcommands.add_parser(
+        "serve", help="load models once and generate text over http"
+    )
+    parser.add_argument(
+        "-m",
+        "--model",
+        action="append",
+        required=True,
+        help="model file to serve as name=path. can be passed multiple times",
+    )
+    parser.add_argument(
+        "--host", type=str, default=DEFAULT_HOST, help="address to listen on"
+    )
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="port to listen on"
+    )
+    parser.add_argument(
+        "--unix-socket",
+        type=str,
+        help="listen on a unix socket instead of host and port",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="amount of threads used for generating text",
+    )
 
 
 def create_parser():
@@ -69,38 +190,177 @@ def create_parser():
 
     create_build_parser(subcommands)
     create_generate_parser(subcommands)
+    create_stats_parser(subcommands)
+    create_compact_parser(subcommands)
+    create_serve_parser(subcommands)
 
     return parser
 
 
-def add_text_from_file(remarkov: Model, file_name: str):
-    with open(file_name, "r") as fin:
-        remarkov.add_text(fin.read())
+def load_from_args(args, stream: TextIO, profiler: Optional[Profiler] = None) -> Model:
+    start = time.perf_counter()
+    model = load_model(args.model) if args.model else parse_model(stream.read())
+
+    if profiler is not None:
+        profiler.record("load", time.perf_counter() - start)
+        model.profiler = profiler
+
+    return model
 
 
-def run_build(args, stream: TextIO) -> str:
+def run_build(
+    args,
+    stream: TextIO,
+    output: Optional[TextIO] = None,
+    profiler: Optional[Profiler] = None,
+) -> str:
     from remarkov.tokenizer import create_ngram_tokenizer
 
     tokenizer = create_ngram_tokenizer(args.ngrams) if args.ngrams else None
     before_insert = token_to_lowercase if args.normalize else None
-    model = create_model(
-        order=args.order, tokenizer=tokenizer, before_insert=before_insert
+    prune = (
+        1 < args.prune_min_count
+        or args.prune_top_k is not None
+        or 1 < args.prune_min_state_total
     )
 
-    if args.files:
-        for file_name in args.files:
-            add_text_from_file(model, file_name)
+    # fail before spending the whole build on a model that cannot be pruned or written as requested.
+    if prune and SUFFIX_STORAGE == args.storage:
+        raise PruningNotSupported()
+
+    if args.storage and args.storage.startswith(SQLITE_PREFIX):
+        for option, value in [
+            ("--append", args.append),
+            ("--output", args.output),
+            ("--compression", args.compression),
+            ("--compress", args.compress),
+        ]:
+            if value:
+                raise IncompatibleOptions(f"--storage {args.storage}", option)
+
+    # only output files are compressed.
+    if args.compression and not args.output:
+        raise MissingOption("--compression", "--output")
+
+    if args.files and 1 < args.jobs:
+        from remarkov.parallel import build_parallel
+
+        start = time.perf_counter()
+        model = build_parallel(
+            args.files,
+            workers=args.jobs,
+            order=args.order,
+            tokenizer=tokenizer,
+            before_insert=before_insert,
+        )
+
+        # worker processes are not profiled. only their total time is known.
+        if profiler is not None:
+            profiler.record("build_parallel", time.perf_counter() - start)
+
+        model.profiler = profiler
+
+        if args.storage:
+            model = create_model(order=args.order, storage=args.storage).merge(model)
+
     else:
-        model.add_text(stream.read())
+        model = create_model(
+            order=args.order,
+            tokenizer=tokenizer,
+            before_insert=before_insert,
+            storage=args.storage,
+        )
+        model.profiler = profiler
+
+        if args.files:
+            for file_name in args.files:
+                model.add_file(file_name)
+        else:
+            model.add_stream(read_chunks(stream))
+
+    if prune:
+        report = model.prune(
+            min_count=args.prune_min_count,
+            top_k=args.prune_top_k,
+            min_state_total=args.prune_min_state_total,
+        )
+        # stdout contains the model. report to stderr instead.
+        print(f"pruning {report}", file=sys.stderr)
+
+    if isinstance(model.transitions, SqliteTransitions):
+        # the model is stored in the database already.
+        model.transitions.close()
+        return ""
+
+    if args.append:
+        model.append_delta(args.append)
+        return ""
+
+    if args.output:
+        model.save(args.output, compress=args.compress, compression=args.compression)
+        return ""
+
+    # write large models piece by piece instead of holding the whole document in memory.
+    if output is not None:
+        model.dump(output, compress=args.compress)
+        output.write("\n")
+        return ""
+
     return model.to_json(compress=args.compress)
 
 
-def run_generate(args, stream: TextIO) -> str:
-    model = load_model(args.model) if args.model else parse_model(stream.read())
-    return model.generate(args.words).text()
+def run_generate(
+    args,
+    stream: TextIO,
+    output: Optional[TextIO] = None,
+    profiler: Optional[Profiler] = None,
+) -> str:
+    model = load_from_args(args, stream, profiler)
+    result = model.generate(args.words)
+
+    # stream long texts instead of holding them in memory.
+    if output is not None:
+        result.write_to(output)
+        output.write("\n")
+        return ""
+
+    return result.text()
+
+
+def run_stats(args, stream: TextIO) -> str:
+    import json
+
+    model = load_from_args(args, stream)
+    return json.dumps(model.stats().to_dict(), indent=4)
+
 
+def run_compact(args) -> str:
+    compact_model(args.model)
+    return ""
+
+
+def run_serve(args) -> str:
+    from remarkov.server import serve
+
+    serve(
+        args.model,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        workers=args.workers,
+    )
+
+    return ""
+
+
+def run_command(
+    args=None, stream: Optional[TextIO] = None, output: Optional[TextIO] = None
+) -> str:
+    """
+    Runs a cli command and returns its output. Commands that support streaming write to `output`
+    instead if it is given and return an empty string.
+    """
 
-def run_command(args=None, stream: Optional[TextIO] = None) -> str:
     parser = create_parser()
     args = parser.parse_args(args)
 
@@ -108,17 +368,32 @@ def run_command(args=None, stream: Optional[TextIO] = None) -> str:
     if not stream:
         stream = sys.stdin
 
-    if args.cmd == "build":
-        return run_build(args, stream)
-    elif args.cmd == "generate":
-        return run_generate(args, stream)
-    else:
-        raise NotImplementedError()
+    profiler = Profiler() if getattr(args, "profile", False) else None
+
+    try:
+        if args.cmd == "build":
+            return run_build(args, stream, output, profiler)
+        elif args.cmd == "generate":
+            return run_generate(args, stream, output, profiler)
+        elif args.cmd == "stats":
+            return run_stats(args, stream)
+        elif args.cmd == "compact":
+            return run_compact(args)
+        elif args.cmd == "serve":
+            return run_serve(args)
+        else:
+            raise NotImplementedError()
+
+    finally:
+        if profiler is not None:
+            print(profiler.summary(), file=sys.stderr)
 
 
 def main():
     try:
-        output = run_command()
-        print(output)
+        output = run_command(output=sys.stdout)
+
+        if output:
+            print(output)
     except Exception as e:
         print(f"ERROR: {e}")
@@ -0,0 +1,76 @@
+"""
+Implements transparent compression of JSON model files.
+
+Model files are compressed with one of the stdlib codecs in `remarkov.compression.COMPRESSIONS`. The codec is
+selected by the `compression` argument of `remarkov.model.Model.save` and `remarkov.load_model`. If it is not
+given, it is derived from the file extension, e.g. `model.json.gz` is read and written with gzip. Use
+`remarkov.compression.NO_COMPRESSION` to write a plain file regardless of its extension.
+
+Compressed files are read and written as streams, so neither the compressed nor the decompressed document has
+to fit into memory at once. Version 3 files are memory-mapped and cannot be compressed.
+"""
+
+import os
+
+from typing import Optional, TextIO
+
+from remarkov.error import UnknownCompression
+
+NO_COMPRESSION = "none"
+COMPRESSIONS = ("gzip", "lzma", "bz2")
+"""Supported compression codecs."""
+EXTENSIONS = {".gz": "gzip", ".xz": "lzma", ".lzma": "lzma", ".bz2": "bz2"}
+"""Compression codecs by file extension."""
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """
+    Returns the compression codec that belongs to the extension of `path` or `None` for uncompressed files.
+    """
+
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def resolve_compression(path: str, compression: Optional[str]) -> Optional[str]:
+    """
+    Returns the codec for the file at `path`. `None` detects it from the extension.
+    """
+
+    if compression is None:
+        return detect_compression(path)
+
+    if NO_COMPRESSION == compression:
+        return None
+
+    if compression not in COMPRESSIONS:
+        raise UnknownCompression(compression)
+
+    return compression
+
+
+def open_text(path: str, mode: str, compression: Optional[str] = None) -> TextIO:
+    """
+    Opens the file at `path` in text `mode` ("r" or "w") and compresses or decompresses it on the fly.
+    See `remarkov.compression.resolve_compression` for `compression`.
+    """
+
+    assert mode in ("r", "w"), "Mode must be 'r' or 'w'."
+
+    codec = resolve_compression(path, compression)
+
+    if codec is None:
+        return open(path, mode)  # type: ignore
+
+    if "gzip" == codec:
+        import gzip
+
+        return gzip.open(path, mode + "t")  # type: ignore
+
+    if "lzma" == codec:
+        import lzma
+
+        return lzma.open(path, mode + "t")  # type: ignore
+
+    import bz2
+
+    return bz2.open(path, mode + "t")  # type: ignore
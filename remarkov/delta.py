@@ -0,0 +1,146 @@
+"""
+Implements append-only delta logs for updating large models incrementally.
+
+A delta log is stored next to a JSON snapshot at `<snapshot>.delta`. Each line is one compressed version 2
+document that contains the transitions and start states of a model built from new text only. Use
+`remarkov.model.Model.append_delta` to add a line and `remarkov.compact_model` to fold the log into a new
+snapshot. `remarkov.load_model` replays the log on top of the snapshot by merging each line.
+
+Appending costs time proportional to the new text instead of the whole model. An append that was interrupted
+leaves an incomplete last line, which is ignored on replay.
+
+Compaction writes the new snapshot to `<snapshot>.compacting`, retires the log to `<snapshot>.delta.compacting`
+and only then replaces the snapshot. A retired log is never replayed. If compaction was interrupted after the
+log was retired, `remarkov.delta.finish_compaction` completes it, so no delta is lost or applied twice.
+"""
+
+import os
+
+from typing import Iterator
+
+from remarkov.error import InvalidModelFile
+from remarkov.frozen import FrozenTransitions
+
+DELTA_SUFFIX = ".delta"
+DELTA_VERSION = 2
+COMPACTING_SUFFIX = ".compacting"
+
+
+def delta_log_path(path: str) -> str:
+    """
+    Returns the path of the delta log that belongs to the snapshot at `path`.
+    """
+
+    return path + DELTA_SUFFIX
+
+
+def finish_compaction(path: str):
+    """
+    Completes an interrupted compaction of the snapshot at `path`. Does nothing if none was interrupted.
+
+    A retired log means that the new snapshot was written completely. It replaces the old snapshot unless it
+    did already and the retired log is removed.
+    """
+
+    retired_path = delta_log_path(path) + COMPACTING_SUFFIX
+
+    if not os.path.exists(retired_path):
+        return
+
+    temp_path = path + COMPACTING_SUFFIX
+
+    if os.path.exists(temp_path):
+        os.replace(temp_path, path)
+
+    os.remove(retired_path)
+
+
+def truncate_incomplete_line(log_path: str, block_size: int = 64 * 1024):
+    """
+    Removes an incomplete last line that was left by an interrupted append.
+    """
+
+    with open(log_path, "rb+") as fout:
+        end = fout.seek(0, os.SEEK_END)
+        position = end
+
+        while 0 < position:
+            start = max(0, position - block_size)
+            fout.seek(start)
+            block = fout.read(position - start)
+            newline = block.rfind(b"\n")
+
+            if -1 != newline:
+                position = start + newline + 1
+                break
+
+            position = start
+
+        if position != end:
+            fout.truncate(position)
+
+
+def append_delta(model, path: str):
+    """
+    Appends the transitions and start states of `model` to the delta log of the snapshot at `path`.
+    """
+
+    line = model.to_json(version=DELTA_VERSION, compress=True)
+
+    # json escapes line breaks inside strings so a document never spans multiple lines.
+    assert "\n" not in line
+
+    log_path = delta_log_path(path)
+
+    if os.path.exists(log_path):
+        truncate_incomplete_line(log_path)
+
+    with open(log_path, "a") as fout:
+        fout.write(line + "\n")
+
+
+def read_deltas(path: str) -> Iterator[str]:
+    """
+    Yields all complete lines in the delta log of the snapshot at `path`.
+    """
+
+    log_path = delta_log_path(path)
+
+    if not os.path.exists(log_path):
+        return
+
+    with open(log_path, "r") as fin:
+        for line in fin:
+            if not line.endswith("\n"):
+                # the last append was interrupted.
+                return
+
+            yield line
+
+
+def replay_deltas(model, path: str) -> int:
+    """
+    Merges all deltas of the snapshot at `path` into `model` and returns their amount.
+    """
+
+    from remarkov.model import Model
+
+    replayed = 0
+
+    for line in read_deltas(path):
+        if isinstance(model.transitions, FrozenTransitions):
+            raise InvalidModelFile(
+                "delta logs can only be replayed onto version 1 or 2 snapshots"
+            )
+
+        delta = Model.from_json(line, version=DELTA_VERSION)
+
+        if delta.order != model.order:
+            raise InvalidModelFile(
+                f"delta has order {delta.order} but the snapshot has order {model.order}"
+            )
+
+        model.merge(delta)
+        replayed += 1
+
+    return replayed
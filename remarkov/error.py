@@ -21,3 +21,69 @@ class TokenStreamExhausted(Exception):
             "Creating an initial chain state exhausted the token stream. "
             "Choose a lower chain order or provide more input text."
         )
+
+
+class ModelIsFrozen(Exception):
+    """
+    Frozen models are read-only. See `remarkov.model.Model.freeze`.
+    """
+
+    def __init__(self):
+        super().__init__(
+            "The Markov chain is frozen and cannot be modified. "
+            "Add text to the original model and freeze it again."
+        )
+
+
+class PruningNotSupported(Exception):
+    """
+    Suffix array models keep the corpus itself and cannot drop single transitions. See `remarkov.suffix`.
+    """
+
+    def __init__(self):
+        super().__init__(
+            "Suffix array models cannot be pruned. "
+            "Build the model with another storage to prune it."
+        )
+
+
+class IncompatibleOptions(Exception):
+    def __init__(self, first: str, second: str):
+        super().__init__(f"The options {first} and {second} cannot be combined.")
+
+
+class MissingOption(Exception):
+    def __init__(self, option: str, required: str):
+        super().__init__(f"The option {option} requires {required}.")
+
+
+class InvalidModelFile(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f"The model file is invalid: {reason}")
+
+
+class NoSentenceTerminator(Exception):
+    def __init__(self):
+        super().__init__(
+            "No state of the Markov chain reaches a sentence terminator. "
+            "Add text that contains sentences to generate them."
+        )
+
+
+class TokenBudgetExceeded(Exception):
+    def __init__(self, budget: int):
+        super().__init__(f"Couldn't finish a sentence within {budget} tokens.")
+
+
+class InvalidStorage(Exception):
+    def __init__(self, storage: str):
+        super().__init__(
+            f"Unknown storage '{storage}'. Use 'memory', 'suffix' or 'sqlite:<path>'."
+        )
+
+
+class UnknownCompression(Exception):
+    def __init__(self, compression: str):
+        super().__init__(
+            f"Unknown compression '{compression}'. Use 'none', 'gzip', 'lzma' or 'bz2'."
+        )
@@ -0,0 +1,275 @@
+"""
+Implements a read-only, compact representation of `remarkov.model.Transitions`.
+
+All states of a frozen model are interned and stored in flat arrays using a CSR (compressed sparse row) layout:
+
+- `states` contains the token ids of all states sorted lexicographically. State `i` is located at
+  `states[i * order : (i + 1) * order]`.
+- `offsets[i]` till `offsets[i + 1]` is the range of state `i` inside `successors` and `cum_weights`.
+- `successors` contains the successor token ids.
+- `cum_weights` contains the running total of transition counts of each state.
+
+States are found using binary search and successors are selected by bisecting the cumulative weights.
+This avoids the per-object overhead of dicts, tuples and strings and keeps the data in contiguous memory.
+"""
+
+import random
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from remarkov.error import ModelIsFrozen
+from remarkov.sampling import AliasSampler
+from remarkov.termination import TerminationIndex, cached_termination_index
+from remarkov.types import Successors, TokenId
+
+TOKEN_ID_TYPECODE = "i"
+"""Array typecode used for token ids."""
+INDEX_TYPECODE = "q"
+"""Array typecode used for offsets and cumulative weights."""
+
+FrozenState = Tuple[TokenId, ...]
+FrozenSuccessors = Dict[TokenId, int]
+IntArray = Union["array[int]", memoryview]
+"""Flat integer storage. Arrays when compiled, memory views when mapped from a file."""
+
+
+class StateSequence(Sequence[FrozenState]):
+    """
+    Read-only view that presents a flat array of token ids as a sequence of state tuples.
+    """
+
+    def __init__(self, flat: IntArray, order: int):
+        self.flat = flat
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.flat) // self.order
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        base = i * self.order
+        return tuple(self.flat[base : base + self.order])
+
+
+class StartStateMapping(Mapping[FrozenState, int]):
+    """
+    Read-only mapping of start states to their weights. Looking up a single state takes linear time.
+    """
+
+    def __init__(self, states: StateSequence, weights: IntArray):
+        self.states = states
+        self.weights = weights
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def __iter__(self) -> Iterator[FrozenState]:
+        return iter(self.states)
+
+    def __getitem__(self, state: FrozenState) -> int:
+        for i, candidate in enumerate(self.states):
+            if candidate == state:
+                return self.weights[i]
+
+        raise KeyError(state)
+
+    def items(self):
+        return zip(self.states, self.weights)
+
+
+class FrozenTransitions:
+    """
+    Read-only counterpart of `remarkov.model.Transitions`. Use `remarkov.model.Model.freeze` to create one.
+    """
+
+    def __init__(
+        self,
+        order: int,
+        states: IntArray,
+        offsets: IntArray,
+        successors: IntArray,
+        cum_weights: IntArray,
+        start_states: IntArray,
+        start_weights: IntArray,
+    ):
+        self.order = order
+        self.states = states
+        self.offsets = offsets
+        self.successors = successors
+        self.cum_weights = cum_weights
+        self.start_states = StartStateMapping(
+            StateSequence(start_states, order), start_weights
+        )
+        # alias table over the indices of the start states. built on first use.
+        self._start_sampler: Optional[AliasSampler[int]] = None
+        # distances towards sentence terminators. built on first use.
+        self._termination: Optional[TerminationIndex] = None
+        # strided views on each token position of the states. these are sorted within the ranges of equal
+        # prefixes which allows narrowing down a state one token at a time using bisect.
+        self._columns = [memoryview(states)[i::order] for i in range(order)]
+
+    @staticmethod
+    def compile(
+        order: int,
+        transitions: List[Tuple[FrozenState, FrozenSuccessors]],
+        start_states: Dict[FrozenState, int],
+    ) -> "FrozenTransitions":
+        """
+        Create the arrays from interned `(state, successors)` pairs and start state weights.
+        Start states without successors are dropped.
+        """
+
+        states = array(TOKEN_ID_TYPECODE)
+        offsets = array(INDEX_TYPECODE, [0])
+        successors = array(TOKEN_ID_TYPECODE)
+        cum_weights = array(INDEX_TYPECODE)
+
+        for state, tokens in sorted(transitions, key=lambda transition: transition[0]):
+            states.extend(state)
+
+            total = 0
+            for token, count in tokens.items():
+                total += count
+                successors.append(token)
+                cum_weights.append(total)
+
+            offsets.append(len(successors))
+
+        frozen = FrozenTransitions(
+            order,
+            states,
+            offsets,
+            successors,
+            cum_weights,
+            array(TOKEN_ID_TYPECODE),
+            array(INDEX_TYPECODE),
+        )
+
+        flat_start_states = array(TOKEN_ID_TYPECODE)
+        start_weights = array(INDEX_TYPECODE)
+
+        for state, count in start_states.items():
+            if state in frozen:
+                flat_start_states.extend(state)
+                start_weights.append(count)
+
+        frozen.start_states = StartStateMapping(
+            StateSequence(flat_start_states, order), start_weights
+        )
+
+        return frozen
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __contains__(self, from_) -> bool:
+        return 0 <= self._find(from_)
+
+    def __getitem__(self, from_: FrozenState) -> FrozenSuccessors:
+        i = self._find(from_)
+
+        if i < 0:
+            raise KeyError(from_)
+
+        successors, previous = {}, 0
+
+        for j in range(self.offsets[i], self.offsets[i + 1]):
+            successors[self.successors[j]] = self.cum_weights[j] - previous
+            previous = self.cum_weights[j]
+
+        return successors
+
+    def _find(self, from_: FrozenState) -> int:
+        """
+        Return the index of state `from_` or -1 if the state does not exist.
+        """
+
+        if len(from_) != self.order:
+            return -1
+
+        lo, hi = 0, len(self)
+
+        for column, token in zip(self._columns, from_):
+            lo = bisect_left(column, token, lo, hi)
+            hi = bisect_right(column, token, lo, hi)
+
+            if lo == hi:
+                return -1
+
+        return lo
+
+    def keys(self) -> StateSequence:
+        return StateSequence(self.states, self.order)
+
+    def items(self) -> Iterator[Tuple[FrozenState, FrozenSuccessors]]:
+        for state in self.keys():
+            yield state, self[state]
+
+    def declare_start(self, from_: FrozenState, count: int = 1):
+        raise ModelIsFrozen()
+
+    def declare(self, from_: FrozenState, to: TokenId, count: int = 1):
+        raise ModelIsFrozen()
+
+    def flush(self):
+        pass
+
+    def sample(
+        self, from_: FrozenState, random: Callable[[], float] = random.random
+    ) -> TokenId:
+        """
+        Select a random successor token of state `from_` weighted by its transition count.
+        `random` must return a float in the interval [0, 1).
+        """
+
+        i = self._find(from_)
+
+        if i < 0:
+            raise KeyError(from_)
+
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        x = random() * self.cum_weights[hi - 1]
+
+        return self.successors[bisect_right(self.cum_weights, x, lo, hi - 1)]
+
+    def sample_start(self, random: Callable[[], float] = random.random) -> FrozenState:
+        """
+        Select a random start state weighted by the amount of declarations. If there are no start states,
+        any state is selected.
+        """
+
+        if not self.start_states:
+            return self.keys()[int(random() * len(self))]
+
+        if self._start_sampler is None:
+            weights = self.start_states.weights
+            self._start_sampler = AliasSampler(range(len(weights)), weights)
+
+        return self.start_states.states[self._start_sampler.sample(random)]
+
+    def analyze_termination(self, terminators: frozenset) -> TerminationIndex:
+        """
+        Returns the distance of each state towards `terminators`. See `remarkov.termination.TerminationIndex`.
+        """
+
+        return cached_termination_index(self, terminators)
@@ -1,51 +1,130 @@
 """
 Implements the Markov chain and text generation functionality.
 
-The Markov chain itself defines a state as a tuple of tokens. The length of this tuple is defined by 
+The Markov chain itself defines a state as a tuple of tokens. The length of this tuple is defined by
 the chain order at `remarkov.model.Model.order`. A chain of order 1 (default) uses a one-dimensional tuple.
 On each generation step, the state is rotated left removing the oldest token and appending a new one.
 """
 
 import random
+import sys
+
+from contextlib import nullcontext
+
+from typing import (
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TextIO,
+    Union,
+    cast,
+)
 
-from typing import Callable, Dict, Generator, List, Optional, Tuple
-
-from remarkov.error import NoTransitionsDefined, NoStartStateFound, TokenStreamExhausted
+from remarkov.error import (
+    ModelIsFrozen,
+    NoTransitionsDefined,
+    NoStartStateFound,
+    TokenStreamExhausted,
+)
+from remarkov.compression import open_text, resolve_compression
+from remarkov.profiling import Profiler
 from remarkov.persistance import (
     V1Decoder,
     V1Encoder,
     V2Decoder,
     V2Encoder,
+    V3Encoder,
     DEFAULT_PERSISTANCE_VERSION,
 )
-from remarkov.types import State, Token, Tokenizer, TokenStream
+from remarkov.types import (
+    State,
+    StoredState,
+    StoredSuccessors,
+    StoredToken,
+    Token,
+    Tokenizer,
+    TokenStream,
+)
+from remarkov.frozen import FrozenTransitions
+from remarkov.sampling import AliasSampler
+from remarkov.stats import ModelStats, collect_stats
+from remarkov.storage import SqliteTransitions, open_transitions
+from remarkov.suffix import SUFFIX_STORAGE, SuffixTransitions
+from remarkov.termination import TerminationIndex, cached_termination_index
+from remarkov.vocabulary import Vocabulary
 from remarkov.tokenizer import (
     NO_WHITESPACE_AFTER,
     default_tokenizer,
     PUNCT_TERMINATION,
+    read_chunks,
+    tokenize_chunks,
 )
 
 DEFAULT_GENERATE_WORD_AMOUNT = 32
 DEFAULT_GENERATE_SENTENCE_AMOUNT = 3
+# amount of characters collected before `GenerationResult.iter_text_chunks` emits them.
+DEFAULT_TEXT_CHUNK_SIZE = 64 * 1024
+
+
+def select_rng(
+    rng: Optional[random.Random],
+    seed: Optional[int],
+    default: Optional[random.Random],
+) -> random.Random:
+    """
+    Select the random number generator for a generation call: a new one for `seed`, `rng` if it is given,
+    the `default` of the model or else the global generator of the `random` module.
+    """
+
+    if seed is not None:
+        return random.Random(seed)
+
+    if rng is not None:
+        return rng
+
+    if default is not None:
+        return default
+
+    # the module functions share the global generator. this keeps `random.seed` working.
+    return random  # type: ignore
 
 
 class Transitions(dict):
     """
     Stores all state transitions of the Markov chain.
+
+    Each state maps to its successor tokens and the number of times a successor was observed.
+    Start states are stored the same way: each one maps to the number of times it was declared.
     """
 
     def __init__(self):
-        self.__dict__: Dict[State, List[Token]] = {}
-        self.start_states: List[State] = []
-
-    def declare_start(self, from_: State):
+        self.start_states: Dict[State, int] = {}
+        # alias tables per state for successor sampling. built on first use.
+        self._samplers: Dict[State, AliasSampler[Token]] = {}
+        # alias table of all start states that have successors. built on first use.
+        self._start_sampler: Optional[AliasSampler[State]] = None
+        # all states for picking a random one if no start states were declared.
+        self._keys: Optional[Tuple[State, ...]] = None
+        # distances towards sentence terminators. built on first use.
+        self._termination: Optional[TerminationIndex] = None
+
+    def declare_start(self, from_: State, count: int = 1):
         """
-        Add a valid starting state `from_` to the chain.
+        Add a valid starting state `from_` to the chain. `count` declares it multiple times at once.
         """
 
-        self.start_states.append(from_)
+        self.start_states[from_] = self.start_states.get(from_, 0) + count
+        self._start_sampler, self._termination = None, None
 
-    def declare(self, from_: State, to: Token):
+    def declare(self, from_: State, to: Token, count: int = 1):
         """
         Add a transition from state `from_` to a successor state.
 
@@ -53,12 +132,195 @@ class Transitions(dict):
         so that the overall length complies with `remarkov.model.Model.order`.
 
         You can call this method several times thus increasing the chance of this transition happening.
+        `count` declares the same transition multiple times at once.
+        """
+
+        successors = self.get(from_)
+
+        if successors is None:
+            successors = self[from_] = {}
+
+            # a new state could make a start state valid.
+            self._start_sampler, self._keys = None, None
+
+        successors[to] = successors.get(to, 0) + count
+
+        # the sampling table and termination distances are outdated now.
+        if self._samplers:
+            self._samplers.pop(from_, None)
+
+        self._termination = None
+
+    def sample(
+        self, from_: State, random: Callable[[], float] = random.random
+    ) -> Token:
+        """
+        Select a random successor token of state `from_` weighted by its transition count.
+        `random` must return a float in the interval [0, 1).
+
+        This runs in constant time once the sampler of `from_` was built. States with a single successor
+        do not need a sampler.
+        """
+
+        sampler = self._samplers.get(from_)
+
+        if sampler is None:
+            successors = self[from_]
+
+            if 1 == len(successors):
+                for token in successors:
+                    return token
+
+            sampler = self._samplers[from_] = AliasSampler(
+                list(successors.keys()), list(successors.values())
+            )
+
+        return sampler.sample(random)
+
+    def sample_start(self, random: Callable[[], float] = random.random) -> State:
+        """
+        Select a random start state weighted by the amount of declarations. Start states without
+        successors are never selected. If no start states were declared, any state is selected.
+
+        This raises `remarkov.error.NoStartStateFound` if none of the start states has successors.
+        """
+
+        if not self.start_states:
+            # too few sentences were imported. just pick some random state then.
+            if self._keys is None:
+                self._keys = tuple(self.keys())
+
+            return self._keys[int(random() * len(self._keys))]
+
+        if self._start_sampler is None:
+            # the chain could be exhausted after a start state if the source text ended.
+            valid = [state for state in self.start_states if state in self]
+
+            if not valid:
+                raise NoStartStateFound()
+
+            self._start_sampler = AliasSampler(
+                valid, [self.start_states[state] for state in valid]
+            )
+
+        return self._start_sampler.sample(random)
+
+    def flush(self):
+        """
+        Transitions are stored immediately. This exists for compatibility with `remarkov.storage`.
+        """
+
+    def drop_dead_start_states(self):
+        """
+        Remove all start states that do not have successors.
         """
 
-        if from_ not in self:
-            self[from_] = []
+        for state in [state for state in self.start_states if state not in self]:
+            del self.start_states[state]
+
+        self._start_sampler, self._termination = None, None
+
+    def analyze_termination(self, terminators: frozenset) -> TerminationIndex:
+        """
+        Returns the distance of each state towards `terminators`. See `remarkov.termination.TerminationIndex`.
+        The result is cached until the chain is modified.
+        """
+
+        return cached_termination_index(self, terminators)
+
+    def prune(
+        self,
+        min_count: int = 1,
+        top_k: Optional[int] = None,
+        min_state_total: int = 1,
+    ) -> Tuple[int, int]:
+        """
+        Remove rare transitions and states. See `remarkov.model.Model.prune`.
+        Returns the amount of removed states and transitions.
+        """
+
+        kept: Dict[State, Dict[Token, int]] = {}
+        removed_transitions = 0
+
+        for state, successors in self.items():
+            if sum(successors.values()) < min_state_total:
+                removed_transitions += len(successors)
+                continue
+
+            tokens = [
+                (token, count)
+                for token, count in successors.items()
+                if min_count <= count
+            ]
+
+            if top_k is not None and top_k < len(tokens):
+                # keep the most frequent successors in their original order.
+                best = sorted(range(len(tokens)), key=lambda i: -tokens[i][1])[:top_k]
+                tokens = [tokens[i] for i in sorted(best)]
+
+            removed_transitions += len(successors) - len(tokens)
+
+            if tokens:
+                kept[state] = dict(tokens)
 
-        self[from_].append(to)
+        removed_states = len(self) - len(kept)
+
+        # deleting keys never shrinks a dict. rebuilding the tables releases their memory.
+        self.clear()
+        self.update(kept)
+        self.start_states = {
+            state: count for state, count in self.start_states.items() if state in self
+        }
+
+        self._samplers = {}
+        self._start_sampler, self._keys, self._termination = None, None, None
+
+        return removed_states, removed_transitions
+
+    def estimate_size(self) -> int:
+        """
+        Estimates the memory used by the chain in bytes. Tokens are not included as they are shared
+        between states, successors and the vocabulary.
+        """
+
+        size = sys.getsizeof(self) + sys.getsizeof(self.start_states)
+
+        for state, successors in self.items():
+            size += sys.getsizeof(state) + sys.getsizeof(successors)
+
+        return size
+
+
+class PruneReport:
+    """
+    Output type of `remarkov.model.Model.prune`.
+    """
+
+    def __init__(
+        self,
+        removed_states: int,
+        removed_transitions: int,
+        removed_start_states: int,
+        size_before: int,
+        size_after: int,
+    ):
+        self.removed_states = removed_states
+        self.removed_transitions = removed_transitions
+        self.removed_start_states = removed_start_states
+        self.size_before = size_before
+        self.size_after = size_after
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.size_before - self.size_after
+
+    def __str__(self):
+        return (
+            f"removed {self.removed_states} states, "
+            f"{self.removed_transitions} transitions "
+            f"and {self.removed_start_states} start states, "
+            f"reclaimed {self.reclaimed_bytes} of {self.size_before} bytes"
+        )
 
 
 class GenerationResult:
@@ -66,7 +328,7 @@ class GenerationResult:
     Output type of `remarkov.model.Model.generate`.
     """
 
-    def __init__(self, output_stream: Generator[Token, None, None]):
+    def __init__(self, output_stream: Iterator[Token]):
         self.output_stream = output_stream
 
     def __str__(self):
@@ -76,14 +338,17 @@ class GenerationResult:
 
         return " ".join(self.output_stream)
 
-    def text(self):
+    def iter_text_chunks(
+        self, chunk_size: int = DEFAULT_TEXT_CHUNK_SIZE
+    ) -> Iterator[str]:
         """
-        Collects all emitted tokens and tries to apply correct spacing between punctuation and words.
+        Emits the text of `remarkov.model.GenerationResult.text` in chunks of roughly `chunk_size` characters.
+        Only one chunk is kept in memory at a time which makes this suitable for very long outputs.
         """
 
         from remarkov.tokenizer import NO_WHITESPACE_BEFORE
 
-        prev_token, output = None, ""
+        prev_token, parts, size = None, [], 0
 
         for token in self.output_stream:
             # apply special spacing rules to punctuation.
@@ -91,13 +356,43 @@ class GenerationResult:
                 pass
             # make sure that output is not empty to avoid leading whitespace.
             # if we've previously emitted a punctuation token that doesn't require a space -> avoid it.
-            elif output and prev_token not in NO_WHITESPACE_AFTER:
-                output += " "
+            elif prev_token is not None and prev_token not in NO_WHITESPACE_AFTER:
+                parts.append(" ")
+                size += 1
 
-            output += token
+            parts.append(token)
+            size += len(token)
             prev_token = token
 
-        return output
+            if chunk_size <= size:
+                yield "".join(parts)
+                parts, size = [], 0
+
+        if parts:
+            yield "".join(parts)
+
+    def write_to(
+        self, stream: TextIO, chunk_size: int = DEFAULT_TEXT_CHUNK_SIZE
+    ) -> int:
+        """
+        Writes the text of `remarkov.model.GenerationResult.text` to `stream` without collecting it first.
+        Returns the amount of characters written.
+        """
+
+        written = 0
+
+        for chunk in self.iter_text_chunks(chunk_size):
+            stream.write(chunk)
+            written += len(chunk)
+
+        return written
+
+    def text(self):
+        """
+        Collects all emitted tokens and tries to apply correct spacing between punctuation and words.
+        """
+
+        return "".join(self.iter_text_chunks())
 
 
 class Model:
@@ -106,33 +401,71 @@ class Model:
         order: int = 1,
         tokenizer: Optional[Tokenizer] = None,
         before_insert: Optional[Callable[[str], str]] = None,
+        intern: bool = False,
+        seed: Optional[int] = None,
+        storage: Optional[str] = None,
     ):
         self.order = order
         self.tokenizer = tokenizer if tokenizer else default_tokenizer
         self.before_insert = before_insert
+        # if set, states and successors are stored as integer ids instead of strings.
+        # the suffix array engine only stores ids.
+        self.vocabulary: Optional[Vocabulary] = (
+            Vocabulary() if intern or SUFFIX_STORAGE == storage else None
+        )
 
-        self.transitions = Transitions()
+        self.transitions: Union[
+            Transitions, FrozenTransitions, SqliteTransitions, SuffixTransitions
+        ] = open_transitions(storage, order)
+        # random number generator used by default. `None` uses the global generator of `random`.
+        self.rng: Optional[random.Random] = (
+            random.Random(seed) if seed is not None else None
+        )
+        # collects timings of building and generating if set. see `remarkov.profiling`.
+        self.profiler: Optional[Profiler] = None
 
         assert 1 <= self.order, "Order must be at least 1."
+        assert not (
+            intern and isinstance(self.transitions, SqliteTransitions)
+        ), "Interned models cannot be stored in SQLite."
 
     @staticmethod
-    def from_json(raw: str, version: int = DEFAULT_PERSISTANCE_VERSION) -> "Model":
+    def from_json(
+        raw: str, version: int = DEFAULT_PERSISTANCE_VERSION, intern: bool = False
+    ) -> "Model":
         """
         Deserialize a model from a JSON string. You should prefer `remarkov.parse_model` over this function.
         """
-        decoder = V2Decoder() if 2 == version else V1Decoder()
+        decoder = V2Decoder(intern=intern) if 2 == version else V1Decoder(intern=intern)
         return decoder.decode(raw)
 
-    def _create_initial_state(self, token_stream: TokenStream) -> List[Token]:
+    def _create_initial_state(self, token_stream: TokenStream) -> List[StoredToken]:
         try:
-            return [
-                self._trigger_before_insert(next(token_stream))
-                for _ in range(self.order)
-            ]
+            return [self._prepare_token(next(token_stream)) for _ in range(self.order)]
         except StopIteration:
             raise TokenStreamExhausted()
 
-    def _get_random_start_state(self) -> Tuple[State, List[Token]]:
+    def _get_rng(
+        self, rng: Optional[random.Random] = None, seed: Optional[int] = None
+    ) -> random.Random:
+        """
+        Select the random number generator for a generation call. See `remarkov.model.select_rng`.
+        """
+
+        return select_rng(rng, seed, self.rng)
+
+    def spawn_rng(self) -> random.Random:
+        """
+        Create a new random number generator that is independent of all others, e.g. for a worker thread.
+
+        The generator is seeded from the model generator so a seeded model hands out reproducible streams.
+        """
+
+        return random.Random(self._get_rng().getrandbits(128))
+
+    def _get_random_start_state(
+        self, rng=random
+    ) -> Tuple[StoredState, List[StoredToken]]:
         """
         This returns an immutable tuple state for transition selection as first value and
         a mutable variant as second value.
@@ -141,27 +474,34 @@ class Model:
         if not self.transitions:
             raise NoTransitionsDefined()
 
-        # if no start states were declared, it is most likely because too few sentences were
-        # imported. just pick some random key then.
-        if not self.transitions.start_states:
-            # TODO: avoid this list conversion
-            key = random.choice(list(self.transitions.keys()))
+        key = self.transitions.sample_start(rng.random)
 
-        else:
-            for _ in range(100):
-                # unfortunately, we cannot trust this start state to have a successor token,
-                # because the chain could be exhausted if corresponding source text ended.
-                key = random.choice(self.transitions.start_states)
+        return key, list(key)
 
-                # make sure that the state has successor tokens.
-                if key in self.transitions:
-                    break
+    def _measure(self, phase: str) -> ContextManager:
+        """
+        Times a `with` block as `phase` if profiling is enabled.
+        """
 
-            else:
-                # if we haven't managed to find a start state -> give up.
-                raise NoStartStateFound()
+        if self.profiler is None:
+            return nullcontext()
 
-        return key, list(key)
+        return self.profiler.measure(phase)
+
+    def _profile_sampling(
+        self, start: Callable, sample: Callable
+    ) -> Tuple[Callable, Callable]:
+        """
+        Wraps the start state and successor selection of a generation loop if profiling is enabled.
+        """
+
+        if self.profiler is None:
+            return start, sample
+
+        return (
+            self.profiler.wrap("start_state", start),
+            self.profiler.wrap("sample", sample),
+        )
 
     def _trigger_before_insert(self, token: str) -> str:
         if self.before_insert:
@@ -169,6 +509,35 @@ class Model:
 
         return token
 
+    def _prepare_token(self, token: str):
+        """
+        Transforms a token from the tokenizer into its stored representation.
+        """
+
+        token = self._trigger_before_insert(token)
+
+        if self.vocabulary is not None:
+            return self.vocabulary.intern(token)
+
+        return token
+
+    def _resolve_token(self, token) -> Token:
+        """
+        Transforms a stored token back into its string representation.
+        """
+
+        if self.vocabulary is not None:
+            return self.vocabulary.lookup(token)
+
+        return token
+
+    def _resolve_stream(self, stream) -> Generator[Token, None, None]:
+        if self.vocabulary is None:
+            return stream
+
+        tokens = self.vocabulary.tokens
+        return (tokens[token_id] for token_id in stream)
+
     def add_text(self, text: str, tokenizer: Optional[Tokenizer] = None):
         """
         Insert some text into the Markov chain.
@@ -179,109 +548,591 @@ class Model:
         if tokenizer is None:
             tokenizer = self.tokenizer
 
-        token_stream = tokenizer(text)
+        self._add_tokens(tokenizer(text))
+
+    def add_stream(self, chunks: Iterable[str], tokenizer: Optional[Tokenizer] = None):
+        """
+        Insert text that arrives in chunks into the Markov chain. This is equal to calling
+        `remarkov.model.Model.add_text` with the concatenated chunks, but only a few chunks are kept in memory.
+        See `remarkov.tokenizer.tokenize_chunks` for details.
+        """
+
+        if tokenizer is None:
+            tokenizer = self.tokenizer
+
+        self._add_tokens(tokenize_chunks(chunks, tokenizer))
+
+    def add_file(self, path: str, tokenizer: Optional[Tokenizer] = None):
+        """
+        Insert the content of the text file at `path` into the Markov chain without reading it at once.
+        """
+
+        with open(path, "r") as fin:
+            self.add_stream(read_chunks(fin), tokenizer=tokenizer)
+
+    def _add_tokens(self, token_stream: TokenStream):
+        declare = self.transitions.declare
+        declare_start = self.transitions.declare_start
+        before_insert = self.before_insert
+
+        if self.profiler is not None:
+            token_stream = self.profiler.iterate("tokenize", token_stream)
 
         last_removed_token, state = None, self._create_initial_state(token_stream)
 
+        # removed tokens are compared in their stored form, so no token has to be resolved.
+        ids: Optional[Dict[Token, int]] = None
+        terminators: Union[frozenset, set] = PUNCT_TERMINATION
+
+        if self.vocabulary is not None:
+            ids, intern = self.vocabulary.ids, self.vocabulary.intern
+            terminators = {ids[token] for token in PUNCT_TERMINATION if token in ids}
+
+        def intern_new(token: Token) -> int:
+            token_id = intern(token)
+
+            if token in PUNCT_TERMINATION:
+                terminators.add(token_id)  # type: ignore
+
+            return token_id
+
+        def prepare(token: Token):
+            if before_insert:
+                token = before_insert(token)
+
+            if ids is None:
+                return token
+
+            token_id = ids.get(token)
+            return intern_new(token) if token_id is None else token_id
+
+        # tokens are prepared inline unless the preparation has to be timed.
+        profiled_prepare: Optional[Callable] = None
+        token: StoredToken
+
+        if self.profiler is not None:
+            profiled_prepare = self.profiler.wrap("prepare", prepare)
+            declare = self.profiler.wrap("declare", declare)
+            declare_start = self.profiler.wrap("declare_start", declare_start)
+
         for token in token_stream:
-            key: State = tuple(state)
+            key: StoredState = tuple(state)
+
+            if profiled_prepare is not None:
+                token = profiled_prepare(token)
+            else:
+                if before_insert:
+                    token = before_insert(token)
+
+                if ids is not None:
+                    token_id = ids.get(token)
+                    token = intern_new(token) if token_id is None else token_id
 
-            token = self._trigger_before_insert(token)
-            self.transitions.declare(key, token)
+            declare(key, token)
 
             # decide whether we should declare the current state a valid entry point of the chain.
             if (
                 # we consider the beginning of a text to be a valid entry point so check if this is the first iteration.
                 last_removed_token is None
                 # if we've removed a sentence termination token in the last iteration, we now have a valid start state.
-                or last_removed_token in PUNCT_TERMINATION
+                or last_removed_token in terminators
             ):
-                self.transitions.declare_start(key)
+                declare_start(key)
 
             # update current state.
             state.append(token)
             # save the last removed token for starting state detection.
             last_removed_token = state.pop(0)
 
-    def _generate_stream(self):
+        # write pending transitions of storage backends.
+        self.transitions.flush()
+
+    def _generate_stream(self, rng=random):
         """
         Creates an endless stream of words.
         """
 
-        _, state = self._get_random_start_state()
+        start, sample = self._profile_sampling(
+            self._get_random_start_state, self.transitions.sample
+        )
+        random_float = rng.random
+        key, state = start(rng)
 
         # copy state tokens into output.
         yield from state
 
         while True:
-            key: State = tuple(state)
+            try:
+                token = sample(key, random_float)
 
-            if key not in self.transitions:
-                key, state = self._get_random_start_state()
+            except KeyError:
+                # the current state has no successors. restart with a new state.
+                if self.profiler is not None:
+                    self.profiler.count("restart")
 
-                yield from state
+                key, state = start(rng)
 
-            token = random.choice(self.transitions[key])
+                yield from state
+                continue
 
             # update state.
-            state.append(token)
-            state.pop(0)
+            key = key[1:] + (token,)
 
             yield token
 
-    def _generate_stream_with_limit(self, word_amount: int):
+    def _generate_stream_with_limit(self, word_amount: int, rng=random):
         """
         This encapsulates text output termination.
         """
 
-        stream = self._generate_stream()
+        stream = self._resolve_stream(self._generate_stream(rng))
         return (next(stream) for _ in range(word_amount))
 
     def generate(
-        self, word_amount: int = DEFAULT_GENERATE_WORD_AMOUNT
+        self,
+        word_amount: int = DEFAULT_GENERATE_WORD_AMOUNT,
+        rng: Optional[random.Random] = None,
+        seed: Optional[int] = None,
     ) -> GenerationResult:
         """
         Generate a random text with `word_amount` tokens.
+
+        Random numbers are drawn from `rng` or a new generator seeded with `seed`. By default, the model
+        generator `remarkov.model.Model.rng` is used. Generating text does not modify the model, so multiple
+        threads can generate from the same model if each one uses its own generator.
         """
 
-        return GenerationResult(self._generate_stream_with_limit(word_amount))
+        rng = self._get_rng(rng, seed)
+        return GenerationResult(self._generate_stream_with_limit(word_amount, rng))
 
     def generate_sentences(
-        self, sentence_amount: int = DEFAULT_GENERATE_SENTENCE_AMOUNT
+        self,
+        sentence_amount: int = DEFAULT_GENERATE_SENTENCE_AMOUNT,
+        rng: Optional[random.Random] = None,
+        seed: Optional[int] = None,
+        max_tokens: Optional[int] = None,
     ) -> GenerationResult:
         """
-        Generate a random text with `sentence_amount` sentences. Be careful when using this function
-        as it will result in an endless loop if no `remarkov.tokenizer.PUNCT_TERMINATION` character was added.
+        Generate a random text with `sentence_amount` sentences. A sentence ends with a
+        `remarkov.tokenizer.PUNCT_TERMINATION` token and transitions that can never reach one are avoided.
+        If `max_tokens` is set, each sentence has at most `max_tokens` tokens which bounds the runtime.
+        See `remarkov.model.Model.generate` for `rng` and `seed`.
+
+        This raises `remarkov.error.NoSentenceTerminator` if the chain has no sentence terminators and
+        `remarkov.error.TokenBudgetExceeded` if no sentence fits into `max_tokens`.
         """
         assert 0 < sentence_amount, "Sentence amount must be at least 1."
 
+        rng = self._get_rng(rng, seed)
+        index = self._get_termination_index()
+
         def sentence_generator():
-            stream = self._generate_stream()
+            sentences = self._walk_sentences(rng, index, sentence_amount, max_tokens)
 
-            for _ in range(sentence_amount):
-                # TODO: we should make sure that we are not starting on a punctuation char,
-                #       but this is fine for now.
-                token = next(stream)
+            for sentence in sentences:
+                yield from self._resolve_stream(sentence)
 
-                while token not in PUNCT_TERMINATION:
-                    yield token
-                    token = next(stream)
+        return GenerationResult(sentence_generator())
 
-                yield token
+    def _get_termination_index(self) -> TerminationIndex:
+        # if there are no transitions, no data was given. fail.
+        if not self.transitions:
+            raise NoTransitionsDefined()
 
-        return GenerationResult(sentence_generator())
+        with self._measure("analyze_termination"):
+            return self.transitions.analyze_termination(self._stored_terminators())
 
-    def to_json(
-        self, version: int = DEFAULT_PERSISTANCE_VERSION, compress: bool = False
-    ) -> str:
+    def _walk_sentences(
+        self,
+        rng,
+        index: TerminationIndex,
+        sentence_amount: int,
+        max_tokens: Optional[int] = None,
+    ) -> Generator[List[StoredToken], None, None]:
+        """
+        Emits lists of stored tokens until `sentence_amount` sentences were generated. Each sentence continues
+        the text of the previous one unless that cannot be terminated within `max_tokens`. In this case, a new
+        start state is selected.
+        """
+
+        sample_start, sample = self._profile_sampling(index.sample_start, index.sample)
+        random_float = rng.random
+        distances, terminators = index.distances, index.terminators
+        key: Optional[StoredState] = None
+        remaining = sentence_amount
+
+        while 0 < remaining:
+            distance = None if key is None else distances.get(key)
+
+            if (
+                key is None
+                or distance is None
+                or (max_tokens is not None and max_tokens < distance)
+            ):
+                key = sample_start(random_float, max_tokens)
+                output = list(key)
+
+                # start states of higher orders can already contain whole sentences.
+                ends = [i for i, token in enumerate(key) if token in terminators]
+
+                if ends:
+                    if remaining <= len(ends):
+                        yield output[: ends[remaining - 1] + 1]
+                        return
+
+                    remaining -= len(ends)
+
+                length = len(output) - (ends[-1] + 1 if ends else 0)
+
+            else:
+                output, length = [], 0
+
+            # the amount of tokens the sentence may still emit.
+            budget = None if max_tokens is None else max_tokens - length
+
+            while True:
+                token = sample(key, random_float, budget)
+                output.append(token)
+                key = key[1:] + (token,)
+
+                if token in terminators:
+                    break
+
+                if budget is not None:
+                    budget -= 1
+
+            remaining -= 1
+            yield output
+
+    def _walk(self, rng, word_amount: int) -> List[StoredToken]:
+        """
+        Collects stored tokens of a random walk until `word_amount` tokens were generated.
+
+        This follows the same rules as `remarkov.model.Model._generate_stream`, but runs in a single loop
+        without any generators in between.
+        """
+
+        output: List[StoredToken] = []
+        start, sample = self._profile_sampling(
+            self._get_random_start_state, self.transitions.sample
+        )
+        random_float = rng.random
+
+        key, _ = start(rng)
+        output.extend(key)
+
+        while len(output) < word_amount:
+            try:
+                token = sample(key, random_float)
+
+            except KeyError:
+                # dead end. restart with a new state.
+                if self.profiler is not None:
+                    self.profiler.count("restart")
+
+                key, _ = start(rng)
+                output.extend(key)
+                continue
+
+            output.append(token)
+            key = key[1:] + (token,)
+
+        del output[word_amount:]
+
+        return output
+
+    def _stored_terminators(self) -> frozenset:
+        """
+        Returns the stored representation of all `remarkov.tokenizer.PUNCT_TERMINATION` tokens.
+        """
+
+        if self.vocabulary is None:
+            return PUNCT_TERMINATION
+
+        return frozenset(
+            self.vocabulary.ids[token]
+            for token in PUNCT_TERMINATION
+            if token in self.vocabulary
+        )
+
+    def _walk_result(self, output: List[StoredToken]) -> GenerationResult:
+        if self.vocabulary is not None:
+            tokens = self.vocabulary.tokens
+            output = [tokens[token_id] for token_id in output]
+
+        return GenerationResult(iter(output))
+
+    def generate_many(
+        self,
+        n: int,
+        word_amount: int = DEFAULT_GENERATE_WORD_AMOUNT,
+        rng: Optional[random.Random] = None,
+        seed: Optional[int] = None,
+    ) -> List[GenerationResult]:
+        """
+        Generate `n` random texts with `word_amount` tokens each.
+
+        Unlike `remarkov.model.Model.generate`, the texts are generated immediately in a tight loop without
+        generators in between, which saves some overhead per token when producing a lot of short texts.
+        """
+
+        rng = self._get_rng(rng, seed)
+
+        return [self._walk_result(self._walk(rng, word_amount)) for _ in range(n)]
+
+    def generate_sentences_many(
+        self,
+        n: int,
+        sentence_amount: int = DEFAULT_GENERATE_SENTENCE_AMOUNT,
+        rng: Optional[random.Random] = None,
+        seed: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ) -> List[GenerationResult]:
+        """
+        Generate `n` random texts with `sentence_amount` sentences each. See `remarkov.model.Model.generate_many`
+        and `remarkov.model.Model.generate_sentences`.
+        """
+        assert 0 < sentence_amount, "Sentence amount must be at least 1."
+
+        rng = self._get_rng(rng, seed)
+        index = self._get_termination_index()
+        results = []
+
+        for _ in range(n):
+            output = []
+
+            for sentence in self._walk_sentences(
+                rng, index, sentence_amount, max_tokens
+            ):
+                output.extend(sentence)
+
+            results.append(self._walk_result(output))
+
+        return results
+
+    def prune(
+        self,
+        min_count: int = 1,
+        top_k: Optional[int] = None,
+        min_state_total: int = 1,
+    ) -> PruneReport:
         """
-        Serializes the model into a JSON string.
+        Shrink the model by removing rare transitions and states:
 
-        `version` is currently not in use.
+        - successors observed less than `min_count` times are removed.
+        - if `top_k` is set, only the `top_k` most frequent successors of each state are kept.
+        - states observed less than `min_state_total` times in total are removed.
+
+        States without successors and start states of removed states are removed as well. Transitions that
+        lead into a removed state become dead ends which restart generation. Tokens stay in the vocabulary of
+        interned models so that ids remain stable.
+        """
+
+        if isinstance(self.transitions, FrozenTransitions):
+            raise ModelIsFrozen()
+
+        size_before = self.transitions.estimate_size()
+        start_states = len(self.transitions.start_states)
+
+        with self._measure("prune"):
+            removed_states, removed_transitions = self.transitions.prune(
+                min_count=min_count, top_k=top_k, min_state_total=min_state_total
+            )
+
+        return PruneReport(
+            removed_states,
+            removed_transitions,
+            start_states - len(self.transitions.start_states),
+            size_before,
+            self.transitions.estimate_size(),
+        )
+
+    def stats(self) -> ModelStats:
+        """
+        Collect statistics about the shape and estimated memory usage of the model.
+        See `remarkov.stats.ModelStats` for the reported values.
+        """
+
+        return collect_stats(self)
+
+    def merge(self, other: "Model") -> "Model":
+        """
+        Add all transitions and start states of `other` to this model and return it.
+
+        Merging the models of two texts results in the same transitions as adding both texts to one model.
+        Both models must have the same order. Vocabularies of interned models are translated if necessary.
+        """
+
+        assert self.order == other.order, "Models must have the same order."
+
+        translate = self.vocabulary is not other.vocabulary
+        # states and successors are token ids if the model is interned and strings otherwise.
+        items = cast(
+            Iterable[Tuple[StoredState, StoredSuccessors]], other.transitions.items()
+        )
+        start_states = cast(Mapping[StoredState, int], other.transitions.start_states)
+
+        for state, successors in items:
+            if translate:
+                state = self._import_state(other, state)
+                successors = {
+                    self._import_token(other, token): count
+                    for token, count in successors.items()
+                }
+
+            for token, count in successors.items():
+                self.transitions.declare(state, token, count)
+
+        for state, count in start_states.items():
+            if translate:
+                state = self._import_state(other, state)
+
+            self.transitions.declare_start(state, count)
+
+        return self
+
+    def _import_token(self, other: "Model", token: StoredToken) -> StoredToken:
+        """
+        Translate a stored token of model `other` into the representation of this model.
+        """
+
+        token = other._resolve_token(token)
+
+        if self.vocabulary is not None:
+            return self.vocabulary.intern(token)
+
+        return token
+
+    def _import_state(self, other: "Model", state: StoredState) -> StoredState:
+        return tuple(self._import_token(other, token) for token in state)
+
+    def freeze(self) -> "Model":
+        """
+        Compile the model into a read-only copy backed by `remarkov.frozen.FrozenTransitions`.
+
+        The frozen model uses a fraction of the memory and supports all generation methods, but
+        trying to add text raises `remarkov.error.ModelIsFrozen`. Tokens are always interned.
+        """
+
+        frozen = Model(
+            order=self.order,
+            tokenizer=self.tokenizer,
+            before_insert=self.before_insert,
+            intern=True,
+        )
+        frozen.rng, frozen.profiler = self.rng, self.profiler
+        vocabulary = frozen.vocabulary
+        assert vocabulary is not None
+
+        # states and successors are token ids if the model is interned and strings otherwise.
+        items = cast(
+            Iterable[Tuple[StoredState, StoredSuccessors]], self.transitions.items()
+        )
+        stored_start_states = cast(
+            Mapping[StoredState, int], self.transitions.start_states
+        )
+
+        if self.vocabulary is not None:
+            # keep the ids of the existing vocabulary.
+            for token in self.vocabulary.tokens:
+                vocabulary.intern(token)
+
+            transitions = list(items)
+            start_states = dict(stored_start_states)
+
+        else:
+            transitions = [
+                (vocabulary.intern_state(state), vocabulary.intern_successors(tokens))
+                for state, tokens in items
+            ]
+            start_states = {
+                vocabulary.intern_state(state): count
+                for state, count in stored_start_states.items()
+            }
+
+        frozen.transitions = FrozenTransitions.compile(
+            self.order, transitions, start_states
+        )
+
+        return frozen
+
+    def save(
+        self,
+        path: str,
+        version: int = DEFAULT_PERSISTANCE_VERSION,
+        compress: bool = False,
+        compression: Optional[str] = None,
+    ):
+        """
+        Serializes the model into the file at `path`. Use `remarkov.load_model` to read it again.
+
+        JSON files are compressed with `compression` or the codec that belongs to the extension of `path`, see
+        `remarkov.compression`. They are written with `remarkov.model.Model.dump`.
+
+        Version 3 writes the binary format of `remarkov.persistance.V3Encoder`. The model will be frozen for
+        this if necessary. Version 3 files cannot be compressed.
+        """
+
+        if 3 == version:
+            assert (
+                resolve_compression(path, compression) is None
+            ), "Version 3 files cannot be compressed."
+
+            with open(path, "wb") as fout:
+                self.dump(fout, version=version)
+
+        else:
+            with open_text(path, "w", compression) as fout:
+                self.dump(fout, version=version, compress=compress)
+
+    def dump(
+        self,
+        fout: Union[TextIO, BinaryIO],
+        version: int = DEFAULT_PERSISTANCE_VERSION,
+        compress: bool = False,
+    ):
         """
-        encoder = (
+        Serializes the model into the file object `fout`, which has to be binary for version 3.
+
+        JSON is written one transition at a time, so memory does not grow with the size of the model. The
+        output is identical to `remarkov.model.Model.to_json`.
+        """
+
+        with self._measure("encode"):
+            if 3 == version:
+                V3Encoder().dump(self, fout)  # type: ignore
+            else:
+                self._json_encoder(version, compress).dump(self, fout)  # type: ignore
+
+    def append_delta(self, path: str):
+        """
+        Appends the transitions and start states of this model to the delta log of the model file at `path`.
+        `remarkov.load_model` merges them into the saved model. See `remarkov.delta`.
+
+        This model should only contain the new text, e.g. a fresh model with the same order and tokenizer.
+        """
+
+        from remarkov.delta import append_delta
+
+        append_delta(self, path)
+
+    def _json_encoder(self, version: int, compress: bool):
+        return (
             V2Encoder(compress=compress)
             if version == 2
             else V1Encoder(compress=compress)
         )
-        return encoder.encode(self)
+
+    def to_json(
+        self, version: int = DEFAULT_PERSISTANCE_VERSION, compress: bool = False
+    ) -> str:
+        """
+        Serializes the model into a JSON string. Use `remarkov.model.Model.save` to write compressed files.
+
+        `version` selects the format: 1 lists each transition, 2 stores transition counts.
+        """
+
+        encoder = self._json_encoder(version, compress)
+
+        with self._measure("encode"):
+            return encoder.encode(self)
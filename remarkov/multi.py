@@ -0,0 +1,321 @@
+"""
+Implements a model that contains the Markov chains of all orders up to a maximum order.
+
+`remarkov.multi.MultiOrderModel` tokenizes its input once and inserts each token into a trie of contexts. The
+path from the root to a node spells a context backwards, starting with the most recent token, so the node of an
+order `n` context is a child of the node of its order `n - 1` suffix. Each node stores the successor counts of
+its context and how often the context started a sentence.
+
+A single pass therefore builds the same transitions as building `remarkov.model.Model` once per order, but
+reads and tokenizes the input only once. This allows building all orders from streams that cannot be read
+twice, e.g. standard input. `remarkov.multi.MultiOrderModel.to_model` extracts the chain of one order.
+
+Generation can use any order up to the maximum. At dead ends, it backs off to the longest suffix of the current
+context that has successors instead of restarting at a new start state.
+
+Nodes are integer ids into flat lists instead of objects. This keeps the amount of objects tracked by the
+garbage collector at one per context, which matters more for the build time than the lookups themselves.
+"""
+
+import random
+
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from remarkov.error import NoTransitionsDefined, TokenStreamExhausted
+from remarkov.model import (
+    DEFAULT_GENERATE_WORD_AMOUNT,
+    GenerationResult,
+    Model,
+    Transitions,
+    select_rng,
+)
+from remarkov.sampling import AliasSampler
+from remarkov.tokenizer import (
+    PUNCT_TERMINATION,
+    default_tokenizer,
+    read_chunks,
+    tokenize_chunks,
+)
+from remarkov.types import State, Successors, Token, Tokenizer, TokenStream
+
+ROOT = 0
+"""Node id of the empty context."""
+
+
+class MultiOrderModel:
+    """
+    Markov chains of all orders from 1 to `max_order` built from the same text. See `remarkov.multi`.
+    """
+
+    def __init__(
+        self,
+        max_order: int = 3,
+        tokenizer: Optional[Tokenizer] = None,
+        before_insert: Optional[Callable[[str], str]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.max_order = max_order
+        self.tokenizer = tokenizer if tokenizer else default_tokenizer
+        self.before_insert = before_insert
+        # random number generator used by default. `None` uses the global generator of `random`.
+        self.rng: Optional[random.Random] = (
+            random.Random(seed) if seed is not None else None
+        )
+
+        # maps a node and the token preceding its context to the child node.
+        self.children: Dict[Tuple[int, Token], int] = {}
+        # successor counts, parent, first token and length of the context of each node.
+        self.successors: List[Successors] = [{}]
+        self.parents = array("l", [ROOT])
+        self.tokens: List[Token] = [""]
+        self.depths = array("l", [0])
+        # amount of times a node was declared a start state.
+        self.starts: Dict[int, int] = {}
+
+        # alias tables per node for successor sampling. built on first use.
+        self._samplers: Dict[int, AliasSampler[Token]] = {}
+        # alias tables of the start states per order. built on first use.
+        self._start_samplers: Dict[int, AliasSampler[State]] = {}
+
+        assert 1 <= self.max_order, "Order must be at least 1."
+
+    def __len__(self) -> int:
+        """
+        Returns the amount of contexts of all orders.
+        """
+
+        return len(self.successors) - 1
+
+    def add_text(self, text: str, tokenizer: Optional[Tokenizer] = None):
+        """
+        Insert some text into the chains of all orders.
+
+        This raises `remarkov.error.TokenStreamExhausted` if the text does not contain any tokens. Texts with
+        fewer tokens than an order do not add transitions to the chain of that order.
+        """
+
+        if tokenizer is None:
+            tokenizer = self.tokenizer
+
+        self._add_tokens(tokenizer(text))
+
+    def add_stream(self, chunks: Iterable[str], tokenizer: Optional[Tokenizer] = None):
+        """
+        Insert text that arrives in chunks. See `remarkov.model.Model.add_stream`.
+        """
+
+        if tokenizer is None:
+            tokenizer = self.tokenizer
+
+        self._add_tokens(tokenize_chunks(chunks, tokenizer))
+
+    def add_file(self, path: str, tokenizer: Optional[Tokenizer] = None):
+        """
+        Insert the content of the text file at `path` without reading it at once.
+        """
+
+        with open(path, "r") as fin:
+            self.add_stream(read_chunks(fin), tokenizer=tokenizer)
+
+    def _add_tokens(self, token_stream: TokenStream):
+        before_insert, max_order = self.before_insert, self.max_order
+        children, successors, starts = self.children, self.successors, self.starts
+        parents, tokens, depths = self.parents, self.tokens, self.depths
+
+        # the most recent tokens, newest last. one more than the order is needed for start state detection.
+        history: List[Token] = []
+        # index of the current token in the stream.
+        position = 0
+
+        for token in token_stream:
+            if before_insert:
+                token = before_insert(token)
+
+            node = ROOT
+
+            for order in range(1, min(max_order, position) + 1):
+                # `history[-order]` is the oldest token of the context of length `order`.
+                key = (node, history[-order])
+                child = children.get(key)
+
+                if child is None:
+                    child = children[key] = len(successors)
+                    successors.append({})
+                    parents.append(node)
+                    tokens.append(key[1])
+                    depths.append(order)
+
+                node = child
+                counts = successors[node]
+                counts[token] = counts.get(token, 0) + 1
+
+                # the same rules as `remarkov.model.Model._add_tokens` apply for every order.
+                if order == position or history[-order - 1] in PUNCT_TERMINATION:
+                    starts[node] = starts.get(node, 0) + 1
+
+            history.append(token)
+            position += 1
+
+            if max_order < len(history) - 1:
+                del history[0]
+
+        if not history:
+            raise TokenStreamExhausted()
+
+        # the sampling tables are outdated now.
+        self._samplers, self._start_samplers = {}, {}
+
+    def state(self, node: int) -> State:
+        """
+        Returns the context of `node` in reading order.
+        """
+
+        state = []
+
+        while node != ROOT:
+            state.append(self.tokens[node])
+            node = self.parents[node]
+
+        return tuple(state)
+
+    def _iter_contexts(self, order: int) -> Iterator[int]:
+        """
+        Yields the nodes of all contexts of length `order`.
+        """
+
+        for node, depth in enumerate(self.depths):
+            if depth == order:
+                yield node
+
+    def _get_rng(
+        self, rng: Optional[random.Random] = None, seed: Optional[int] = None
+    ) -> random.Random:
+        """
+        Select the random number generator for a generation call. See `remarkov.model.select_rng`.
+        """
+
+        return select_rng(rng, seed, self.rng)
+
+    def _sample_start(self, order: int, random_float: Callable[[], float]) -> State:
+        sampler = self._start_samplers.get(order)
+
+        if sampler is None:
+            depths = self.depths
+            starts = [
+                (node, count)
+                for node, count in self.starts.items()
+                if depths[node] == order
+            ]
+
+            if not starts:
+                raise NoTransitionsDefined()
+
+            sampler = self._start_samplers[order] = AliasSampler(
+                [self.state(node) for node, _ in starts],
+                [count for _, count in starts],
+            )
+
+        return sampler.sample(random_float)
+
+    def find_context(self, context: Iterable[Token], backoff: bool = False) -> int:
+        """
+        Returns the node of `context` or `remarkov.multi.ROOT` if it is unknown. With `backoff`, the node of its
+        longest known suffix is returned instead.
+        """
+
+        children, node = self.children, ROOT
+
+        for token in reversed(tuple(context)):
+            child = children.get((node, token))
+
+            if child is None:
+                return node if backoff else ROOT
+
+            node = child
+
+        return node
+
+    def _generate_stream(self, order: int, backoff: bool, rng=random):
+        """
+        Creates an endless stream of words using contexts of length `order`.
+        """
+
+        random_float, samplers = rng.random, self._samplers
+        context = list(self._sample_start(order, random_float))
+
+        yield from context
+
+        while True:
+            node = self.find_context(context, backoff)
+
+            if node == ROOT:
+                # neither the context nor a suffix has successors. restart with a new state.
+                context = list(self._sample_start(order, random_float))
+
+                yield from context
+                continue
+
+            sampler = samplers.get(node)
+
+            if sampler is None:
+                successors = self.successors[node]
+                sampler = samplers[node] = AliasSampler(
+                    list(successors.keys()), list(successors.values())
+                )
+
+            token = sampler.sample(random_float)
+
+            context.append(token)
+            del context[0]
+
+            yield token
+
+    def generate(
+        self,
+        word_amount: int = DEFAULT_GENERATE_WORD_AMOUNT,
+        order: Optional[int] = None,
+        backoff: bool = True,
+        rng: Optional[random.Random] = None,
+        seed: Optional[int] = None,
+    ) -> GenerationResult:
+        """
+        Generate a random text with `word_amount` tokens from the chain of `order`, by default the maximum order.
+
+        If `backoff` is set, contexts without successors continue with the successors of their longest known
+        suffix. Otherwise, generation restarts at a new start state like `remarkov.model.Model.generate`.
+        Random numbers are selected like in `remarkov.model.Model.generate`.
+        """
+
+        order = self.max_order if order is None else order
+        assert 1 <= order <= self.max_order, f"Order must be in 1..{self.max_order}."
+
+        stream = self._generate_stream(order, backoff, self._get_rng(rng, seed))
+        return GenerationResult(next(stream) for _ in range(word_amount))
+
+    def to_model(self, order: int) -> Model:
+        """
+        Extract the chain of `order` into a `remarkov.model.Model`. The result has the same transitions and
+        start states as a model of `order` that was built from the same texts.
+        """
+
+        assert 1 <= order <= self.max_order, f"Order must be in 1..{self.max_order}."
+
+        model = Model(
+            order=order, tokenizer=self.tokenizer, before_insert=self.before_insert
+        )
+        model.rng = self.rng
+        # a new model without storage keeps its transitions in memory.
+        transitions = model.transitions
+        assert isinstance(transitions, Transitions)
+
+        for node in self._iter_contexts(order):
+            state = self.state(node)
+
+            for token, count in self.successors[node].items():
+                transitions.declare(state, token, count)
+
+            if node in self.starts:
+                transitions.declare_start(state, self.starts[node])
+
+        return model
@@ -0,0 +1,68 @@
+"""
+Builds models from several files using multiple processes.
+
+Each file is added to its own model in a worker process. The partial models are then merged using
+`remarkov.model.Model.merge`. Tokenizer and `before_insert` callback must be picklable for this, i.e. they
+have to be defined on module level.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
+
+from remarkov.model import Model
+from remarkov.types import Tokenizer
+
+
+def _build_shard(
+    path: str,
+    order: int,
+    tokenizer: Optional[Tokenizer],
+    before_insert: Optional[Callable[[str], str]],
+    intern: bool,
+) -> Model:
+    model = Model(
+        order=order, tokenizer=tokenizer, before_insert=before_insert, intern=intern
+    )
+    model.add_file(path)
+
+    return model
+
+
+def build_parallel(
+    paths: List[str],
+    workers: Optional[int] = None,
+    order: int = 1,
+    tokenizer: Optional[Tokenizer] = None,
+    before_insert: Optional[Callable[[str], str]] = None,
+    intern: bool = False,
+) -> Model:
+    """
+    Create a model from the text files in `paths` using `workers` processes (default: number of CPUs).
+
+    The result has the same transitions as adding each file to one model sequentially.
+    """
+
+    model = Model(
+        order=order, tokenizer=tokenizer, before_insert=before_insert, intern=intern
+    )
+    build_shard = partial(
+        _build_shard,
+        order=order,
+        tokenizer=tokenizer,
+        before_insert=before_insert,
+        intern=intern,
+    )
+
+    if 1 == workers or len(paths) <= 1:
+        for path in paths:
+            model.merge(build_shard(path))
+
+        return model
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # results arrive in input order which keeps the order of states stable.
+        for shard in executor.map(build_shard, paths):
+            model.merge(shard)
+
+    return model
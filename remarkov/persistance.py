@@ -1,92 +1,566 @@
-from collections import defaultdict
-from json import JSONDecoder, JSONEncoder
-from typing import Dict, List, Union
+import mmap
+import os
+import re
+import struct
+import sys
 
-from remarkov.types import Token
+from array import array
+from json import JSONDecodeError, JSONDecoder, JSONEncoder
+from typing import (
+    BinaryIO,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
+
+from remarkov.error import InvalidModelFile
+from remarkov.frozen import INDEX_TYPECODE, TOKEN_ID_TYPECODE, IntArray
+from remarkov.types import State, StoredState, Successors, Token
 
 ORDER, TRANSITIONS, START_STATES = "order", "transitions", "start_states"
+START_STATE_COUNTS = "start_state_counts"
 DEFAULT_JSON_INDENT = 4
 DEFAULT_PERSISTANCE_VERSION = 2
+DEFAULT_READ_CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r"[ \t\n\r]*")
 
 
 class GenericEncoder(JSONEncoder):
     def __init__(self, compress: bool):
         super().__init__(indent=None if compress else DEFAULT_JSON_INDENT)
 
-    def _adapt_tokens(
-        self, tokens: List[Token]
-    ) -> Union[Dict[Token, int], List[Token]]:
+    def _adapt_tokens(self, tokens: Successors) -> Union[Successors, List[Token]]:
+        raise NotImplementedError()
+
+    def _adapt_start_states(self, obj) -> Iterator[Tuple[str, Iterable]]:
+        """
+        Yields the key and the items of each start state attribute. Items are produced lazily.
+        """
+
         raise NotImplementedError()
 
+    def _iter_transitions(self, obj) -> Iterator[dict]:
+        # save each transition as an object
+        for state, tokens in obj.transitions.items():
+            yield {
+                "state": list(self._resolve_state(obj, state)),
+                "tokens": self._adapt_tokens(self._resolve_successors(obj, tokens)),
+            }
+
+    def _iter_live_start_states(self, obj) -> Iterator[Tuple[State, int]]:
+        # start states without successors are never selected. they are skipped without modifying the model.
+        transitions = obj.transitions
+
+        for state, count in transitions.start_states.items():
+            if state in transitions:
+                yield state, count
+
+    def _iter_start_states(self, obj) -> Iterator[Tuple[List[Token], int]]:
+        for state, count in self._iter_live_start_states(obj):
+            yield list(self._resolve_state(obj, state)), count
+
     def default(self, obj):
         return {
             ORDER: obj.order,
-            # save each transition as an object
-            TRANSITIONS: [
-                {"state": list(state), "tokens": self._adapt_tokens(tokens)}
-                for state, tokens in obj.transitions.items()
-            ],
-            START_STATES: [list(state) for state in obj.transitions.start_states],
+            TRANSITIONS: list(self._iter_transitions(obj)),
+            **{key: list(items) for key, items in self._adapt_start_states(obj)},
         }
 
+    def dump(self, obj, fout: TextIO):
+        """
+        Writes the model `obj` to the file object `fout` one transition at a time.
+
+        The output is identical to `encode(obj)`, but only a single transition is held in memory at once.
+        """
+
+        if self.indent is None:
+            item_separator, newline, indent = ", ", "", ""
+        else:
+            item_separator, newline = ",", "\n"
+            indent = " " * self.indent if isinstance(self.indent, int) else self.indent
+
+        members: List[Tuple[str, Iterable]] = [
+            (TRANSITIONS, self._iter_transitions(obj)),
+            *self._adapt_start_states(obj),
+        ]
+
+        fout.write("{" + newline + indent + f"{self.encode(ORDER)}: ")
+        fout.write(self.encode(obj.order))
+
+        for key, items in members:
+            fout.write(item_separator + newline + indent + f"{self.encode(key)}: [")
+            empty = True
+
+            for item in items:
+                fout.write(("" if empty else item_separator) + newline + indent * 2)
+                # json strings never contain raw newlines.
+                fout.write(self.encode(item).replace("\n", "\n" + indent * 2))
+                empty = False
+
+            fout.write("]" if empty else newline + indent + "]")
+
+        fout.write(newline + "}")
+
+    def _resolve_state(self, obj, state) -> State:
+        # interned models store ids which have to be translated back into tokens.
+        if obj.vocabulary is None:
+            return state
+
+        return obj.vocabulary.resolve_state(state)
+
+    def _resolve_successors(self, obj, tokens) -> Successors:
+        if obj.vocabulary is None:
+            return tokens
+
+        return obj.vocabulary.resolve_successors(tokens)
+
 
 class GenericDecoder(JSONDecoder):
-    def __init__(self):
+    def __init__(self, intern: bool = False):
         super().__init__(object_hook=self.__object_hook)
+        self.intern = intern
+
+    def _intern_state(self, model, state: State):
+        if model.vocabulary is None:
+            return state
+
+        return model.vocabulary.intern_state(state)
+
+    def _intern_token(self, model, token: Token):
+        if model.vocabulary is None:
+            return token
+
+        return model.vocabulary.intern(token)
 
     def _declare_transitions(
-        self, model, state, tokens: Union[Dict[Token, int], List[Token]]
+        self, model, state, tokens: Union[Successors, List[Token]]
     ):
         raise NotImplementedError()
 
+    def _declare_transition(self, model, transition: dict):
+        state = self._intern_state(model, tuple(transition["state"]))
+        self._declare_transitions(model, state, transition["tokens"])
+
+    def _declare_start(self, model, start_state: List[Token], count: int = 1):
+        model.transitions.declare_start(
+            self._intern_state(model, tuple(start_state)), count
+        )
+
+    def _declare_start_counts(
+        self, model, start_states: List[List[Token]], counts: List[int]
+    ):
+        """
+        Apply the weights of start states that were declared once each.
+        """
+
+        for start_state, count in zip(start_states, counts):
+            if 1 < count:
+                self._declare_start(model, start_state, count - 1)
+
+    def load(self, fin: TextIO):
+        """
+        Reads a model from the file object `fin` without holding the whole document in memory.
+
+        Transitions and start states are inserted one at a time while the file is being read.
+        """
+
+        from remarkov.model import Model
+
+        reader = JSONStreamReader(fin)
+        remarkov, keys = Model(intern=self.intern), set()
+        start_state_counts = []
+
+        for key in reader.object_keys():
+            if TRANSITIONS == key:
+                for transition in reader.array_items():
+                    self._declare_transition(remarkov, transition)
+
+            elif START_STATES == key:
+                for start_state in reader.array_items():
+                    self._declare_start(remarkov, start_state)
+
+            elif START_STATE_COUNTS == key:
+                start_state_counts = reader.value()
+
+            elif ORDER == key:
+                remarkov.order = reader.value()
+
+            else:
+                reader.value()
+
+            keys.add(key)
+
+        if not {ORDER, TRANSITIONS, START_STATES} <= keys:
+            raise InvalidModelFile("missing model attributes")
+
+        if start_state_counts:
+            # files with counts list each start state once. the new model keeps them in the same order, so the
+            # start states do not have to be collected while they are read.
+            start_states = cast(
+                List[StoredState], list(remarkov.transitions.start_states)
+            )
+
+            for state, count in zip(start_states, start_state_counts):
+                if 1 < count:
+                    remarkov.transitions.declare_start(state, count - 1)
+
+        return remarkov
+
     def __object_hook(self, obj):
         if ORDER in obj and TRANSITIONS in obj and START_STATES in obj:
             from remarkov.model import Model
 
-            remarkov = Model()
+            remarkov = Model(intern=self.intern)
             remarkov.order = obj[ORDER]
 
             for transition in obj[TRANSITIONS]:
-                state = tuple(transition["state"])
-                self._declare_transitions(remarkov, state, transition["tokens"])
+                self._declare_transition(remarkov, transition)
 
             for start_state in obj[START_STATES]:
-                remarkov.transitions.declare_start(tuple(start_state))
+                self._declare_start(remarkov, start_state)
+
+            self._declare_start_counts(
+                remarkov, obj[START_STATES], obj.get(START_STATE_COUNTS, [])
+            )
 
             return remarkov
 
         return obj
 
 
+class JSONStreamReader:
+    """
+    Minimal pull parser for reading large JSON documents from a file object.
+
+    Containers can be traversed with `object_keys` and `array_items`. Everything else is read in one piece
+    using `value`.
+    """
+
+    def __init__(self, fin: TextIO, chunk_size: int = DEFAULT_READ_CHUNK_SIZE):
+        self.fin = fin
+        self.chunk_size = chunk_size
+        self.buffer, self.position, self.eof = "", 0, False
+        self.decoder = JSONDecoder()
+
+    def _fill(self, size: int = 0) -> bool:
+        """
+        Append the next chunk of the file to the buffer. Returns `False` if the file is exhausted.
+        """
+
+        chunk = self.fin.read(max(size, self.chunk_size))
+
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+        return True
+
+    def _peek(self) -> str:
+        """
+        Skip whitespace and return the next character without consuming it.
+        """
+
+        while True:
+            # the pattern matches empty strings, so there always is a match.
+            self.position = WHITESPACE.match(self.buffer, self.position).end()  # type: ignore
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self._fill():
+                raise InvalidModelFile("unexpected end of file")
+
+    def _expect(self, char: str):
+        if char != self._peek():
+            raise InvalidModelFile(f"expected {char!r} at offset {self.position}")
+
+        self.position += 1
+
+    def _continue_container(self, end: str) -> bool:
+        """
+        Consume the separator after a container item. Returns `False` if the container was closed.
+        """
+
+        if "," == self._peek():
+            self.position += 1
+            return True
+
+        self._expect(end)
+        return False
+
+    def value(self):
+        """
+        Read the next value.
+        """
+
+        self._peek()
+        size = self.chunk_size
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+
+                # numbers could continue in the next chunk.
+                # only trust values that are followed by something.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+
+            except JSONDecodeError:
+                if self.eof:
+                    raise InvalidModelFile(f"invalid value at offset {self.position}")
+
+            # read larger chunks for big values to avoid parsing the same prefix again.
+            self._fill(size)
+            size *= 2
+
+    def object_keys(self) -> Iterator[str]:
+        """
+        Iterate the keys of the next object. The value of each key must be consumed before advancing.
+        """
+
+        self._expect("{")
+
+        if "}" == self._peek():
+            self.position += 1
+            return
+
+        while True:
+            key = self.value()
+            self._expect(":")
+
+            yield key
+
+            if not self._continue_container("}"):
+                return
+
+    def array_items(self) -> Iterator:
+        """
+        Iterate the values of the next array.
+        """
+
+        self._expect("[")
+
+        if "]" == self._peek():
+            self.position += 1
+            return
+
+        while True:
+            yield self.value()
+
+            if not self._continue_container("]"):
+                return
+
+
 class V1Decoder(GenericDecoder):
     def _declare_transitions(
-        self, model, state, tokens: Union[Dict[Token, int], List[Token]]
+        self, model, state, tokens: Union[Successors, List[Token]]
     ):
         for token in tokens:
-            model.transitions.declare(state, token)
+            model.transitions.declare(state, self._intern_token(model, token))
 
 
 class V1Encoder(GenericEncoder):
-    def _adapt_tokens(
-        self, tokens: List[Token]
-    ) -> Union[Dict[Token, int], List[Token]]:
-        return tokens
+    def _adapt_tokens(self, tokens: Successors) -> Union[Successors, List[Token]]:
+        # v1 stores one list entry per observed transition.
+        return [token for token, count in tokens.items() for _ in range(count)]
+
+    def _adapt_start_states(self, obj) -> Iterator[Tuple[str, Iterable]]:
+        # the same goes for start states.
+        yield START_STATES, (
+            state for state, count in self._iter_start_states(obj) for _ in range(count)
+        )
 
 
 class V2Decoder(GenericDecoder):
     def _declare_transitions(
-        self, model, state, tokens: Union[Dict[Token, int], List[Token]]
+        self, model, state, tokens: Union[Successors, List[Token]]
     ):
         for token, count in tokens.items():
-            for _ in range(count):
-                model.transitions.declare(state, token)
+            model.transitions.declare(state, self._intern_token(model, token), count)
 
 
 class V2Encoder(GenericEncoder):
-    def _adapt_tokens(
-        self, tokens: List[Token]
-    ) -> Union[Dict[Token, int], List[Token]]:
-        count_aggregation = defaultdict(int)
-        for token in tokens:
-            count_aggregation[token] += 1
-        return count_aggregation
+    def _adapt_tokens(self, tokens: Successors) -> Union[Successors, List[Token]]:
+        return tokens
+
+    def _adapt_start_states(self, obj) -> Iterator[Tuple[str, Iterable]]:
+        # each start state is listed once. older readers simply ignore the counts.
+        yield START_STATES, (state for state, _ in self._iter_start_states(obj))
+
+        if any(1 < count for _, count in self._iter_live_start_states(obj)):
+            yield START_STATE_COUNTS, (
+                count for _, count in self._iter_live_start_states(obj)
+            )
+
+
+V3_MAGIC = b"RMKV"
+V3_HEADER = struct.Struct("<4sIIIQQQQQ")
+"""magic, version, order, padding, vocabulary size, token bytes, states, successors, start states."""
+V3_ALIGNMENT = 8
+
+
+def is_binary_model(path: str) -> bool:
+    """
+    Returns whether the file at `path` starts with `V3_MAGIC`, i.e. contains a version 3 model.
+    """
+
+    with open(path, "rb") as fin:
+        return V3_MAGIC == fin.read(len(V3_MAGIC))
+
+
+class V3Encoder:
+    """
+    Writes a frozen model in the binary v3 format.
+
+    The file starts with `V3_HEADER` which is followed by these sections, each aligned to 8 bytes:
+
+    - vocabulary offsets (`INDEX_TYPECODE`): byte offset of each token inside the token section.
+    - tokens: all tokens UTF-8 encoded and concatenated.
+    - the arrays of `remarkov.frozen.FrozenTransitions` in order: states, offsets, successors,
+      cumulative weights, start states and start state weights.
+
+    All numbers are little-endian.
+    """
+
+    def dump(self, model, fout: BinaryIO):
+        from remarkov.frozen import FrozenTransitions
+
+        if not isinstance(model.transitions, FrozenTransitions):
+            model = model.freeze()
+
+        transitions, vocabulary = model.transitions, model.vocabulary
+
+        encoded_tokens = [token.encode("utf-8") for token in vocabulary.tokens]
+        token_offsets = array(INDEX_TYPECODE, [0])
+        for encoded_token in encoded_tokens:
+            token_offsets.append(token_offsets[-1] + len(encoded_token))
+
+        fout.write(
+            V3_HEADER.pack(
+                V3_MAGIC,
+                3,
+                model.order,
+                0,
+                len(vocabulary),
+                token_offsets[-1],
+                len(transitions),
+                len(transitions.successors),
+                len(transitions.start_states),
+            )
+        )
+
+        self._write_array(fout, INDEX_TYPECODE, token_offsets)
+
+        for encoded_token in encoded_tokens:
+            fout.write(encoded_token)
+        self._write_padding(fout, token_offsets[-1])
+
+        self._write_array(fout, TOKEN_ID_TYPECODE, transitions.states)
+        self._write_array(fout, INDEX_TYPECODE, transitions.offsets)
+        self._write_array(fout, TOKEN_ID_TYPECODE, transitions.successors)
+        self._write_array(fout, INDEX_TYPECODE, transitions.cum_weights)
+        self._write_array(fout, TOKEN_ID_TYPECODE, transitions.start_states.states.flat)
+        self._write_array(fout, INDEX_TYPECODE, transitions.start_states.weights)
+
+    def _write_array(self, fout: BinaryIO, typecode: str, values: Sequence[int]):
+        data = values if isinstance(values, (array, memoryview)) else None
+
+        if data is None or "big" == sys.byteorder:
+            data = array(typecode, values)
+
+            if "big" == sys.byteorder:
+                data.byteswap()
+
+        fout.write(data)
+        self._write_padding(fout, len(values) * array(typecode).itemsize)
+
+    def _write_padding(self, fout: BinaryIO, size: int):
+        fout.write(b"\0" * (-size % V3_ALIGNMENT))
+
+
+class V3Decoder:
+    """
+    Maps a binary v3 model into memory. The arrays of the model are used without copying them so loading is
+    almost instant and the operating system can share the pages between processes.
+    """
+
+    def load(self, path: str):
+        from remarkov.frozen import FrozenTransitions
+        from remarkov.model import Model
+        from remarkov.vocabulary import Vocabulary
+
+        with open(path, "rb") as fin:
+            if os.fstat(fin.fileno()).st_size < V3_HEADER.size:
+                raise InvalidModelFile("file is too small")
+
+            # the mapping stays valid after the file is closed.
+            buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            order,
+            _,
+            vocabulary_size,
+            token_size,
+            states,
+            successors,
+            start_states,
+        ) = V3_HEADER.unpack_from(buffer)
+
+        if V3_MAGIC != magic or 3 != version:
+            raise InvalidModelFile("not a version 3 model")
+
+        self.view, self.position = memoryview(buffer), V3_HEADER.size
+
+        token_offsets = self._read_array(INDEX_TYPECODE, vocabulary_size + 1)
+        token_bytes = self._read_bytes(token_size)
+        tokens = [
+            str(token_bytes[token_offsets[i] : token_offsets[i + 1]], "utf-8")
+            for i in range(vocabulary_size)
+        ]
+
+        model = Model(order=order)
+        model.vocabulary = Vocabulary.from_tokens(tokens)
+        model.transitions = FrozenTransitions(
+            order,
+            self._read_array(TOKEN_ID_TYPECODE, states * order),
+            self._read_array(INDEX_TYPECODE, states + 1),
+            self._read_array(TOKEN_ID_TYPECODE, successors),
+            self._read_array(INDEX_TYPECODE, successors),
+            self._read_array(TOKEN_ID_TYPECODE, start_states * order),
+            self._read_array(INDEX_TYPECODE, start_states),
+        )
+
+        return model
+
+    def _read_bytes(self, size: int) -> memoryview:
+        start = self.position
+        end = start + size
+
+        if len(self.view) < end:
+            raise InvalidModelFile("file is truncated")
+
+        self.position = end + (-size % V3_ALIGNMENT)
+        return self.view[start:end]
+
+    def _read_array(self, typecode: str, length: int) -> IntArray:
+        data = self._read_bytes(length * array(typecode).itemsize)
+
+        if "big" == sys.byteorder:
+            # fall back to a converted copy on big-endian machines.
+            values = array(typecode, data.tobytes())
+            values.byteswap()
+            return values
+
+        # the typecodes are valid struct formats, which the stubs only accept as literals.
+        return data.cast(typecode)  # type: ignore
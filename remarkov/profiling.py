@@ -0,0 +1,137 @@
+"""
+Implements opt-in instrumentation of building, encoding and generating.
+
+Assign a `remarkov.profiling.Profiler` to `remarkov.model.Model.profiler` to count and time the phases of a model:
+
+- `tokenize`: pulling tokens from the tokenizer, including reading the input.
+- `prepare`: calling `before_insert` and interning tokens.
+- `declare` and `declare_start`: inserting transitions and start states.
+- `encode`: serializing the model.
+- `start_state` and `sample`: selecting start states and successors during generation.
+- `restart`: dead ends that caused generation to continue at a new start state. These are counted, not timed.
+
+Without a profiler, models do not call into this module at all. Timing single tokens is expensive, so profiled
+calls run noticeably slower than unprofiled ones.
+"""
+
+import time
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class PhaseMetrics:
+    """
+    Amount of calls and total time spent in one phase.
+    """
+
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds}
+
+
+class Profiler:
+    """
+    Collects `remarkov.profiling.PhaseMetrics` by phase name.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseMetrics] = {}
+
+    def _get(self, phase: str) -> PhaseMetrics:
+        metrics = self.phases.get(phase)
+
+        if metrics is None:
+            metrics = self.phases[phase] = PhaseMetrics()
+
+        return metrics
+
+    def record(self, phase: str, seconds: float, calls: int = 1):
+        metrics = self._get(phase)
+        metrics.calls += calls
+        metrics.seconds += seconds
+
+    def count(self, phase: str, calls: int = 1):
+        """
+        Count an event without timing it.
+        """
+
+        self._get(phase).calls += calls
+
+    @contextmanager
+    def measure(self, phase: str):
+        """
+        Time the body of a `with` statement.
+        """
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def wrap(self, phase: str, func: Callable[..., T]) -> Callable[..., T]:
+        """
+        Returns a function that times each call of `func`.
+        """
+
+        metrics, perf_counter = self._get(phase), time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.calls += 1
+                metrics.seconds += perf_counter() - start
+
+        return wrapper
+
+    def iterate(self, phase: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Yields from `iterable` and times the production of each item.
+        """
+
+        metrics, perf_counter = self._get(phase), time.perf_counter
+        iterator = iter(iterable)
+
+        while True:
+            start = perf_counter()
+
+            try:
+                item = next(iterator)
+            except StopIteration:
+                metrics.seconds += perf_counter() - start
+                return
+
+            metrics.calls += 1
+            metrics.seconds += perf_counter() - start
+
+            yield item
+
+    def to_dict(self) -> dict:
+        return {phase: metrics.to_dict() for phase, metrics in self.phases.items()}
+
+    def summary(self) -> str:
+        """
+        Returns a table of all phases sorted by total time.
+        """
+
+        lines = [f"{'phase':<16}{'calls':>12}{'seconds':>12}{'us/call':>12}"]
+        phases = sorted(self.phases.items(), key=lambda item: -item[1].seconds)
+
+        for phase, metrics in phases:
+            calls, seconds = metrics.calls, metrics.seconds
+            per_call = 1e6 * seconds / calls if calls else 0.0
+            lines.append(f"{phase:<16}{calls:>12}{seconds:>12.4f}{per_call:>12.2f}")
+
+        return "\n".join(lines)
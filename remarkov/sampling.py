@@ -0,0 +1,67 @@
+"""
+Implements weighted random selection of successor tokens.
+
+`remarkov.sampling.AliasSampler` uses Vose's variant of Walker's alias method. Building the tables takes linear
+time in the number of distinct values, but afterwards each draw costs a single random number and two list lookups
+no matter how skewed the weights are.
+"""
+
+import random
+
+from typing import Callable, Generic, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasSampler(Generic[T]):
+    """
+    Draws a value from `values` with a probability proportional to its entry in `weights`.
+    """
+
+    __slots__ = ("values", "probabilities", "aliases")
+
+    def __init__(self, values: Sequence[T], weights: Sequence[float]):
+        assert values, "Cannot sample from an empty sequence."
+
+        size, total = len(values), sum(weights)
+        scaled = [weight * size / total for weight in weights]
+
+        self.values: List[T] = list(values)
+        self.probabilities: List[float] = [1.0] * size
+        self.aliases: List[T] = list(values)
+
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if 1.0 <= weight]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+
+            # the remaining probability mass of column `less` is taken from `more`.
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = self.values[more]
+
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # all remaining columns are full. leftovers in `small` are caused by rounding errors.
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def sample(self, random: Callable[[], float] = random.random) -> T:
+        """
+        Draw a value. `random` must return a float in the interval [0, 1).
+        """
+
+        # the integer part selects the column, the fractional part decides between value and alias.
+        x = random() * len(self.values)
+        column = int(x)
+
+        if x - column < self.probabilities[column]:
+            return self.values[column]
+
+        return self.aliases[column]
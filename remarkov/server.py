@@ -0,0 +1,304 @@
+"""
+Implements a small HTTP server that keeps models in memory and generates text on request.
+
+Models are loaded once on startup. Requests are answered with JSON:
+
+- `GET /generate?model=<name>&words=<amount>[&seed=<seed>]` returns `{"text": ...}`.
+- `GET /generate_sentences?model=<name>&sentences=<amount>[&seed=<seed>]` returns `{"text": ...}`.
+- `GET /models` lists the names of all loaded models.
+- `GET /metrics` returns request counts and latencies per endpoint.
+
+The `model` parameter can be omitted if only one model is loaded. Text generation runs in a pool of
+worker threads so the event loop stays responsive while large texts are being generated.
+"""
+
+import asyncio
+import json
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from remarkov.model import (
+    DEFAULT_GENERATE_SENTENCE_AMOUNT,
+    DEFAULT_GENERATE_WORD_AMOUNT,
+    GenerationResult,
+    Model,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_MAX_WORDS = 100000
+"""Upper limit for the amount of words per request. It applies to all sentences of a request together."""
+LATENCY_WINDOW = 1000
+"""Amount of recent requests used for calculating latency percentiles."""
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EndpointMetrics:
+    """
+    Counts requests of one endpoint and keeps the latencies of the most recent ones.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds: float, failed: bool):
+        self.requests += 1
+        self.errors += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.latencies.append(seconds)
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        mean = self.total_seconds / self.requests if self.requests else None
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_seconds": mean,
+            "max_seconds": self.max_seconds,
+            "p50_seconds": percentile(0.5),
+            "p95_seconds": percentile(0.95),
+            "p99_seconds": percentile(0.99),
+        }
+
+
+class ModelServer:
+    """
+    Answers generation requests for a set of named models.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, Model],
+        workers: Optional[int] = None,
+        max_words: int = DEFAULT_MAX_WORDS,
+    ):
+        assert models, "At least one model is required."
+
+        self.models = models
+        self.max_words = max_words
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.metrics: Dict[str, EndpointMetrics] = {}
+
+        self.routes: Dict[str, Callable[[Dict[str, str]], dict]] = {
+            "/generate": self._generate,
+            "/generate_sentences": self._generate_sentences,
+            "/models": lambda _: {"models": sorted(self.models)},
+            "/metrics": lambda _: self._metrics(),
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def _get_model(self, params: Dict[str, str]) -> Model:
+        name = params.get("model")
+
+        if name is None and 1 == len(self.models):
+            return next(iter(self.models.values()))
+
+        if name not in self.models:
+            raise RequestError(404, f"unknown model {name!r}")
+
+        return self.models[name]
+
+    def _get_int(self, params: Dict[str, str], key: str, default: int) -> int:
+        try:
+            value = int(params.get(key, default))
+        except ValueError:
+            raise RequestError(400, f"{key} must be an integer")
+
+        if not 0 < value <= self.max_words:
+            raise RequestError(400, f"{key} must be between 1 and {self.max_words}")
+
+        return value
+
+    def _get_seed(self, params: Dict[str, str]) -> Optional[int]:
+        if "seed" not in params:
+            return None
+
+        try:
+            return int(params["seed"])
+        except ValueError:
+            raise RequestError(400, "seed must be an integer")
+
+    def _generate(self, params: Dict[str, str]) -> dict:
+        model = self._get_model(params)
+        words = self._get_int(params, "words", DEFAULT_GENERATE_WORD_AMOUNT)
+
+        return {"text": model.generate(words, seed=self._get_seed(params)).text()}
+
+    def _generate_sentences(self, params: Dict[str, str]) -> dict:
+        model = self._get_model(params)
+        sentences = self._get_int(params, "sentences", DEFAULT_GENERATE_SENTENCE_AMOUNT)
+        result = model.generate_sentences(
+            sentences, seed=self._get_seed(params), max_tokens=self.max_words
+        )
+        # all sentences share one budget so that a request can never keep a worker busy for long. sentences
+        # are generated lazily, so at most one sentence beyond the budget is generated.
+        tokens = list(islice(result.output_stream, self.max_words + 1))
+
+        if self.max_words < len(tokens):
+            raise RequestError(400, f"sentences exceed {self.max_words} words")
+
+        return {"text": GenerationResult(iter(tokens)).text()}
+
+    def _metrics(self) -> dict:
+        return {path: metrics.to_dict() for path, metrics in self.metrics.items()}
+
+    async def _dispatch(self, method: str, target: str) -> Tuple[str, dict]:
+        url = urlsplit(target)
+
+        if url.path not in self.routes:
+            raise RequestError(404, f"unknown path {url.path!r}")
+
+        if "GET" != method:
+            raise RequestError(405, f"method {method} is not allowed")
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self.executor, self.routes[url.path], params)
+
+        return url.path, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Answers a single HTTP request on a connection and closes it.
+        """
+
+        start, path, status = time.perf_counter(), None, 200
+
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            method, target, _ = head.decode("latin-1").split("\r\n", 1)[0].split(" ", 2)
+
+            path, body = await self._dispatch(method, target)
+
+        except RequestError as e:
+            status, body = e.status, {"error": str(e)}
+
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            status, body = 400, {"error": "malformed request"}
+
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+            + payload
+        )
+
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+        if path is None:
+            path = "invalid"
+
+        self.metrics.setdefault(path, EndpointMetrics()).record(
+            time.perf_counter() - start, 200 != status
+        )
+
+    async def start(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        unix_socket: Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        """
+        Start listening on `host`:`port` or on `unix_socket` if it is set.
+        """
+
+        if unix_socket is not None:
+            return await asyncio.start_unix_server(self.handle, path=unix_socket)
+
+        return await asyncio.start_server(self.handle, host=host, port=port)
+
+    async def serve_forever(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        unix_socket: Optional[str] = None,
+    ):
+        server = await self.start(host=host, port=port, unix_socket=unix_socket)
+
+        async with server:
+            await server.serve_forever()
+
+
+def parse_model_argument(argument: str) -> Tuple[str, str]:
+    """
+    Split a `name=path` argument. If the name is missing, the file name without extension is used.
+    """
+
+    import os.path
+
+    if "=" in argument:
+        name, path = argument.split("=", 1)
+        return name, path
+
+    return os.path.splitext(os.path.basename(argument))[0], argument
+
+
+def serve(
+    model_arguments: List[str],
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_socket: Optional[str] = None,
+    workers: Optional[int] = None,
+):
+    """
+    Load the models given as `name=path` arguments and serve them until interrupted.
+    """
+
+    from remarkov import load_model
+
+    models = {}
+
+    for argument in model_arguments:
+        name, path = parse_model_argument(argument)
+        models[name] = load_model(path)
+
+    server = ModelServer(models, workers=workers)
+
+    try:
+        asyncio.run(server.serve_forever(host=host, port=port, unix_socket=unix_socket))
+    finally:
+        server.close()
@@ -0,0 +1,204 @@
+"""
+Implements statistics about the shape and memory footprint of a model.
+
+Use `remarkov.model.Model.stats` to collect them. Memory is estimated with `sys.getsizeof` for regular models,
+from the array sizes for frozen and suffix array models and from the used pages for SQLite databases. Objects
+shared between structures are only counted once.
+"""
+
+import math
+import sys
+
+from typing import Dict, List, Optional
+
+from remarkov.frozen import FrozenTransitions
+from remarkov.storage import SqliteTransitions
+from remarkov.suffix import SuffixTransitions
+
+
+def branching_bucket(branching: int) -> str:
+    """
+    Returns the power of two range that contains `branching`, e.g. `4-7` for 5.
+    """
+
+    lower = 1 << (branching.bit_length() - 1)
+    upper = 2 * lower - 1
+
+    return str(lower) if lower == upper else f"{lower}-{upper}"
+
+
+def entropy(counts) -> float:
+    """
+    Returns the Shannon entropy in bits of the distribution described by `counts`.
+    """
+
+    total = sum(counts)
+
+    return math.log2(total) - sum(count * math.log2(count) for count in counts) / total
+
+
+class ModelStats:
+    """
+    Output type of `remarkov.model.Model.stats`.
+    """
+
+    def __init__(self):
+        self.order = 0
+        self.frozen = False
+        self.states = 0
+        self.distinct_transitions = 0
+        self.total_transitions = 0
+        self.vocabulary_size = 0
+        self.start_states = 0
+        self.start_state_declarations = 0
+        # amount of states per branching factor range.
+        self.branching: Dict[str, int] = {}
+        self.entropies: List[float] = []
+        # estimated bytes per structure.
+        self.memory: Dict[str, int] = {}
+
+    @property
+    def start_state_duplication(self) -> Optional[float]:
+        """
+        Average amount of declarations per start state.
+        """
+
+        if not self.start_states:
+            return None
+
+        return self.start_state_declarations / self.start_states
+
+    def to_dict(self) -> dict:
+        entropies = sorted(self.entropies)
+
+        def summary() -> Optional[dict]:
+            if not entropies:
+                return None
+
+            return {
+                "min": entropies[0],
+                "mean": sum(entropies) / len(entropies),
+                "median": entropies[len(entropies) // 2],
+                "max": entropies[-1],
+            }
+
+        return {
+            "order": self.order,
+            "frozen": self.frozen,
+            "states": self.states,
+            "distinct_transitions": self.distinct_transitions,
+            "total_transitions": self.total_transitions,
+            "vocabulary_size": self.vocabulary_size,
+            "start_states": self.start_states,
+            "start_state_declarations": self.start_state_declarations,
+            "start_state_duplication": self.start_state_duplication,
+            "branching": self.branching,
+            "entropy_bits": summary(),
+            "memory_bytes": {**self.memory, "total": sum(self.memory.values())},
+        }
+
+
+def _objects_size(objects, seen: Dict[int, None]) -> int:
+    """
+    Sums the size of all `objects` that were not `seen` before.
+    """
+
+    size = 0
+
+    for obj in objects:
+        if id(obj) not in seen:
+            seen[id(obj)] = None
+            size += sys.getsizeof(obj)
+
+    return size
+
+
+def _frozen_memory(transitions: FrozenTransitions) -> Dict[str, int]:
+    start_states = transitions.start_states
+
+    return {
+        "states": memoryview(transitions.states).nbytes,
+        "offsets": memoryview(transitions.offsets).nbytes,
+        "successors": memoryview(transitions.successors).nbytes,
+        "cum_weights": memoryview(transitions.cum_weights).nbytes,
+        "start_states": memoryview(start_states.states.flat).nbytes
+        + memoryview(start_states.weights).nbytes,
+    }
+
+
+def collect_stats(model) -> ModelStats:
+    """
+    Collects the statistics of `model`. This visits every transition once.
+    """
+
+    stats = ModelStats()
+    stats.order = model.order
+    stats.frozen = isinstance(model.transitions, FrozenTransitions)
+
+    transitions = model.transitions
+    tokens = set()
+    branching: Dict[int, int] = {}
+
+    for state, successors in transitions.items():
+        counts = successors.values()
+
+        stats.states += 1
+        stats.distinct_transitions += len(successors)
+        stats.total_transitions += sum(counts)
+        stats.entropies.append(entropy(counts))
+        branching[len(successors)] = branching.get(len(successors), 0) + 1
+
+        if model.vocabulary is None:
+            tokens.update(state)
+            tokens.update(successors)
+
+    for factor in sorted(branching):
+        bucket = branching_bucket(factor)
+        stats.branching[bucket] = stats.branching.get(bucket, 0) + branching[factor]
+
+    stats.vocabulary_size = (
+        len(tokens) if model.vocabulary is None else len(model.vocabulary)
+    )
+    stats.start_states = len(transitions.start_states)
+    stats.start_state_declarations = sum(
+        count for _, count in transitions.start_states.items()
+    )
+
+    if stats.frozen:
+        stats.memory = _frozen_memory(transitions)
+
+    elif isinstance(transitions, SqliteTransitions):
+        stats.memory = {"database": transitions.estimate_size()}
+
+    elif isinstance(transitions, SuffixTransitions):
+        stats.memory = {
+            "corpus": memoryview(transitions.corpus).nbytes,
+            "suffix_array": memoryview(transitions.suffixes).nbytes,
+            "start_states": memoryview(transitions.start_offsets).nbytes,
+        }
+
+    else:
+        seen: Dict[int, None] = {}
+
+        stats.memory = {
+            "transitions": sys.getsizeof(transitions),
+            "states": _objects_size(transitions.keys(), seen),
+            "successors": _objects_size(transitions.values(), seen),
+            "start_states": sys.getsizeof(transitions.start_states),
+        }
+
+        if model.vocabulary is None:
+            stats.memory["tokens"] = sum(
+                _objects_size(state, seen) + _objects_size(successors, seen)
+                for state, successors in transitions.items()
+            )
+
+    if model.vocabulary is not None:
+        vocabulary = model.vocabulary
+        stats.memory["vocabulary"] = (
+            sys.getsizeof(vocabulary.ids)
+            + sys.getsizeof(vocabulary.tokens)
+            + sum(sys.getsizeof(token) for token in vocabulary.tokens)
+        )
+
+    return stats
@@ -0,0 +1,579 @@
+"""
+Implements storage backends for the transitions of a model.
+
+By default, transitions are kept in memory by `remarkov.model.Transitions`. Models that do not fit into memory can
+use `remarkov.storage.SqliteTransitions` instead which keeps them in an SQLite database file. Select a backend with
+the `storage` argument of `remarkov.create_model`:
+
+- `memory` (or `None`): in-memory dictionaries.
+- `sqlite:<path>`: the SQLite database at `<path>`. It is created if necessary. Existing databases are extended.
+- `suffix`: the corpus and its suffix array in memory. See `remarkov.suffix`.
+
+The SQLite backend collects declared transitions in memory and writes them in batches, each in a single
+transaction. Pending transitions are written before any read and at the end of each
+`remarkov.model.Model.add_text` call. During generation, the successors of recently used states are kept in an
+LRU cache, so frequently visited states do not hit the database at all.
+
+The distances towards sentence terminators, see `remarkov.termination`, are computed in temporary tables of the
+connection. They are neither kept in memory nor written into the model database.
+
+States are stored as compact JSON arrays of their tokens, so tokens may contain any character. Interned models
+cannot be stored in SQLite.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from remarkov.error import InvalidModelFile, InvalidStorage, NoStartStateFound
+from remarkov.sampling import AliasSampler
+from remarkov.termination import TerminationIndex, cached_termination_index
+from remarkov.types import State, Successors, Token
+
+SQLITE_PREFIX = "sqlite:"
+DEFAULT_CACHE_SIZE = 65536
+"""Amount of states whose successors are cached during generation."""
+DEFAULT_BATCH_SIZE = 100000
+"""Amount of pending transitions that triggers a write."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transitions (
+    state TEXT NOT NULL,
+    token NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (state, token)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS start_states (
+    state TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+DISTANCES_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS edges (next TEXT NOT NULL, state TEXT NOT NULL);
+CREATE TEMP TABLE IF NOT EXISTS distances (
+    state TEXT PRIMARY KEY,
+    distance INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS temp.distances_by_distance ON distances (distance);
+DELETE FROM temp.edges;
+DELETE FROM temp.distances;
+"""
+
+# marks states without successors in the sampler cache.
+_DEAD_END = object()
+
+
+def encode_state(state: State) -> str:
+    return json.dumps(list(state), ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_state(raw: str) -> State:
+    return tuple(json.loads(raw))
+
+
+class SqliteStartStates(Mapping[State, int]):
+    """
+    Read-only view of the start states of `remarkov.storage.SqliteTransitions`.
+    """
+
+    def __init__(self, transitions: "SqliteTransitions"):
+        self.transitions = transitions
+
+    def __len__(self) -> int:
+        return self.transitions._query_value("SELECT COUNT(*) FROM start_states")
+
+    def __iter__(self) -> Iterator[State]:
+        for state, _ in self.items():
+            yield state
+
+    def __getitem__(self, state: State) -> int:
+        row = self.transitions._query_one(
+            "SELECT count FROM start_states WHERE state = ?", (encode_state(state),)
+        )
+
+        if row is None:
+            raise KeyError(state)
+
+        return row[0]
+
+    def items(self):
+        for raw, count in self.transitions._query(
+            "SELECT state, count FROM start_states ORDER BY state"
+        ):
+            yield decode_state(raw), count
+
+
+class SqliteDistances(Mapping[State, int]):
+    """
+    Read-only view of the distance table of `remarkov.storage.SqliteTransitions`. See
+    `remarkov.termination.TerminationIndex`.
+    """
+
+    def __init__(self, transitions: "SqliteTransitions"):
+        self.transitions = transitions
+
+    def __len__(self) -> int:
+        return self.transitions._query_value("SELECT COUNT(*) FROM temp.distances")
+
+    def __iter__(self) -> Iterator[State]:
+        for (raw,) in self.transitions._iterate(
+            "SELECT state FROM temp.distances ORDER BY state"
+        ):
+            yield decode_state(raw)
+
+    def __getitem__(self, state: State) -> int:
+        row = self.transitions._query_one(
+            "SELECT distance FROM temp.distances WHERE state = ?",
+            (encode_state(state),),
+        )
+
+        if row is None:
+            raise KeyError(state)
+
+        return row[0]
+
+
+class SqliteTransitions:
+    """
+    Stores the transitions of a Markov chain of order `order` in the SQLite database at `path`. Pass `order=None`
+    to use the order of an existing database.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        order: Optional[int] = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        self.path = path
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+
+        # generation threads of the server share the connection. queries are serialized by the lock.
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        # declarations that were not written yet.
+        self._pending: Dict[Tuple[str, Token], int] = {}
+        self._pending_starts: Dict[str, int] = {}
+
+        self.order = self._init_order(order)
+        self.start_states = SqliteStartStates(self)
+        # successor samplers of recently used states in least recently used order.
+        self._cache: "OrderedDict[State, object]" = OrderedDict()
+        self._start_sampler: Optional[AliasSampler[State]] = None
+        self._termination: Optional[TerminationIndex] = None
+        # the distance table is shared by all threads. only one of them may rebuild it.
+        self._termination_lock = threading.Lock()
+
+    def _init_order(self, order: Optional[int]) -> int:
+        row = self._query_one("SELECT value FROM meta WHERE key = 'order'")
+
+        if row is None:
+            if order is None:
+                raise InvalidModelFile(f"{self.path} does not contain a model")
+
+            with self._lock, self.connection:
+                self.connection.execute(
+                    "INSERT INTO meta (key, value) VALUES ('order', ?)", (order,)
+                )
+
+            return order
+
+        if order is not None and order != row[0]:
+            raise InvalidModelFile(f"{self.path} contains a model of order {row[0]}")
+
+        return row[0]
+
+    def _query(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        self.flush()
+
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def _query_one(self, sql: str, parameters: tuple = ()) -> Optional[tuple]:
+        self.flush()
+
+        with self._lock:
+            return self.connection.execute(sql, parameters).fetchone()
+
+    def _query_value(self, sql: str, parameters: tuple = ()) -> Any:
+        """
+        Returns the first column of a query that always yields a row, e.g. an aggregate.
+        """
+
+        row = self._query_one(sql, parameters)
+        assert row is not None, "Query did not yield a row."
+
+        return row[0]
+
+    def _iterate(self, sql: str, parameters: tuple = ()) -> Iterator[tuple]:
+        """
+        Yields rows of a query without fetching them at once.
+        """
+
+        self.flush()
+        cursor = self.connection.cursor()
+
+        with self._lock:
+            cursor.execute(sql, parameters)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1024)
+
+            if not rows:
+                return
+
+            yield from rows
+
+    def flush(self):
+        """
+        Write all pending transitions and start states to the database in a single transaction.
+        """
+
+        if not self._pending and not self._pending_starts:
+            return
+
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO transitions (state, token, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (state, token) DO UPDATE SET count = count + excluded.count",
+                (
+                    (state, token, count)
+                    for (state, token), count in self._pending.items()
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO start_states (state, count) VALUES (?, ?) "
+                "ON CONFLICT (state) DO UPDATE SET count = count + excluded.count",
+                self._pending_starts.items(),
+            )
+
+        self._pending.clear()
+        self._pending_starts.clear()
+
+    def close(self):
+        """
+        Write pending transitions and close the database.
+        """
+
+        self.flush()
+        self.connection.close()
+
+    def _invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+        self._start_sampler, self._termination = None, None
+
+    def declare_start(self, from_: State, count: int = 1):
+        key = encode_state(from_)
+        self._pending_starts[key] = self._pending_starts.get(key, 0) + count
+        self._start_sampler, self._termination = None, None
+
+    def declare(self, from_: State, to: Token, count: int = 1):
+        key = (encode_state(from_), to)
+        self._pending[key] = self._pending.get(key, 0) + count
+
+        if self._cache:
+            self._invalidate()
+
+        self._start_sampler, self._termination = None, None
+
+        if self.batch_size <= len(self._pending):
+            self.flush()
+
+    def get(self, from_: State, default=None) -> Optional[Successors]:
+        rows = self._query(
+            "SELECT token, count FROM transitions WHERE state = ?",
+            (encode_state(from_),),
+        )
+
+        return dict(rows) if rows else default
+
+    def __getitem__(self, from_: State) -> Successors:
+        successors = self.get(from_)
+
+        if successors is None:
+            raise KeyError(from_)
+
+        return successors
+
+    def __contains__(self, from_) -> bool:
+        with self._lock:
+            cached = self._cache.get(from_)
+
+        if cached is not None:
+            return cached is not _DEAD_END
+
+        return self.get(from_) is not None
+
+    def __len__(self) -> int:
+        return self._query_value(
+            "SELECT COUNT(*) FROM (SELECT DISTINCT state FROM transitions)"
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._pending) or (
+            self._query_one("SELECT 1 FROM transitions LIMIT 1") is not None
+        )
+
+    def __iter__(self) -> Iterator[State]:
+        return self.keys()
+
+    def keys(self) -> Iterator[State]:
+        for (raw,) in self._iterate(
+            "SELECT DISTINCT state FROM transitions ORDER BY state"
+        ):
+            yield decode_state(raw)
+
+    def items(self) -> Iterator[Tuple[State, Successors]]:
+        """
+        Yields all states and their successors in a single pass over the database.
+        """
+
+        raw_state: Optional[str] = None
+        successors: Successors = {}
+
+        for raw, token, count in self._iterate(
+            "SELECT state, token, count FROM transitions ORDER BY state"
+        ):
+            if raw != raw_state:
+                if raw_state is not None:
+                    yield decode_state(raw_state), successors
+
+                raw_state, successors = raw, {}
+
+            successors[token] = count
+
+        if raw_state is not None:
+            yield decode_state(raw_state), successors
+
+    def values(self) -> Iterator[Successors]:
+        for _, successors in self.items():
+            yield successors
+
+    def sample(
+        self, from_: State, random: Callable[[], float] = random.random
+    ) -> Token:
+        """
+        Select a random successor token of state `from_` weighted by its transition count. The successors of the
+        most recently used states are cached. The cache is shared by all threads and guarded by the lock of
+        the connection.
+        """
+
+        cache = self._cache
+
+        with self._lock:
+            sampler = cache.get(from_)
+
+            if sampler is not None:
+                cache.move_to_end(from_)
+
+        if sampler is None:
+            successors = self.get(from_)
+            sampler = (
+                _DEAD_END
+                if successors is None
+                else AliasSampler(list(successors.keys()), list(successors.values()))
+            )
+
+            with self._lock:
+                cache[from_] = sampler
+
+                if self.cache_size < len(cache):
+                    cache.popitem(last=False)
+
+        if sampler is _DEAD_END:
+            raise KeyError(from_)
+
+        return sampler.sample(random)  # type: ignore
+
+    def sample_start(self, random: Callable[[], float] = random.random) -> State:
+        """
+        Select a random start state weighted by the amount of declarations. See `remarkov.model.Transitions.sample_start`.
+        """
+
+        if self._start_sampler is None:
+            rows = self._query(
+                "SELECT state, count FROM start_states AS s WHERE EXISTS "
+                "(SELECT 1 FROM transitions AS t WHERE t.state = s.state)"
+            )
+
+            if not rows:
+                if len(self.start_states):
+                    raise NoStartStateFound()
+
+                # too few sentences were imported. just pick some random state then.
+                raw = self._query_value(
+                    "SELECT DISTINCT state FROM transitions ORDER BY state LIMIT 1 OFFSET ?",
+                    (int(random() * len(self)),),
+                )
+                return decode_state(raw)
+
+            self._start_sampler = AliasSampler(
+                [decode_state(raw) for raw, _ in rows], [count for _, count in rows]
+            )
+
+        return self._start_sampler.sample(random)
+
+    def drop_dead_start_states(self):
+        self.flush()
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM start_states WHERE NOT EXISTS "
+                "(SELECT 1 FROM transitions WHERE transitions.state = start_states.state)"
+            )
+
+        self._start_sampler, self._termination = None, None
+
+    def analyze_termination(self, terminators: frozenset) -> TerminationIndex:
+        """
+        Returns the distance of each state towards `terminators`. See `remarkov.termination.TerminationIndex`.
+        The distance table is kept in a temporary table of the connection.
+        """
+
+        with self._termination_lock:
+            return cached_termination_index(self, terminators, self._compute_distances)
+
+    def _compute_distances(self, terminators: frozenset) -> SqliteDistances:
+        """
+        Runs the breadth-first search of `remarkov.termination.compute_distances` in temporary tables. The
+        reversed transitions are written in batches while the transitions are read, then each level of the
+        search is a single query.
+        """
+
+        self.flush()
+
+        with self._lock, self.connection:
+            self.connection.executescript(DISTANCES_SCHEMA)
+
+        edges: List[Tuple[str, str]] = []
+        finished: List[Tuple[str]] = []
+
+        def write():
+            with self._lock, self.connection:
+                self.connection.executemany(
+                    "INSERT INTO temp.edges (next, state) VALUES (?, ?)", edges
+                )
+                self.connection.executemany(
+                    "INSERT INTO temp.distances (state, distance) VALUES (?, 1)",
+                    finished,
+                )
+
+            edges.clear()
+            finished.clear()
+
+        for state, successors in self.items():
+            raw, shifted = encode_state(state), state[1:]
+
+            if any(token in terminators for token in successors):
+                finished.append((raw,))
+
+            for token in successors:
+                if token not in terminators:
+                    edges.append((encode_state(shifted + (token,)), raw))
+
+            if self.batch_size <= len(edges):
+                write()
+
+        write()
+
+        with self._lock, self.connection:
+            execute = self.connection.execute
+            execute("CREATE INDEX IF NOT EXISTS temp.edges_by_next ON edges (next)")
+            distance = 1
+
+            while execute(
+                "INSERT OR IGNORE INTO temp.distances (state, distance) "
+                "SELECT e.state, ? FROM temp.edges AS e JOIN temp.distances AS d "
+                "ON d.state = e.next WHERE d.distance = ?",
+                (distance + 1, distance),
+            ).rowcount:
+                distance += 1
+
+            execute("DELETE FROM temp.edges")
+
+        return SqliteDistances(self)
+
+    def prune(
+        self,
+        min_count: int = 1,
+        top_k: Optional[int] = None,
+        min_state_total: int = 1,
+    ) -> Tuple[int, int]:
+        """
+        Remove rare transitions and states. See `remarkov.model.Model.prune`. Successors with equal counts
+        are ranked by token for `top_k`. Returns the amount of removed states and transitions.
+        """
+
+        states = len(self)
+        removed_transitions = 0
+
+        with self._lock, self.connection:
+            execute = self.connection.execute
+
+            removed_transitions += execute(
+                "DELETE FROM transitions WHERE state IN (SELECT state FROM transitions "
+                "GROUP BY state HAVING SUM(count) < ?)",
+                (min_state_total,),
+            ).rowcount
+            removed_transitions += execute(
+                "DELETE FROM transitions WHERE count < ?", (min_count,)
+            ).rowcount
+
+            if top_k is not None:
+                removed_transitions += execute(
+                    "DELETE FROM transitions WHERE (state, token) IN (SELECT state, token FROM "
+                    "(SELECT state, token, ROW_NUMBER() OVER "
+                    "(PARTITION BY state ORDER BY count DESC, token) AS rank FROM transitions) "
+                    "WHERE ? < rank)",
+                    (top_k,),
+                ).rowcount
+
+        self.drop_dead_start_states()
+        self._invalidate()
+
+        return states - len(self), removed_transitions
+
+    def estimate_size(self) -> int:
+        """
+        Returns the size of the used pages of the database in bytes.
+        """
+
+        page_count = self._query_value("PRAGMA page_count")
+        free_pages = self._query_value("PRAGMA freelist_count")
+        page_size = self._query_value("PRAGMA page_size")
+
+        return (page_count - free_pages) * page_size
+
+
+def open_transitions(storage: Optional[str], order: int):
+    """
+    Creates the transitions backend for the `storage` specification. See `remarkov.storage`.
+    """
+
+    from remarkov.model import Transitions
+    from remarkov.suffix import SUFFIX_STORAGE, SuffixTransitions
+
+    if storage is None or "memory" == storage:
+        return Transitions()
+
+    if SUFFIX_STORAGE == storage:
+        return SuffixTransitions(order)
+
+    if storage.startswith(SQLITE_PREFIX):
+        return SqliteTransitions(storage[len(SQLITE_PREFIX) :], order=order)
+
+    raise InvalidStorage(storage)
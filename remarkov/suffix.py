@@ -0,0 +1,597 @@
+"""
+Implements a transition index over the corpus itself instead of a table of states.
+
+`remarkov.suffix.SuffixTransitions` stores every inserted text as a sequence of token ids, separated by
+`remarkov.suffix.SEPARATOR`, and a suffix array that lists the positions of the corpus in the lexicographic order
+of the suffixes starting there. All occurrences of a state are neighbours in the suffix array and within them,
+the occurrences are sorted by their successor. The successors of a state are found with binary searches and
+sampling picks a random occurrence in between, which weights each successor by its count.
+
+Memory is proportional to the corpus size and does not depend on the order: no state tuples are materialized.
+The same index answers queries of every order that is not lower than the one it was built with, see
+`remarkov.suffix.with_order`. In exchange, each lookup costs `O(order * log n)` instead of a hash table lookup. Recently used states are cached to make up for this.
+
+Select the engine with `remarkov.create_model(storage="suffix")`. Tokens are always interned. Only continuous
+text is stored compactly. Transitions declared out of order, e.g. by `remarkov.model.Model.merge`, take up
+`order + 2` positions each.
+"""
+
+import random
+import threading
+
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from remarkov.error import NoStartStateFound, PruningNotSupported
+from remarkov.frozen import INDEX_TYPECODE, TOKEN_ID_TYPECODE
+from remarkov.sampling import AliasSampler
+from remarkov.termination import TerminationIndex, cached_termination_index
+from remarkov.types import Successors, TokenId
+
+SUFFIX_STORAGE = "suffix"
+SEPARATOR = -1
+"""Token id between texts. It is smaller than all real ids so it sorts first."""
+DEFAULT_CACHE_SIZE = 65536
+"""Amount of states whose suffix array ranges are cached during generation."""
+
+IdState = Tuple[TokenId, ...]
+
+
+def build_suffix_array(corpus: array) -> array:
+    """
+    Returns the suffix array of `corpus` using prefix doubling. Suffixes are first sorted by their first token, then
+    by their first two, four and so on until all of them are distinct.
+    """
+
+    size = len(corpus)
+    # rank 0 is reserved for positions past the end of the corpus.
+    rank = array(INDEX_TYPECODE, (token - SEPARATOR + 1 for token in corpus))
+    suffixes = sorted(range(size), key=rank.__getitem__)
+    step = 1
+
+    while size:
+        keys = [
+            rank[position] * (size + 2)
+            + (rank[position + step] if position + step < size else 0)
+            for position in range(size)
+        ]
+        suffixes.sort(key=keys.__getitem__)
+
+        # suffixes with equal keys share a rank. ranks start at 1.
+        current, previous = 0, -1
+
+        for position in suffixes:
+            if keys[position] != previous:
+                current, previous = current + 1, keys[position]
+
+            rank[position] = current
+
+        if current == size:
+            break
+
+        step *= 2
+
+    return array(INDEX_TYPECODE, suffixes)
+
+
+class SuffixStartStates(Mapping[IdState, int]):
+    """
+    Read-only view of the start states of `remarkov.suffix.SuffixTransitions`.
+    """
+
+    def __init__(self, transitions: "SuffixTransitions"):
+        self.transitions = transitions
+
+    def _counts(self) -> Dict[IdState, int]:
+        transitions = self.transitions
+
+        if transitions._start_counts is None:
+            transitions._start_counts = self._count()
+
+        return transitions._start_counts
+
+    def _count(self) -> Dict[IdState, int]:
+        transitions = self.transitions
+        corpus, order = transitions.corpus, transitions.order
+        counts: Dict[IdState, int] = {}
+
+        for offset in transitions.start_offsets:
+            state = transitions._window(offset)
+
+            if state is None:
+                continue
+
+            # a model of this order would not have declared a start state without successor.
+            if transitions._start_order != order and (
+                len(corpus) <= offset + order or SEPARATOR == corpus[offset + order]
+            ):
+                continue
+
+            counts[state] = counts.get(state, 0) + 1
+
+        return counts
+
+    def __len__(self) -> int:
+        return len(self._counts())
+
+    def __iter__(self) -> Iterator[IdState]:
+        return iter(self._counts())
+
+    def __getitem__(self, state: IdState) -> int:
+        return self._counts()[state]
+
+    def items(self):
+        return self._counts().items()
+
+
+class SuffixDistances(Mapping[IdState, int]):
+    """
+    Distances of the states of `remarkov.suffix.SuffixTransitions` towards sentence terminators. See
+    `remarkov.termination.TerminationIndex`.
+
+    Like the transitions, the table does not contain state tuples. The distance of a state is stored at the first
+    index of its occurrences in the suffix array, which `remarkov.suffix.SuffixTransitions._bounds` finds.
+    """
+
+    def __init__(self, transitions: "SuffixTransitions", distances: array):
+        self.transitions = transitions
+        self.distances = distances
+        self._len = sum(1 for distance in distances if distance)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[IdState]:
+        transitions, suffixes = self.transitions, self.transitions.suffixes
+
+        for index, distance in enumerate(self.distances):
+            if distance:
+                yield transitions._window(suffixes[index])  # type: ignore
+
+    def __getitem__(self, state: IdState) -> int:
+        if len(state) != self.transitions.order:
+            raise KeyError(state)
+
+        lower, upper = self.transitions._bounds(state)
+        distance = self.distances[lower] if lower < upper else 0
+
+        if not distance:
+            raise KeyError(state)
+
+        return distance
+
+
+class SuffixTransitions:
+    """
+    Stores the transitions of a Markov chain of order `order` as a corpus and its suffix array.
+    """
+
+    def __init__(self, order: int, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.order = order
+        self.cache_size = cache_size
+
+        self.corpus = array(TOKEN_ID_TYPECODE)
+        # positions of all declared start states. a position can occur multiple times.
+        self.start_offsets = array(INDEX_TYPECODE)
+        self.start_states = SuffixStartStates(self)
+
+        self._has_transitions = False
+        # order of the model that declared the start offsets.
+        self._start_order = order
+        # the state that continues the current text. `None` begins a new text.
+        self._expected: Optional[IdState] = None
+        # built on first use.
+        self._suffixes: Optional[array] = None
+        # suffix array ranges of the successors of recently used states in least recently used order. generation
+        # threads of the server share the cache. it is guarded by the lock.
+        self._cache: "OrderedDict[IdState, Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._start_sampler: Optional[AliasSampler[IdState]] = None
+        # start state counts. they are counted on first use after the start states changed.
+        self._start_counts: Optional[Dict[IdState, int]] = None
+        self._termination: Optional[TerminationIndex] = None
+
+    def with_order(self, order: int) -> "SuffixTransitions":
+        """
+        Returns transitions of another order that share the corpus and suffix array with these. Neither of
+        them should be modified afterwards.
+
+        Start states are derived from the ones declared by the model that built the corpus. A model of lower
+        order also starts at offsets near the end of a text that had no successor at the higher order, so
+        `order` must not be lower than the order the corpus was built with.
+        """
+
+        assert (
+            self._start_order <= order
+        ), f"Order must be at least {self._start_order}. Build the model at order 1 to derive any order."
+
+        transitions = SuffixTransitions(order, self.cache_size)
+        transitions._suffixes = self.suffixes
+        transitions.corpus = self.corpus
+        transitions.start_offsets = self.start_offsets
+        transitions._has_transitions = self._has_transitions
+        transitions._start_order = self._start_order
+
+        return transitions
+
+    def _invalidate(self):
+        self._suffixes = None
+
+        with self._lock:
+            self._cache.clear()
+
+        self._start_sampler, self._start_counts, self._termination = None, None, None
+
+    def _begin_text(self):
+        if self.corpus and SEPARATOR != self.corpus[-1]:
+            self.corpus.append(SEPARATOR)
+
+    def declare(self, from_: IdState, to: TokenId, count: int = 1):
+        corpus = self.corpus
+
+        for _ in range(count):
+            if from_ != self._expected:
+                self._begin_text()
+                corpus.extend(from_)
+
+            corpus.append(to)
+            self._expected = from_[1:] + (to,)
+
+        self._has_transitions = True
+        self._start_counts = None
+
+        if self._suffixes is not None:
+            self._invalidate()
+
+    def declare_start(self, from_: IdState, count: int = 1):
+        corpus = self.corpus
+        offset = len(corpus) - len(from_) - 1
+
+        # start states are usually declared right after their first transition.
+        if offset < 0 or tuple(corpus[offset : offset + len(from_)]) != from_:
+            self._begin_text()
+            offset = len(corpus)
+            corpus.extend(from_)
+            self._expected = None
+
+        self.start_offsets.extend([offset] * count)
+
+        if self._suffixes is not None:
+            self._invalidate()
+        else:
+            self._start_sampler, self._start_counts, self._termination = (
+                None,
+                None,
+                None,
+            )
+
+    def flush(self):
+        """
+        Ends the current text. The next declaration begins a new one.
+        """
+
+        self._expected = None
+
+    @property
+    def suffixes(self) -> array:
+        """
+        The suffix array of the corpus. It is rebuilt after the corpus was modified.
+        """
+
+        if self._suffixes is None:
+            with self._lock:
+                if self._suffixes is None:
+                    self._begin_text()
+                    self._expected = None
+                    self._suffixes = build_suffix_array(self.corpus)
+
+        return self._suffixes
+
+    def _window(self, offset: int) -> Optional[IdState]:
+        """
+        Returns the state at `offset` or `None` if it crosses the end of a text.
+        """
+
+        state = tuple(self.corpus[offset : offset + self.order])
+
+        if len(state) < self.order or SEPARATOR in state:
+            return None
+
+        return state
+
+    def _bounds(self, state: IdState) -> Tuple[int, int]:
+        """
+        Returns the range of the suffix array that contains all occurrences of `state` which have a successor.
+        The ranges of the most recently used states are cached.
+        """
+
+        cache = self._cache
+
+        with self._lock:
+            cached = cache.get(state)
+
+            if cached is not None:
+                cache.move_to_end(state)
+                return cached
+
+        corpus, suffixes, length = self.corpus, self.suffixes, len(state)
+        needle = array(TOKEN_ID_TYPECODE, state)
+
+        lower, upper = 0, len(suffixes)
+
+        while lower < upper:
+            middle = (lower + upper) // 2
+            position = suffixes[middle]
+
+            if corpus[position : position + length] < needle:
+                lower = middle + 1
+            else:
+                upper = middle
+
+        first, upper = lower, len(suffixes)
+
+        while lower < upper:
+            middle = (lower + upper) // 2
+            position = suffixes[middle]
+
+            if corpus[position : position + length] <= needle:
+                lower = middle + 1
+            else:
+                upper = middle
+
+        end, lower, upper = lower, first, lower
+
+        # occurrences at the end of a text sort first as their successor is the separator.
+        while lower < upper:
+            middle = (lower + upper) // 2
+
+            if SEPARATOR == corpus[suffixes[middle] + length]:
+                lower = middle + 1
+            else:
+                upper = middle
+
+        bounds = (lower, end)
+
+        with self._lock:
+            cache[state] = bounds
+
+            if self.cache_size < len(cache):
+                cache.popitem(last=False)
+
+        return bounds
+
+    def sample(
+        self, from_: IdState, random: Callable[[], float] = random.random
+    ) -> TokenId:
+        """
+        Select a random successor token of state `from_` weighted by its transition count. `from_` may have any
+        length, not only the order of the chain.
+        """
+
+        lower, upper = self._bounds(from_)
+
+        if lower == upper:
+            raise KeyError(from_)
+
+        position = self.suffixes[lower + int(random() * (upper - lower))]
+
+        return self.corpus[position + len(from_)]
+
+    def get(self, from_: IdState, default=None) -> Optional[Successors]:
+        lower, upper = self._bounds(from_)
+
+        if lower == upper:
+            return default
+
+        corpus, suffixes, length = self.corpus, self.suffixes, len(from_)
+        successors: Successors = {}
+
+        for index in range(lower, upper):
+            token = corpus[suffixes[index] + length]
+            successors[token] = successors.get(token, 0) + 1
+
+        return successors
+
+    def __getitem__(self, from_: IdState) -> Successors:
+        successors = self.get(from_)
+
+        if successors is None:
+            raise KeyError(from_)
+
+        return successors
+
+    def __contains__(self, from_) -> bool:
+        lower, upper = self._bounds(from_)
+        return lower < upper
+
+    def __bool__(self) -> bool:
+        return self._has_transitions
+
+    def items(self) -> Iterator[Tuple[IdState, Successors]]:
+        """
+        Yields all states and their successors in a single pass over the suffix array.
+        """
+
+        corpus, order = self.corpus, self.order
+        state: Optional[IdState] = None
+        successors: Successors = {}
+
+        for position in self.suffixes:
+            if len(corpus) <= position + order or SEPARATOR == corpus[position + order]:
+                continue
+
+            current = self._window(position)
+
+            if current is None:
+                continue
+
+            if current != state:
+                if state is not None:
+                    yield state, successors
+
+                state, successors = current, {}
+
+            token = corpus[position + order]
+            successors[token] = successors.get(token, 0) + 1
+
+        if state is not None:
+            yield state, successors
+
+    def keys(self) -> Iterator[IdState]:
+        for state, _ in self.items():
+            yield state
+
+    def values(self) -> Iterator[Successors]:
+        for _, successors in self.items():
+            yield successors
+
+    def __iter__(self) -> Iterator[IdState]:
+        return self.keys()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.items())
+
+    def sample_start(self, random: Callable[[], float] = random.random) -> IdState:
+        """
+        Select a random start state weighted by the amount of declarations. See `remarkov.model.Transitions.sample_start`.
+        """
+
+        if self._start_sampler is None:
+            starts = [
+                (state, count)
+                for state, count in self.start_states.items()
+                if state in self
+            ]
+
+            if not starts:
+                if self.start_offsets:
+                    raise NoStartStateFound()
+
+                # too few sentences were imported. just pick some random state then.
+                while True:
+                    state = self._window(int(random() * len(self.corpus)))
+
+                    if state is not None and state in self:
+                        return state
+
+            self._start_sampler = AliasSampler(
+                [state for state, _ in starts], [count for _, count in starts]
+            )
+
+        return self._start_sampler.sample(random)
+
+    def drop_dead_start_states(self):
+        def is_alive(offset: int) -> bool:
+            state = self._window(offset)
+            return state is not None and state in self
+
+        self.start_offsets = array(INDEX_TYPECODE, filter(is_alive, self.start_offsets))
+        self._start_sampler, self._start_counts, self._termination = None, None, None
+
+    def analyze_termination(self, terminators: frozenset) -> TerminationIndex:
+        """
+        Returns the distance of each state towards `terminators`. See `remarkov.termination.TerminationIndex`.
+        The distance table is an array of the size of the corpus, see `remarkov.suffix.SuffixDistances`.
+        """
+
+        return cached_termination_index(self, terminators, self._compute_distances)
+
+    def _compute_distances(self, terminators: frozenset) -> SuffixDistances:
+        """
+        Runs the breadth-first search of `remarkov.termination.compute_distances` over corpus positions. The
+        predecessors of a state are the positions right before its occurrences, so no reversed transitions have
+        to be collected.
+        """
+
+        corpus, suffixes, order = self.corpus, self.suffixes, self.order
+        size = len(suffixes)
+
+        # the state of each position that has a successor, as the first suffix array index of its occurrences.
+        states = array(INDEX_TYPECODE, [-1]) * len(corpus)
+        distances = array(INDEX_TYPECODE, [0]) * size
+        frontier = array(INDEX_TYPECODE)
+        state, previous = -1, None
+
+        for index, position in enumerate(suffixes):
+            if len(corpus) <= position + order or SEPARATOR == corpus[position + order]:
+                continue
+
+            window = corpus[position : position + order]
+
+            if SEPARATOR in window:
+                continue
+
+            if window != previous:
+                state, previous = index, window
+
+            states[position] = state
+
+            if corpus[position + order] in terminators and not distances[state]:
+                distances[state] = 1
+                frontier.append(state)
+
+        distance = 1
+
+        while frontier:
+            distance += 1
+            next_frontier = array(INDEX_TYPECODE)
+
+            for state in frontier:
+                index = state
+
+                # occurrences of a state are neighbours in the suffix array.
+                while index < size and state == states[suffixes[index]]:
+                    predecessor = suffixes[index] - 1
+                    index += 1
+
+                    if predecessor < 0 or corpus[predecessor + order] in terminators:
+                        continue
+
+                    previous_state = states[predecessor]
+
+                    if 0 <= previous_state and not distances[previous_state]:
+                        distances[previous_state] = distance
+                        next_frontier.append(previous_state)
+
+            frontier = next_frontier
+
+        return SuffixDistances(self, distances)
+
+    def prune(self, *args, **kwargs):
+        """
+        Transitions are occurrences in the corpus and cannot be removed one by one. Always raises
+        `remarkov.error.PruningNotSupported`.
+        """
+
+        raise PruningNotSupported()
+
+    def estimate_size(self) -> int:
+        """
+        Returns the size of the corpus, the suffix array and the start states in bytes.
+        """
+
+        return sum(
+            memoryview(values).nbytes
+            for values in (self.corpus, self.suffixes, self.start_offsets)
+        )
+
+
+def with_order(model, order: int):
+    """
+    Returns a model of `order` that shares the vocabulary, corpus and suffix array with the suffix array model
+    `model`. No transitions are copied. `order` must not be lower than the order `model` was built with.
+    """
+
+    from remarkov.model import Model
+
+    assert isinstance(model.transitions, SuffixTransitions)
+
+    reordered = Model(
+        order=order, tokenizer=model.tokenizer, before_insert=model.before_insert
+    )
+    reordered.vocabulary = model.vocabulary
+    reordered.transitions = model.transitions.with_order(order)
+    reordered.rng = model.rng
+
+    return reordered
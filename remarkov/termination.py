@@ -0,0 +1,254 @@
+"""
+Implements the termination analysis used for bounded sentence generation.
+
+A sentence ends as soon as a `remarkov.tokenizer.PUNCT_TERMINATION` token is emitted. For each state,
+`remarkov.termination.TerminationIndex` stores the least amount of tokens that have to be emitted until this
+happens. The distances are computed once with a breadth-first search over reversed transitions: states that have
+a terminator as successor are one token away, their predecessors two tokens and so on. States that are missing
+from the table cannot reach a terminator at all.
+
+During generation, successors that would leave the table or exceed the remaining token budget are rejected. Every
+state on the walk can then end its sentence in time, so generation never runs forever.
+"""
+
+import random
+
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from remarkov.error import NoSentenceTerminator, TokenBudgetExceeded
+from remarkov.sampling import AliasSampler
+from remarkov.types import State, StoredState, Successors, Token
+
+
+def compute_distances(
+    transitions: Iterable[Tuple[State, Successors]], terminators: Collection[Token]
+) -> Dict[State, int]:
+    """
+    Returns the least amount of tokens each state has to emit until one of `terminators` is emitted.
+    The terminator itself is included. States that cannot reach a terminator are not contained.
+    """
+
+    distances: Dict[State, int] = {}
+    predecessors: Dict[State, List[State]] = {}
+    frontier: List[State] = []
+
+    for state, successors in transitions:
+        shifted = state[1:]
+
+        for token in successors:
+            if token in terminators:
+                if state not in distances:
+                    distances[state] = 1
+                    frontier.append(state)
+
+            else:
+                predecessors.setdefault(shifted + (token,), []).append(state)
+
+    distance = 1
+
+    while frontier:
+        distance += 1
+        next_frontier = []
+
+        for state in frontier:
+            for predecessor in predecessors.pop(state, ()):
+                if predecessor not in distances:
+                    distances[predecessor] = distance
+                    next_frontier.append(predecessor)
+
+        frontier = next_frontier
+
+    return distances
+
+
+class TerminationIndex:
+    """
+    Distance table of a chain's states towards `terminators`. Use `remarkov.model.Transitions.analyze_termination`
+    to get a cached instance.
+
+    Budgets are the amount of tokens a sentence may still emit. `None` means that the sentence only has to
+    terminate eventually.
+    """
+
+    def __init__(
+        self,
+        transitions,
+        terminators: Collection[Token],
+        distances: Optional[Mapping[StoredState, int]] = None,
+    ):
+        self.transitions = transitions
+        self.terminators = terminators
+        # backends that keep their states out of memory provide a table of their own.
+        self.distances: Mapping[StoredState, int] = (
+            compute_distances(transitions.items(), terminators)
+            if distances is None
+            else distances
+        )
+
+        # samplers over the successors of a state that reach a terminator. built on first use.
+        self._samplers: Dict[State, AliasSampler[Token]] = {}
+        # start state samplers per budget. built on first use.
+        self._start_samplers: Dict[Optional[int], AliasSampler[State]] = {}
+
+    def __len__(self) -> int:
+        return len(self.distances)
+
+    def __contains__(self, state) -> bool:
+        return state in self.distances
+
+    def distance(self, state: State) -> Optional[int]:
+        """
+        Returns the least amount of tokens until `state` emits a terminator or `None` if it never does.
+        """
+
+        return self.distances.get(state)
+
+    def _cost(self, state: State, token: Token) -> Optional[int]:
+        """
+        Amount of tokens until a terminator is emitted after selecting `token` in `state`, including `token`.
+        """
+
+        if token in self.terminators:
+            return 1
+
+        distance = self.distances.get(state[1:] + (token,))
+
+        return None if distance is None else distance + 1
+
+    def _build_sampler(
+        self, state: State, budget: Optional[int]
+    ) -> AliasSampler[Token]:
+        tokens, weights = [], []
+
+        for token, count in self.transitions[state].items():
+            cost = self._cost(state, token)
+
+            if cost is not None and (budget is None or cost <= budget):
+                tokens.append(token)
+                weights.append(count)
+
+        if not tokens:
+            raise (
+                NoSentenceTerminator()
+                if budget is None
+                else TokenBudgetExceeded(budget)
+            )
+
+        return AliasSampler(tokens, weights)
+
+    def sample(
+        self,
+        state: State,
+        random: Callable[[], float] = random.random,
+        budget: Optional[int] = None,
+    ) -> Token:
+        """
+        Select a random successor of `state` that still reaches a terminator within `budget` tokens, including the
+        successor itself. The probabilities of the remaining successors keep their ratio.
+
+        This raises `remarkov.error.TokenBudgetExceeded` if the distance of `state` is greater than `budget`.
+        """
+
+        # most successors are fine. only fall back to a restricted sampler if the first choice is not.
+        token = self.transitions.sample(state, random)
+        cost = self._cost(state, token)
+
+        if cost is not None and (budget is None or cost <= budget):
+            return token
+
+        sampler = self._samplers.get(state)
+
+        if sampler is None:
+            sampler = self._samplers[state] = self._build_sampler(state, None)
+
+        token = sampler.sample(random)
+        cost = self._cost(state, token)
+
+        if budget is None or (cost is not None and cost <= budget):
+            return token
+
+        # the budget is almost used up. this only happens close to its end.
+        return self._build_sampler(state, budget).sample(random)
+
+    def _start_candidates(self) -> List[Tuple[State, int]]:
+        candidates = [
+            (state, count)
+            for state, count in self.transitions.start_states.items()
+            if state in self.distances
+        ]
+
+        if not candidates:
+            # no start state terminates or none was declared. any state can begin a sentence then.
+            candidates = [(state, 1) for state in self.distances]
+
+        return candidates
+
+    def sample_start(
+        self,
+        random: Callable[[], float] = random.random,
+        budget: Optional[int] = None,
+    ) -> State:
+        """
+        Select a random start state that reaches a terminator within `budget` tokens, including the tokens of the
+        state itself. Start states are weighted by the amount of declarations.
+
+        This raises `remarkov.error.NoSentenceTerminator` if no state reaches a terminator and
+        `remarkov.error.TokenBudgetExceeded` if none does so within `budget`.
+        """
+
+        sampler = self._start_samplers.get(budget)
+
+        if sampler is None:
+            if not self.distances:
+                raise NoSentenceTerminator()
+
+            states, weights = [], []
+
+            for state, count in self._start_candidates():
+                if budget is None or len(state) + self.distances[state] <= budget:
+                    states.append(state)
+                    weights.append(count)
+
+            if not states:
+                raise (
+                    NoSentenceTerminator()
+                    if budget is None
+                    else TokenBudgetExceeded(budget)
+                )
+
+            sampler = self._start_samplers[budget] = AliasSampler(states, weights)
+
+        return sampler.sample(random)
+
+
+def cached_termination_index(
+    transitions,
+    terminators: frozenset,
+    distances: Optional[Callable[[frozenset], Mapping[StoredState, int]]] = None,
+) -> TerminationIndex:
+    """
+    Returns the termination index that `transitions` cached in its `_termination` attribute. It is built if the
+    backend reset the attribute after a modification or if it was built for other `terminators`. This implements
+    `analyze_termination` for all transition backends. `distances` computes the distance table instead of
+    `remarkov.termination.compute_distances`.
+    """
+
+    index = transitions._termination
+
+    if index is None or index.terminators != terminators:
+        index = transitions._termination = TerminationIndex(
+            transitions,
+            terminators,
+            None if distances is None else distances(terminators),
+        )
+
+    return index
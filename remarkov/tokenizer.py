@@ -1,13 +1,16 @@
-from typing import Callable
-from remarkov.types import TokenStream
+from typing import Iterable, Iterator, Optional, TextIO
+from remarkov.types import TokenBoundary, Tokenizer, TokenStream
 
-PUNCT_TERMINATION = [".", "?", "!"]
+PUNCT_TERMINATION = frozenset([".", "?", "!"])
 """Punctuation characters that terminate a sentence."""
-PUNCT = [*PUNCT_TERMINATION, ",", ":", '"', "[", "]", "(", ")"]
+PUNCT = frozenset([*PUNCT_TERMINATION, ",", ":", '"', "[", "]", "(", ")"])
 """All special characters that should be tokenized."""
 
-NO_WHITESPACE_BEFORE = [*PUNCT_TERMINATION, ",", ":", ")", "]"]
-NO_WHITESPACE_AFTER = ["[", "("]
+NO_WHITESPACE_BEFORE = frozenset([*PUNCT_TERMINATION, ",", ":", ")", "]"])
+NO_WHITESPACE_AFTER = frozenset(["[", "("])
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+"""Amount of characters read at once when text is streamed from a file."""
 
 
 def default_tokenizer(text: str) -> TokenStream:
@@ -17,10 +20,19 @@ def default_tokenizer(text: str) -> TokenStream:
 
     text = text.replace("\n", " ").replace("\r", " ")
 
+    # one `str.replace` per character runs at memory speed and outperforms a single regex pass.
     for punct in PUNCT:
         text = text.replace(punct, f" {punct} ")
 
-    return (token for token in text.split(" ") if token)
+    return filter(None, text.split(" "))
+
+
+def default_token_boundary(text: str) -> int:
+    """
+    Token boundary of `remarkov.tokenizer.default_tokenizer`. Tokens never span whitespace.
+    """
+
+    return max(text.rfind(" "), text.rfind("\n"), text.rfind("\r")) + 1
 
 
 def token_to_lowercase(token: str) -> str:
@@ -31,14 +43,19 @@ def token_to_uppercase(token: str) -> str:
     return token.upper()
 
 
-def create_ngram_tokenizer(n: int) -> Callable[[str], TokenStream]:
+class NgramTokenizer:
     """
-    Tokenize the input text into n-grams of length `n`. Short tokens are padded with whitespace.
+    Tokenizer returned by `remarkov.tokenizer.create_ngram_tokenizer`.
     """
 
-    assert 0 < n, "n must be at least 1"
+    def __init__(self, n: int):
+        assert 0 < n, "n must be at least 1"
+
+        self.n = n
+
+    def __call__(self, text: str) -> TokenStream:
+        n = self.n
 
-    def ngram_tokenizer(text: str):
         for offset in range(0, len(text), n):
             ngram = text[offset : offset + n]
             ngram_len_diff = n - len(ngram)
@@ -49,4 +66,67 @@ def create_ngram_tokenizer(n: int) -> Callable[[str], TokenStream]:
 
             yield ngram
 
-    return ngram_tokenizer
+    def token_boundary(self, text: str) -> int:
+        # everything but an incomplete trailing n-gram can be tokenized.
+        return len(text) - len(text) % self.n
+
+
+def create_ngram_tokenizer(n: int) -> Tokenizer:
+    """
+    Tokenize the input text into n-grams of length `n`. Short tokens are padded with whitespace.
+    """
+
+    return NgramTokenizer(n)
+
+
+def get_token_boundary(tokenizer: Tokenizer) -> Optional[TokenBoundary]:
+    """
+    Return the token boundary function of `tokenizer` or `None` if it does not have one.
+
+    A token boundary function returns an index into a text so that tokenizing the text before and after the
+    index separately results in the same tokens as tokenizing the whole text. Custom tokenizers can provide
+    one as `token_boundary` attribute to support streaming.
+    """
+
+    if tokenizer is default_tokenizer:
+        return default_token_boundary
+
+    return getattr(tokenizer, "token_boundary", None)
+
+
+def read_chunks(fin: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Read a file object in chunks of `chunk_size` characters.
+    """
+
+    return iter(lambda: fin.read(chunk_size), "")
+
+
+def tokenize_chunks(
+    chunks: Iterable[str], tokenizer: Tokenizer = default_tokenizer
+) -> TokenStream:
+    """
+    Tokenize text that arrives in chunks. The result is equal to tokenizing the concatenated text.
+
+    Partial tokens at the end of a chunk are carried over into the next one. This requires the tokenizer to
+    have a token boundary (see `remarkov.tokenizer.get_token_boundary`). Otherwise, all chunks are collected
+    before tokenizing.
+    """
+
+    token_boundary = get_token_boundary(tokenizer)
+
+    if token_boundary is None:
+        yield from tokenizer("".join(chunks))
+        return
+
+    rest = ""
+
+    for chunk in chunks:
+        text = rest + chunk
+        boundary = token_boundary(text)
+
+        yield from tokenizer(text[:boundary])
+        rest = text[boundary:]
+
+    if rest:
+        yield from tokenizer(rest)
@@ -1,6 +1,13 @@
-from typing import Callable, Generator, Tuple
+from typing import Any, Callable, Dict, Iterator, Tuple
 
 Token = str
-TokenStream = Generator[Token, None, None]
+TokenStream = Iterator[Token]
 Tokenizer = Callable[[str], TokenStream]
+TokenBoundary = Callable[[str], int]
 State = Tuple[Token, ...]
+Successors = Dict[Token, int]
+TokenId = int
+# tokens as stored by a chain. interned models store `TokenId` instead of `Token`.
+StoredToken = Any
+StoredState = Tuple[StoredToken, ...]
+StoredSuccessors = Dict[StoredToken, int]
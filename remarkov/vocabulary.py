@@ -0,0 +1,83 @@
+"""
+Implements token interning.
+
+A `remarkov.vocabulary.Vocabulary` assigns a dense integer id to every token it sees. Models created with
+`intern=True` store their states and successors as ids and only translate them back to strings on output.
+Comparing and hashing small integers is cheaper than doing the same with strings and tuples of ids take up
+less memory than tuples of strings.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from remarkov.types import State, Successors, Token, TokenId
+
+
+class Vocabulary:
+    """
+    Bidirectional mapping between tokens and integer ids.
+    """
+
+    def __init__(self):
+        self.ids: Dict[Token, TokenId] = {}
+        self.tokens: List[Token] = []
+
+    @staticmethod
+    def from_tokens(tokens: List[Token]) -> "Vocabulary":
+        """
+        Create a vocabulary where each token in `tokens` has its list index as id.
+        """
+
+        vocabulary = Vocabulary()
+        vocabulary.tokens = tokens
+        vocabulary.ids = {token: token_id for token_id, token in enumerate(tokens)}
+
+        assert len(vocabulary.ids) == len(tokens), "Tokens must be unique."
+
+        return vocabulary
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, token: Token) -> bool:
+        return token in self.ids
+
+    def get(self, token: Token) -> Optional[TokenId]:
+        """
+        Return the id of `token` or `None` if the token was never interned.
+        """
+
+        return self.ids.get(token)
+
+    def intern(self, token: Token) -> TokenId:
+        """
+        Return the id of `token`. Unknown tokens are assigned the next free id.
+        """
+
+        token_id = self.ids.get(token)
+
+        if token_id is None:
+            token_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+
+        return token_id
+
+    def intern_state(self, state: State) -> Tuple[TokenId, ...]:
+        return tuple(self.intern(token) for token in state)
+
+    def intern_successors(self, successors: Successors) -> Dict[TokenId, int]:
+        return {self.intern(token): count for token, count in successors.items()}
+
+    def lookup(self, token_id: TokenId) -> Token:
+        """
+        Return the token for `token_id`.
+        """
+
+        return self.tokens[token_id]
+
+    def resolve_state(self, state: Tuple[TokenId, ...]) -> State:
+        tokens = self.tokens
+        return tuple(tokens[token_id] for token_id in state)
+
+    def resolve_successors(self, successors: Dict[TokenId, int]) -> Successors:
+        tokens = self.tokens
+        return {tokens[token_id]: count for token_id, count in successors.items()}
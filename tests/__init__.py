@@ -0,0 +1,14 @@
+from remarkov import create_model
+
+
+def build_model(*texts: str, **kwargs):
+    """
+    Creates a model with `remarkov.create_model(**kwargs)` and adds each of `texts` to it.
+    """
+
+    model = create_model(**kwargs)
+
+    for text in texts:
+        model.add_text(text)
+
+    return model
@@ -1,7 +1,18 @@
+import os.path
 import pytest
+import tempfile
 
-from remarkov.error import NoTransitionsDefined, TokenStreamExhausted
-from remarkov.tokenizer import token_to_lowercase, token_to_uppercase
+from remarkov.error import (
+    ModelIsFrozen,
+    NoStartStateFound,
+    NoTransitionsDefined,
+    TokenStreamExhausted,
+)
+from remarkov.tokenizer import (
+    default_tokenizer,
+    token_to_lowercase,
+    token_to_uppercase,
+)
 from remarkov import create_model, parse_model
 
 
@@ -51,3 +62,202 @@ def test_initial_state_is_start_state():
     model.add_text("This works now.")
 
     assert 1 == len(model.transitions.start_states)
+
+
+def test_transitions_are_counted():
+    model = create_model()
+    model.add_text("a b a b a c")
+
+    assert {"b": 2, "c": 1} == model.transitions[("a",)]
+    assert {"a": 2} == model.transitions[("b",)]
+
+
+def test_transitions_sample_respects_counts():
+    model = create_model()
+    model.transitions.declare(("a",), "b", 3)
+    model.transitions.declare(("a",), "c")
+
+    samples = [model.transitions.sample(("a",)) for _ in range(4000)]
+
+    assert {"b", "c"} == set(samples)
+    assert 2500 < samples.count("b") < 3500
+
+
+def test_transitions_sample_single_successor():
+    model = create_model()
+    model.transitions.declare(("a",), "b", 3)
+    model.transitions.declare(("b",), "c")
+    model.transitions.declare(("b",), "d")
+
+    assert "b" == model.transitions.sample(("a",))
+    assert model.transitions.sample(("b",)) in {"c", "d"}
+    assert [("b",)] == list(model.transitions._samplers)
+
+
+def test_transitions_sample_after_declare():
+    model = create_model()
+    model.transitions.declare(("a",), "b")
+    assert "b" == model.transitions.sample(("a",))
+
+    # declaring a new successor must invalidate the sampling table.
+    model.transitions.declare(("a",), "c", 1000)
+    samples = [model.transitions.sample(("a",)) for _ in range(100)]
+    assert "c" in samples
+
+
+def test_intern_tokens():
+    model = create_model(intern=True)
+    model.add_text("a b a c.")
+
+    a, b = model.vocabulary.get("a"), model.vocabulary.get("b")
+
+    assert (a,) in model.transitions
+    assert ("a",) not in model.transitions
+    assert {b: 1, model.vocabulary.get("c"): 1} == model.transitions[(a,)]
+    assert {(a,): 1} == model.transitions.start_states
+
+
+@pytest.mark.parametrize("order", [1, 2])
+def test_intern_tokens_same_start_states(order):
+    # terminators are interned while the text is inserted.
+    text = "a. b c! d e? f . g h. i"
+    model = create_model(order=order)
+    model.add_text(text)
+
+    interned = create_model(order=order, intern=True)
+    interned.add_text(text)
+
+    assert model.transitions.start_states == {
+        interned.vocabulary.resolve_state(state): count
+        for state, count in interned.transitions.start_states.items()
+    }
+
+
+def test_intern_tokens_generates_text():
+    model = create_model(intern=True, before_insert=token_to_lowercase)
+    model.add_text("A b. A c.")
+
+    words = list(default_tokenizer(model.generate(20).text()))
+    assert 20 == len(words)
+    assert set("abc.") >= set(words)
+
+
+@pytest.mark.parametrize("order", [1, 2, 3])
+def test_add_stream_equals_add_text(order):
+    text = "This is a sample and this is another. Be sure to have multiple. Sentences."
+    chunks = [text[offset : offset + 4] for offset in range(0, len(text), 4)]
+
+    model = create_model(order=order)
+    model.add_text(text)
+
+    stream_model = create_model(order=order)
+    stream_model.add_stream(chunks)
+
+    assert model.transitions == stream_model.transitions
+    assert model.transitions.start_states == stream_model.transitions.start_states
+
+
+def test_add_file():
+    text = "This is a sample and this is another.\nBe sure to have multiple. Sentences."
+
+    model = create_model(order=2)
+    model.add_text(text)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "input.txt")
+
+        with open(fname, "w") as fout:
+            fout.write(text)
+
+        file_model = create_model(order=2)
+        file_model.add_file(fname)
+
+    assert model.transitions == file_model.transitions
+    assert model.transitions.start_states == file_model.transitions.start_states
+
+
+def test_start_states_are_counted():
+    model = create_model()
+    model.add_text("A b. A c. B a.")
+
+    assert {("A",): 2, ("B",): 1} == model.transitions.start_states
+
+
+def test_sample_start_respects_counts():
+    model = create_model()
+    model.transitions.declare(("a",), "b")
+    model.transitions.declare(("b",), "a")
+    model.transitions.declare_start(("a",), 3)
+    model.transitions.declare_start(("b",))
+
+    samples = [model.transitions.sample_start() for _ in range(4000)]
+    assert 2500 < samples.count(("a",)) < 3500
+
+
+def test_sample_start_skips_dead_states():
+    model = create_model()
+    model.transitions.declare_start(("b",), 100)
+    model.transitions.declare_start(("a",))
+
+    with pytest.raises(NoStartStateFound):
+        model.transitions.sample_start()
+
+    # declaring a transition makes the start state valid.
+    model.transitions.declare(("a",), "b")
+    assert all(("a",) == model.transitions.sample_start() for _ in range(100))
+
+    model.transitions.drop_dead_start_states()
+    assert {("a",): 1} == model.transitions.start_states
+
+
+def test_sample_start_without_start_states():
+    model = create_model()
+    model.transitions.declare(("a",), "b")
+    model.transitions.declare(("b",), "c")
+
+    samples = {model.transitions.sample_start() for _ in range(100)}
+    assert {("a",), ("b",)} == samples
+
+
+def test_prune_min_count():
+    model = create_model()
+    model.add_text("a b. a b. a c. d e.")
+
+    report = model.prune(min_count=2)
+
+    assert {("a",): {"b": 2}, ("b",): {".": 2}, (".",): {"a": 2}} == dict(
+        model.transitions
+    )
+    assert {("a",): 3} == model.transitions.start_states
+    assert 3 == report.removed_states
+    assert 5 == report.removed_transitions
+    assert 1 == report.removed_start_states
+    assert 0 < report.reclaimed_bytes
+    assert model.generate(10).text()
+
+
+def test_prune_top_k():
+    model = create_model()
+    model.add_text("a b a c a c a d a d a d")
+
+    model.prune(top_k=2)
+
+    assert ["c", "d"] == list(model.transitions[("a",)])
+
+
+def test_prune_min_state_total():
+    model = create_model()
+    model.add_text("a b a c a d")
+
+    report = model.prune(min_state_total=2)
+
+    assert [("a",)] == list(model.transitions)
+    assert 2 == report.removed_states
+
+
+def test_prune_frozen():
+    model = create_model()
+    model.add_text("a b c")
+
+    with pytest.raises(ModelIsFrozen):
+        model.freeze().prune(min_count=2)
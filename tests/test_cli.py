@@ -1,4 +1,5 @@
 import os.path
+import pytest
 import tempfile
 
 from io import StringIO
@@ -6,8 +7,9 @@ from typing import List
 from remarkov.tokenizer import default_tokenizer
 
 from remarkov.cli import run_command
+from remarkov.error import IncompatibleOptions, MissingOption
 from remarkov.model import Model
-
+from remarkov import load_model
 
 SOURCE = """
 This is a Valid Text for Building.
@@ -54,6 +56,19 @@ def test_generating_from_file():
         assert 42 == len(words), " ".join(words)
 
 
+def test_generating_from_binary_file():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.v3")
+        create_test_model().save(fname, version=3)
+
+        output = run_command(
+            args=["generate", "--model", fname, "--words", "42"],
+        )
+        words = list(default_tokenizer(output))
+
+        assert 42 == len(words), " ".join(words)
+
+
 def test_generating_from_stream():
     model = create_test_model()
     output = run_command(
@@ -118,3 +133,168 @@ def test_building_ngrams():
     for transition in model["transitions"]:
         assert all(map(lambda token: 3 == len(token), transition["state"]))
         assert all(map(lambda token: 3 == len(token), transition["tokens"]))
+
+
+def test_building_parallel():
+    import json
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        paths = []
+
+        for i in range(3):
+            paths.append(os.path.join(tempdir, f"{i}.txt"))
+
+            with open(paths[-1], "w") as fout:
+                fout.write(SOURCE)
+
+        sequential = run_command(args=["build", *paths])
+        parallel = run_command(args=["build", "--jobs", "2", *paths])
+
+    assert json.loads(sequential) == json.loads(parallel)
+
+
+def test_generating_to_output():
+    model = create_test_model()
+    output = StringIO()
+
+    result = run_command(
+        args=["generate", "--words", "300"],
+        stream=StringIO(model.to_json()),
+        output=output,
+    )
+    words = list(default_tokenizer(output.getvalue()))
+
+    assert "" == result
+    assert output.getvalue().endswith("\n")
+    assert 300 == len(words), " ".join(words)
+
+
+def test_building_to_output():
+    output = StringIO()
+
+    result = run_command(args=["build"], stream=StringIO(SOURCE), output=output)
+
+    assert "" == result
+    assert create_test_model().to_json() + "\n" == output.getvalue()
+
+
+def test_building_pruned(capsys):
+    import json
+
+    output = run_command(
+        args=["build", "--prune-min-count", "2"],
+        stream=StringIO("a b. a b. a c. d e."),
+    )
+    model = json.loads(output)
+
+    assert [{"state": ["a"], "tokens": {"b": 2}}] == model["transitions"][:1]
+    assert all(
+        2 <= count
+        for transition in model["transitions"]
+        for count in transition["tokens"].values()
+    )
+
+    assert "reclaimed" in capsys.readouterr().err
+
+
+def test_building_pruned_suffix():
+    from remarkov.error import PruningNotSupported
+
+    stream = StringIO("a b. a b. a c. d e.")
+
+    with pytest.raises(PruningNotSupported):
+        run_command(
+            args=["build", "--storage", "suffix", "--prune-top-k", "1"], stream=stream
+        )
+
+    # the input was not read.
+    assert 0 == stream.tell()
+
+
+def test_stats():
+    import json
+
+    model = create_test_model()
+    output = run_command(args=["stats"], stream=StringIO(model.to_json()))
+    stats = json.loads(output)
+
+    assert len(model.transitions) == stats["states"]
+    assert 0 < stats["memory_bytes"]["total"]
+
+
+def test_building_profiled(capsys):
+    output = run_command(args=["build", "--profile"], stream=StringIO(SOURCE))
+
+    assert output
+    assert "declare" in capsys.readouterr().err
+
+
+def test_appending_and_compacting():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        with open(fname, "w") as fout:
+            fout.write(run_command(args=["build"], stream=StringIO("a b.")))
+
+        output = run_command(args=["build", "--append", fname], stream=StringIO("c d."))
+        assert "" == output
+        assert ("c",) in load_model(fname).transitions
+
+        run_command(args=["compact", fname])
+        assert ["model.json"] == os.listdir(tempdir)
+        assert ("c",) in load_model(fname).transitions
+
+
+def test_building_sqlite():
+    import json
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+
+        output = run_command(
+            args=["build", "--storage", storage], stream=StringIO(SOURCE)
+        )
+        assert "" == output
+
+        stats = json.loads(run_command(args=["stats", "-m", storage]))
+        assert len(create_test_model().transitions) == stats["states"]
+
+        output = run_command(args=["generate", "-m", storage, "--words", "10"])
+        assert 10 == len(list(default_tokenizer(output)))
+
+
+@pytest.mark.parametrize(
+    "option", [["--append", "model.json"], ["-o", "model.json"], ["--compress"]]
+)
+def test_building_sqlite_incompatible(option: List[str]):
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+
+        with pytest.raises(IncompatibleOptions):
+            run_command(
+                args=["build", "--storage", storage, *option], stream=StringIO(SOURCE)
+            )
+
+        # the database was not created.
+        assert not os.listdir(tempdir)
+
+
+def test_building_compression_without_output():
+    with pytest.raises(MissingOption):
+        run_command(args=["build", "--compression", "gzip"], stream=StringIO(SOURCE))
+
+
+def test_building_compressed_output():
+    import gzip
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json.gz")
+
+        output = run_command(args=["build", "-o", fname], stream=StringIO(SOURCE))
+        assert "" == output
+
+        with gzip.open(fname, "rt") as fin:
+            assert create_test_model().to_json() == fin.read()
+
+        output = run_command(args=["generate", "-m", fname, "--words", "10"])
+        assert 10 == len(list(default_tokenizer(output)))
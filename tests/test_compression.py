@@ -0,0 +1,89 @@
+import gzip
+import lzma
+import os
+import pytest
+import tempfile
+
+from remarkov.compression import detect_compression, resolve_compression
+from remarkov.error import UnknownCompression
+from remarkov import compact_model, load_model
+from tests import build_model
+
+SOURCE = "The cat sat on the mat. The dog sat on the cat! A bird sang? The end."
+
+
+def test_detect_compression():
+    assert "gzip" == detect_compression("model.json.gz")
+    assert "lzma" == detect_compression("model.json.xz")
+    assert "bz2" == detect_compression("MODEL.JSON.BZ2")
+    assert detect_compression("model.json") is None
+
+    assert resolve_compression("model.json.gz", "none") is None
+    assert "bz2" == resolve_compression("model.json", "bz2")
+
+    with pytest.raises(UnknownCompression):
+        resolve_compression("model.json", "zip")
+
+
+@pytest.mark.parametrize("extension", [".gz", ".xz", ".bz2"])
+@pytest.mark.parametrize("version", [1, 2])
+def test_roundtrip_by_extension(extension, version):
+    model = build_model(SOURCE, order=2)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json" + extension)
+        model.save(fname, version=version)
+
+        with open(fname, "rb") as fin:
+            assert not fin.read().startswith(b"{")
+
+        loaded = load_model(fname, version=version)
+
+    assert dict(model.transitions) == dict(loaded.transitions)
+    assert model.transitions.start_states == loaded.transitions.start_states
+
+
+def test_roundtrip_by_flag():
+    model = build_model(SOURCE, order=2)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+        model.save(fname, compression="lzma")
+
+        with lzma.open(fname, "rt") as fin:
+            assert model.to_json() == fin.read()
+
+        assert dict(model.transitions) == dict(
+            load_model(fname, compression="lzma").transitions
+        )
+
+        plain = os.path.join(tempdir, "model.json.gz")
+        model.save(plain, compression="none")
+
+        with open(plain, "r") as fin:
+            assert model.to_json() == fin.read()
+
+
+def test_compact_keeps_compression():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json.gz")
+        build_model(SOURCE, order=2).save(fname)
+
+        build_model("A fish swam.", order=2).append_delta(fname)
+
+        compact_model(fname)
+
+        assert ["model.json.gz"] == os.listdir(tempdir)
+
+        with gzip.open(fname, "rt") as fin:
+            assert fin.read().startswith("{")
+
+        assert ("A", "fish") in load_model(fname).transitions
+
+
+def test_version_three_not_compressed():
+    with tempfile.TemporaryDirectory() as tempdir:
+        with pytest.raises(AssertionError):
+            build_model(SOURCE, order=2).save(
+                os.path.join(tempdir, "model.bin.gz"), version=3
+            )
@@ -0,0 +1,122 @@
+import os
+import pytest
+import tempfile
+
+from remarkov.delta import append_delta, delta_log_path, read_deltas
+from remarkov.error import InvalidModelFile
+from remarkov import compact_model, load_model
+from tests import build_model
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_replay_deltas(version):
+    full = build_model("a b.").merge(build_model("c d.")).merge(build_model("a e."))
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b.").save(fname, version=version)
+        build_model("c d.").append_delta(fname)
+        build_model("a e.").append_delta(fname)
+
+        assert 2 == len(list(read_deltas(fname)))
+
+        loaded_model = load_model(fname, version=version)
+
+    assert dict(full.transitions) == dict(loaded_model.transitions)
+    assert full.transitions.start_states == loaded_model.transitions.start_states
+
+
+def test_replay_deltas_interned():
+    full = build_model("a b.", intern=True).merge(build_model("c d."))
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b.").save(fname)
+        build_model("c d.", intern=True).append_delta(fname)
+
+        loaded_model = load_model(fname, intern=True)
+
+    assert loaded_model.vocabulary is not None
+    assert full.to_json() == loaded_model.to_json()
+
+
+def test_compact():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b.").save(fname)
+        build_model("c d.").append_delta(fname)
+
+        compacted = compact_model(fname)
+
+        assert not os.path.exists(delta_log_path(fname))
+        assert sorted(os.listdir(tempdir)) == ["model.json"]
+        assert compacted.to_json() == load_model(fname).to_json()
+        assert ("c",) in compacted.transitions
+
+
+@pytest.mark.parametrize("swapped", [False, True])
+def test_interrupted_compaction(swapped):
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b.").save(fname)
+        build_model("a c.").append_delta(fname)
+        expected = load_model(fname).to_json()
+
+        # replay the steps of `compact_model` until the crash.
+        load_model(fname).save(fname + ".compacting")
+        os.replace(delta_log_path(fname), delta_log_path(fname) + ".compacting")
+
+        if swapped:
+            os.replace(fname + ".compacting", fname)
+
+        assert expected == load_model(fname).to_json()
+        assert ["model.json"] == os.listdir(tempdir)
+
+
+def test_interrupted_append_is_ignored():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b.").save(fname)
+        build_model("c d.").append_delta(fname)
+
+        with open(delta_log_path(fname), "a") as fout:
+            fout.write('{"order": 1, "transi')
+
+        assert ("c",) in load_model(fname).transitions
+
+        # the next append removes the incomplete line.
+        build_model("e f.").append_delta(fname)
+
+        loaded_model = load_model(fname)
+
+        assert ("c",) in loaded_model.transitions
+        assert ("e",) in loaded_model.transitions
+
+
+def test_delta_with_other_order():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        build_model("a b c.").save(fname)
+        append_delta(build_model("a b c.", order=2), fname)
+
+        with pytest.raises(InvalidModelFile):
+            load_model(fname)
+
+
+def test_delta_on_frozen_snapshot():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.rmk")
+
+        build_model("a b.").save(fname, version=3)
+        assert load_model(fname, version=3)
+
+        build_model("c d.").append_delta(fname)
+
+        with pytest.raises(InvalidModelFile):
+            load_model(fname, version=3)
@@ -0,0 +1,73 @@
+import json
+import pytest
+
+from remarkov import create_model
+from remarkov.error import ModelIsFrozen
+from remarkov.tokenizer import PUNCT_TERMINATION, default_tokenizer
+
+TEXT = "This is a sample and this is another. Be sure to have multiple. Sentences."
+
+
+def sorted_transitions(model_json: dict) -> list:
+    return sorted(model_json["transitions"], key=lambda transition: transition["state"])
+
+
+def create_frozen_model(order: int = 1, intern: bool = False):
+    model = create_model(order=order, intern=intern)
+    model.add_text(TEXT)
+    return model, model.freeze()
+
+
+@pytest.mark.parametrize("order", [1, 2, 3])
+@pytest.mark.parametrize("intern", [False, True])
+def test_freeze_keeps_transitions(order, intern):
+    model, frozen = create_frozen_model(order=order, intern=intern)
+
+    assert len(model.transitions) == len(frozen.transitions)
+
+    # frozen states are sorted by token id which changes the order of transitions.
+    model_json, frozen_json = json.loads(model.to_json()), json.loads(frozen.to_json())
+    assert sorted_transitions(model_json) == sorted_transitions(frozen_json)
+    assert model_json["start_states"] == frozen_json["start_states"]
+
+
+def test_freeze_lookup():
+    model, frozen = create_frozen_model(order=2)
+    vocabulary = frozen.vocabulary
+
+    for state, successors in model.transitions.items():
+        key = vocabulary.intern_state(state)
+
+        assert key in frozen.transitions
+        assert vocabulary.intern_successors(successors) == frozen.transitions[key]
+
+    assert (vocabulary.get("is"), vocabulary.get("This")) not in frozen.transitions
+    assert (vocabulary.get("This"),) not in frozen.transitions
+
+
+def test_freeze_generate():
+    _, frozen = create_frozen_model(order=2)
+
+    assert 10 == len(list(default_tokenizer(frozen.generate(10).text())))
+
+    text = frozen.generate_sentences(3).text()
+    assert 3 == len([c for c in text if c in PUNCT_TERMINATION])
+
+
+def test_freeze_sample_respects_counts():
+    model = create_model()
+    model.transitions.declare(("a",), "b", 3)
+    model.transitions.declare(("a",), "c")
+    frozen = model.freeze()
+
+    key, b = frozen.vocabulary.intern_state(("a",)), frozen.vocabulary.get("b")
+    samples = [frozen.transitions.sample(key) for _ in range(4000)]
+
+    assert 2500 < samples.count(b) < 3500
+
+
+def test_frozen_is_read_only():
+    _, frozen = create_frozen_model()
+
+    with pytest.raises(ModelIsFrozen):
+        frozen.add_text("More text.")
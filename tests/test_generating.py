@@ -2,8 +2,10 @@ import os.path
 import pytest
 import tempfile
 
+from io import StringIO
+
 from remarkov.error import NoTransitionsDefined
-from remarkov.tokenizer import token_to_lowercase
+from remarkov.tokenizer import default_tokenizer, token_to_lowercase
 from remarkov import create_model, load_model
 
 
@@ -79,3 +81,133 @@ def test_sentence_generation_simple_other_termination():
         text = model.generate_sentences(i).text()
         print(text)
         assert i == len(list(filter(is_sentence_terminator, text)))
+
+
+def test_generate_many():
+    model = create_model(order=2)
+    model.add_text("This is a sample and this is another. Be sure to have multiple.")
+
+    results = model.generate_many(20, 7)
+
+    assert 20 == len(results)
+    assert all(7 == len(list(default_tokenizer(result.text()))) for result in results)
+
+
+def test_generate_many_interned():
+    model = create_model(intern=True)
+    model.add_text("A b. A c.")
+
+    for result in model.generate_many(10, 5):
+        tokens = list(default_tokenizer(result.text()))
+        assert 5 == len(tokens)
+        assert set(tokens) <= {"A", "b", "c", "."}
+
+
+def test_generate_many_restarts_on_dead_end():
+    model = create_model()
+    model.add_text("a b c")
+
+    for result in model.generate_many(10, 9):
+        assert "a b c a b c a b c" == result.text()
+
+
+def test_generate_sentences_many():
+    model = create_model()
+    model.add_text("A. B? C!")
+
+    for i in range(1, 20):
+        for result in model.freeze().generate_sentences_many(3, i):
+            text = result.text()
+            assert i == len(list(filter(is_sentence_terminator, text)))
+            assert is_sentence_terminator(text[-1])
+
+
+SEED_TEXT = "This is a sample and this is another. Be sure to have multiple. Sentences."
+
+
+def test_generate_with_seed():
+    model = create_model()
+    model.add_text(SEED_TEXT)
+
+    assert model.generate(50, seed=7).text() == model.generate(50, seed=7).text()
+    assert (
+        model.generate_sentences(5, seed=7).text()
+        == model.generate_sentences(5, seed=7).text()
+    )
+    assert [result.text() for result in model.generate_many(3, seed=7)] == [
+        result.text() for result in model.generate_many(3, seed=7)
+    ]
+
+
+def test_generate_with_rng():
+    import random
+
+    model = create_model(order=2)
+    model.add_text(SEED_TEXT)
+    frozen = model.freeze()
+
+    for source in [model, frozen]:
+        first = source.generate(50, rng=random.Random(3)).text()
+        assert first == source.generate(50, rng=random.Random(3)).text()
+
+
+def test_model_seed():
+    texts = []
+
+    for _ in range(2):
+        model = create_model(seed=42)
+        model.add_text(SEED_TEXT)
+        texts.append([model.generate(20).text() for _ in range(3)])
+
+    assert texts[0] == texts[1]
+
+
+def test_spawn_rng_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    model = create_model(seed=1)
+    model.add_text(SEED_TEXT)
+    rngs = [model.spawn_rng() for _ in range(4)]
+    states = [rng.getstate() for rng in rngs]
+
+    def generate(rng):
+        return [model.generate(30, rng=rng).text() for _ in range(20)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concurrent_texts = list(executor.map(generate, rngs))
+
+    # every thread must produce the same texts as if it was running alone.
+    for rng, state, texts in zip(rngs, states, concurrent_texts):
+        rng.setstate(state)
+        assert texts == generate(rng)
+
+
+def test_text_chunks_match_text():
+    model = create_model()
+    model.add_text("A short (but fine) text. Another one, with commas! And a question?")
+
+    text = model.generate(500, seed=3).text()
+    chunks = list(model.generate(500, seed=3).iter_text_chunks(chunk_size=16))
+
+    assert text == "".join(chunks)
+    assert 1 < len(chunks)
+    assert all(16 <= len(chunk) for chunk in chunks[:-1])
+
+
+def test_write_to_stream():
+    model = create_model()
+    model.add_text("A short (but fine) text. Another one, with commas! And a question?")
+
+    stream = StringIO()
+    written = model.generate(200, seed=5).write_to(stream, chunk_size=8)
+
+    assert model.generate(200, seed=5).text() == stream.getvalue()
+    assert written == len(stream.getvalue())
+
+
+def test_text_spacing():
+    from remarkov.model import GenerationResult
+
+    tokens = ["(", "Hello", ",", "world", ")", "!", "Next"]
+    assert "(Hello, world)! Next" == GenerationResult(iter(tokens)).text()
+    assert "" == GenerationResult(iter([])).text()
@@ -0,0 +1,74 @@
+import pytest
+import random
+
+from remarkov.error import TokenStreamExhausted
+from remarkov.multi import ROOT, MultiOrderModel
+from remarkov.tokenizer import default_tokenizer, token_to_lowercase
+from remarkov import create_model
+
+SOURCE = "The cat sat on the mat. The dog sat on the cat! A bird sang? The end."
+
+
+@pytest.mark.parametrize("order", [1, 2, 3, 4])
+def test_same_chains_as_models(order):
+    multi = MultiOrderModel(max_order=4, before_insert=token_to_lowercase)
+    multi.add_text(SOURCE)
+    multi.add_text("Another short text.")
+
+    model = create_model(order=order, before_insert=token_to_lowercase)
+    model.add_text(SOURCE)
+    model.add_text("Another short text.")
+
+    extracted = multi.to_model(order)
+
+    assert order == extracted.order
+    assert dict(model.transitions) == dict(extracted.transitions)
+    assert model.transitions.start_states == extracted.transitions.start_states
+
+
+def test_short_text():
+    multi = MultiOrderModel(max_order=3)
+    multi.add_text("a b")
+
+    assert {("a",): {"b": 1}} == dict(multi.to_model(1).transitions)
+    assert {} == dict(multi.to_model(2).transitions)
+
+    with pytest.raises(TokenStreamExhausted):
+        multi.add_text("")
+
+
+def test_find_context():
+    multi = MultiOrderModel(max_order=2)
+    multi.add_text("a b c")
+
+    assert ("a", "b") == multi.state(multi.find_context(["a", "b"]))
+    assert ROOT == multi.find_context(["x", "b"])
+    assert ("b",) == multi.state(multi.find_context(["x", "b"], backoff=True))
+
+
+def test_backoff():
+    multi = MultiOrderModel(max_order=2)
+    # the context `e c` has no successors, but `c` has.
+    multi.add_text("a b c d. e c")
+
+    stream = multi._generate_stream(2, True, random.Random(1))
+    with_backoff = [next(stream) for _ in range(100)]
+
+    stream = multi._generate_stream(2, False, random.Random(1))
+    without_backoff = [next(stream) for _ in range(100)]
+
+    with_backoff, without_backoff = "".join(with_backoff), "".join(without_backoff)
+
+    assert 0 < with_backoff.count("ec") == with_backoff.count("ecd")
+    assert 0 < without_backoff.count("ec") == without_backoff.count("eca")
+
+
+def test_generate():
+    multi = MultiOrderModel(max_order=3, seed=3)
+    multi.add_text(SOURCE)
+
+    assert 20 == len(list(default_tokenizer(multi.generate(20, order=1).text())))
+    assert multi.generate(20, seed=1).text() == multi.generate(20, seed=1).text()
+
+    with pytest.raises(AssertionError):
+        multi.generate(order=4)
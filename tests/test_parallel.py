@@ -0,0 +1,88 @@
+import os.path
+import pytest
+import tempfile
+
+from remarkov import create_model
+from remarkov.parallel import build_parallel
+from remarkov.tokenizer import create_ngram_tokenizer, token_to_lowercase
+
+TEXTS = [
+    "This is a sample and this is another.",
+    "Be sure to have multiple. Sentences.",
+    "Another sample is here. And this is the end.",
+]
+
+
+def write_texts(tempdir: str) -> list:
+    paths = []
+
+    for i, text in enumerate(TEXTS):
+        path = os.path.join(tempdir, f"{i}.txt")
+
+        with open(path, "w") as fout:
+            fout.write(text)
+
+        paths.append(path)
+
+    return paths
+
+
+def test_merge_equals_sequential():
+    model = create_model(order=2)
+    merged_model = create_model(order=2)
+
+    for text in TEXTS:
+        model.add_text(text)
+
+        shard = create_model(order=2)
+        shard.add_text(text)
+        merged_model.merge(shard)
+
+    assert model.transitions == merged_model.transitions
+    assert model.transitions.start_states == merged_model.transitions.start_states
+
+
+def test_merge_translates_vocabulary():
+    model, other = create_model(), create_model(intern=True)
+    model.add_text(TEXTS[0])
+    other.add_text(TEXTS[1])
+
+    merged_model = create_model(intern=True).merge(model).merge(other)
+
+    expected_model = create_model()
+    expected_model.add_text(TEXTS[0])
+    expected_model.add_text(TEXTS[1])
+
+    assert expected_model.to_json() == merged_model.to_json()
+
+
+def test_merge_different_order():
+    with pytest.raises(AssertionError):
+        create_model(order=1).merge(create_model(order=2))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_parallel(workers):
+    with tempfile.TemporaryDirectory() as tempdir:
+        paths = write_texts(tempdir)
+
+        model = create_model(order=2, before_insert=token_to_lowercase)
+        for path in paths:
+            model.add_file(path)
+
+        parallel_model = build_parallel(
+            paths, workers=workers, order=2, before_insert=token_to_lowercase
+        )
+
+    assert model.transitions == parallel_model.transitions
+    assert model.transitions.start_states == parallel_model.transitions.start_states
+
+
+def test_build_parallel_ngrams():
+    tokenizer = create_ngram_tokenizer(3)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        paths = write_texts(tempdir)
+        parallel_model = build_parallel(paths, workers=2, tokenizer=tokenizer)
+
+    assert all(3 == len(state[0]) for state in parallel_model.transitions)
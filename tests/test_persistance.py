@@ -1,6 +1,13 @@
 import json
+import os.path
+import pytest
 import tempfile
+
+from io import StringIO
 from remarkov import create_model, load_model, parse_model
+from remarkov.error import InvalidModelFile
+from remarkov.frozen import FrozenTransitions
+from remarkov.persistance import V1Decoder, V2Decoder
 
 
 def test_persist_version_one():
@@ -97,3 +104,256 @@ def test_v2_is_smaller():
 
     # v2 is at least 10% smaller
     assert len(v2_model) < len(v1_model) * 0.9
+
+
+def test_interned_model_persists_tokens():
+    model = create_model(intern=True)
+    model.add_text("a a b. a a")
+
+    plain_model = create_model()
+    plain_model.add_text("a a b. a a")
+
+    assert plain_model.to_json() == model.to_json()
+    assert plain_model.to_json(version=1) == model.to_json(version=1)
+
+
+def test_load_interned():
+    model = create_model()
+    model.add_text("a a b. a a")
+    loaded_model = parse_model(model.to_json(), intern=True)
+
+    assert loaded_model.vocabulary is not None
+    assert (loaded_model.vocabulary.get("a"),) in loaded_model.transitions
+    assert model.to_json() == loaded_model.to_json()
+
+
+def test_version_three_roundtrip():
+    model = create_model(order=2)
+    model.add_text(
+        "This is a sample and this is another. Be sure to have multiple. Sentences."
+    )
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.rmk")
+        model.save(fname, version=3)
+
+        loaded_model = load_model(fname, version=3)
+
+        assert 2 == loaded_model.order
+        assert isinstance(loaded_model.transitions, FrozenTransitions)
+        assert model.freeze().to_json() == loaded_model.to_json()
+        assert loaded_model.generate(10).text()
+
+
+def test_version_three_unicode_tokens():
+    model = create_model()
+    model.add_text("Grüße aus Köln. Даже кириллица.")
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.rmk")
+        model.save(fname, version=3)
+
+        loaded_model = load_model(fname, version=3)
+        assert model.vocabulary is None
+        assert {"Grüße", "Köln", "Даже"} <= set(loaded_model.vocabulary.tokens)
+
+
+def test_version_three_invalid_file():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.json")
+
+        with open(fname, "w") as fout:
+            fout.write(create_model().to_json())
+
+        with pytest.raises(InvalidModelFile):
+            load_model(fname, version=3)
+
+
+class TrickleStream(StringIO):
+    """
+    Returns at most a few characters per read to exercise chunk boundaries.
+    """
+
+    def read(self, size=-1):
+        return super().read(3)
+
+
+@pytest.mark.parametrize("version", [1, 2])
+@pytest.mark.parametrize("compress", [False, True])
+def test_streaming_decoder(version, compress):
+    model = create_model(order=2)
+    model.add_text(
+        "This is a sample and this is another. Be sure to have multiple. Sentences."
+    )
+    model.transitions.declare(("a", "b"), "c", 120)
+    raw = model.to_json(version=version, compress=compress)
+
+    decoder = V2Decoder() if 2 == version else V1Decoder()
+    loaded_model = decoder.load(TrickleStream(raw))
+
+    assert 2 == loaded_model.order
+    assert model.transitions == loaded_model.transitions
+    assert model.transitions.start_states == loaded_model.transitions.start_states
+
+
+def test_streaming_decoder_large_values():
+    model = create_model()
+    model.transitions.declare(("a",), "b", 200000)
+    raw = model.to_json(version=1)
+
+    loaded_model = V1Decoder().load(StringIO(raw))
+    assert {"b": 200000} == loaded_model.transitions[("a",)]
+
+
+def test_streaming_decoder_intern():
+    model = create_model()
+    model.add_text("a a b. a a")
+    loaded_model = V2Decoder(intern=True).load(StringIO(model.to_json()))
+
+    assert (loaded_model.vocabulary.get("a"),) in loaded_model.transitions
+    assert model.to_json() == loaded_model.to_json()
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "",
+        "[]",
+        '{"order": 1, "transitions": []}',
+        '{"order": 1, "transitions": [], "start_states": [}',
+        '{"order": 1, "transitions": [], "start_states": []',
+    ],
+)
+def test_streaming_decoder_invalid(raw):
+    with pytest.raises(InvalidModelFile):
+        V2Decoder().load(StringIO(raw))
+
+
+def test_persist_start_state_counts():
+    model = create_model()
+    model.add_text("a b. a c. b a.")
+
+    v2_model = json.loads(model.to_json(version=2))
+    assert [["a"], ["b"]] == v2_model["start_states"]
+    assert [2, 1] == v2_model["start_state_counts"]
+
+    v1_model = json.loads(model.to_json(version=1))
+    assert [["a"], ["a"], ["b"]] == v1_model["start_states"]
+    assert "start_state_counts" not in v1_model
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_load_start_state_counts(version):
+    model = create_model()
+    model.add_text("a b. a c. b a.")
+    raw = model.to_json(version=version)
+
+    decoder = V2Decoder() if 2 == version else V1Decoder()
+
+    loaded_models = [parse_model(raw, version=version), decoder.load(StringIO(raw))]
+
+    for loaded_model in loaded_models:
+        assert {("a",): 2, ("b",): 1} == loaded_model.transitions.start_states
+
+
+@pytest.mark.parametrize("intern", [False, True])
+def test_streaming_decoder_start_state_counts_first(intern):
+    raw = json.dumps(
+        {
+            "order": 1,
+            "start_state_counts": [1, 3],
+            "transitions": [{"state": ["a"], "tokens": {"b": 1}}],
+            "start_states": [["a"], ["b"]],
+        }
+    )
+
+    loaded_model = V2Decoder(intern=intern).load(StringIO(raw))
+    start_states = {
+        (
+            state
+            if loaded_model.vocabulary is None
+            else loaded_model.vocabulary.resolve_state(state)
+        ): count
+        for state, count in loaded_model.transitions.start_states.items()
+    }
+
+    assert {("a",): 1, ("b",): 3} == start_states
+
+
+def test_version_three_start_state_counts():
+    model = create_model()
+    model.add_text("a b. a c. b a.")
+    model.transitions.declare_start(("missing",))
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.rmk")
+        model.save(fname, version=3)
+
+        loaded_model = load_model(fname, version=3)
+        start_states = {
+            loaded_model.vocabulary.resolve_state(state): count
+            for state, count in loaded_model.transitions.start_states.items()
+        }
+
+    # start states without successors are dropped on freeze.
+    assert {("a",): 2, ("b",): 1} == start_states
+
+
+@pytest.mark.parametrize("version", [1, 2])
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("intern", [False, True])
+def test_dump_same_as_json(version, compress, intern):
+    model = create_model(order=2, intern=intern)
+    model.add_text("This is a sample and this is another. Have üñí. Text.")
+    model.add_text("This is a sample.")
+    output = StringIO()
+
+    model.dump(output, version=version, compress=compress)
+
+    assert model.to_json(version=version, compress=compress) == output.getvalue()
+
+
+@pytest.mark.parametrize("version", [1, 2])
+@pytest.mark.parametrize("compress", [False, True])
+def test_dump_empty_model(version, compress):
+    model = create_model()
+    output = StringIO()
+
+    model.dump(output, version=version, compress=compress)
+
+    assert model.to_json(version=version, compress=compress) == output.getvalue()
+    assert {"order": 1, "transitions": [], "start_states": []} == json.loads(
+        output.getvalue()
+    )
+
+
+def test_dump_version_three():
+    from io import BytesIO
+
+    model = create_model()
+    model.add_text("This is a sample and this is another.")
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.bin")
+        model.save(fname, version=3)
+        output = BytesIO()
+        model.dump(output, version=3)
+
+        with open(fname, "rb") as fin:
+            assert fin.read() == output.getvalue()
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_dead_start_states_not_persisted(version):
+    model = create_model()
+    model.add_text("a b. c d.")
+    model.transitions.declare_start(("x",), 3)
+
+    loaded = parse_model(model.to_json(version=version), version=version)
+
+    assert ("x",) not in loaded.transitions.start_states
+    # the serialized model is left untouched.
+    assert 3 == model.transitions.start_states[("x",)]
+
+    del model.transitions.start_states[("x",)]
+    assert model.transitions.start_states == loaded.transitions.start_states
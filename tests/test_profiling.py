@@ -0,0 +1,75 @@
+from remarkov.profiling import Profiler
+from remarkov import create_model
+
+
+def test_profiler_wrap_and_iterate():
+    profiler = Profiler()
+
+    double = profiler.wrap("double", lambda x: 2 * x)
+    assert [2, 4, 6] == [double(x) for x in profiler.iterate("items", [1, 2, 3])]
+
+    assert 3 == profiler.phases["double"].calls
+    assert 3 == profiler.phases["items"].calls
+
+    with profiler.measure("block"):
+        profiler.count("event", 5)
+
+    assert 1 == profiler.phases["block"].calls
+    assert 5 == profiler.phases["event"].calls
+    assert 0 == profiler.phases["event"].seconds
+    assert {"calls": 1} == {"calls": profiler.to_dict()["block"]["calls"]}
+    assert "double" in profiler.summary()
+
+
+def test_profile_building():
+    model = create_model()
+    model.profiler = Profiler()
+    model.add_text("a b c. d e f.")
+    model.to_json()
+
+    phases = model.profiler.phases
+
+    assert 7 == phases["declare"].calls
+    assert 7 == phases["prepare"].calls
+    assert 8 == phases["tokenize"].calls
+    assert 2 == phases["declare_start"].calls
+    assert 1 == phases["encode"].calls
+
+
+def test_profile_generating():
+    model = create_model()
+    model.add_text("a b c")
+    model.profiler = Profiler()
+
+    # `c` is a dead end which restarts generation.
+    model.generate(20).text()
+    model.generate_many(2, 20)
+
+    phases = model.profiler.phases
+
+    assert 0 < phases["restart"].calls
+    assert phases["start_state"].calls == phases["restart"].calls + 3
+    # each start state and each successful sample emits one token.
+    emitted = phases["start_state"].calls + phases["sample"].calls
+    assert 3 * 20 == emitted - phases["restart"].calls
+
+
+def test_profile_generating_sentences():
+    model = create_model()
+    model.add_text("a b c. d e f.")
+    model.profiler = Profiler()
+
+    model.generate_sentences(3).text()
+
+    phases = model.profiler.phases
+
+    assert 1 == phases["analyze_termination"].calls
+    assert 0 < phases["sample"].calls
+
+
+def test_profiling_is_disabled_by_default():
+    model = create_model()
+    model.add_text("a b c")
+
+    assert model.profiler is None
+    assert model.generate(10).text()
@@ -0,0 +1,32 @@
+import pytest
+
+from remarkov.sampling import AliasSampler
+
+
+def test_alias_sampler_single_value():
+    sampler = AliasSampler(["a"], [5])
+
+    assert all("a" == sampler.sample() for _ in range(100))
+
+
+def test_alias_sampler_empty():
+    with pytest.raises(AssertionError):
+        AliasSampler([], [])
+
+
+def test_alias_sampler_distribution():
+    sampler = AliasSampler(["a", "b", "c"], [1, 2, 7])
+    samples = [sampler.sample() for _ in range(10000)]
+
+    assert 700 < samples.count("a") < 1300
+    assert 1600 < samples.count("b") < 2400
+    assert 6500 < samples.count("c") < 7500
+
+
+def test_alias_sampler_exact_columns():
+    sampler = AliasSampler(["a", "b"], [1, 3])
+
+    # with two columns, [0, 0.5) selects "a" and [0.5, 1) selects "b" or its alias.
+    assert "a" == sampler.sample(lambda: 0.0)
+    assert "b" == sampler.sample(lambda: 0.49)
+    assert "b" == sampler.sample(lambda: 0.75)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+from remarkov import create_model
+from remarkov.server import ModelServer, parse_model_argument
+from remarkov.tokenizer import PUNCT_TERMINATION, default_tokenizer
+
+SOURCE = "This is a sample and this is another. Be sure to have multiple. Sentences."
+
+
+async def fetch(port: int, target: str, method: str = "GET"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+
+    head, body = response.split(b"\r\n\r\n", 1)
+    status = int(head.split(b" ")[1])
+
+    return status, json.loads(body)
+
+
+def run_with_server(client, **models):
+    async def run():
+        server = ModelServer(models, workers=2)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+
+        try:
+            async with listener:
+                return await client(port, server)
+        finally:
+            server.close()
+
+    return asyncio.run(run())
+
+
+def create_test_model(**kwargs):
+    model = create_model(**kwargs)
+    model.add_text(SOURCE)
+    return model
+
+
+def test_generate():
+    async def client(port, _):
+        return await fetch(port, "/generate?words=12")
+
+    status, body = run_with_server(client, sample=create_test_model())
+
+    assert 200 == status
+    assert 12 == len(list(default_tokenizer(body["text"])))
+
+
+def test_generate_sentences_named_model():
+    async def client(port, _):
+        return await fetch(port, "/generate_sentences?model=second&sentences=2")
+
+    status, body = run_with_server(
+        client, first=create_test_model(), second=create_test_model(order=2)
+    )
+
+    assert 200 == status
+    assert 2 == len([c for c in body["text"] if c in PUNCT_TERMINATION])
+
+
+def test_generate_seed():
+    async def client(port, _):
+        first = await fetch(port, "/generate?words=30&seed=5")
+        second = await fetch(port, "/generate?words=30&seed=5")
+        return first, second
+
+    first, second = run_with_server(client, sample=create_test_model())
+
+    assert first == second
+
+
+def test_concurrent_requests_and_metrics():
+    async def client(port, _):
+        responses = await asyncio.gather(
+            *[fetch(port, "/generate?words=20") for _ in range(10)]
+        )
+        return responses, await fetch(port, "/metrics")
+
+    responses, (status, metrics) = run_with_server(client, sample=create_test_model())
+
+    assert all(200 == status for status, _ in responses)
+    assert 200 == status
+    assert 10 == metrics["/generate"]["requests"]
+    assert 0 == metrics["/generate"]["errors"]
+
+    latency = metrics["/generate"]
+    assert 0 <= latency["p50_seconds"] <= latency["max_seconds"]
+
+
+def test_errors():
+    async def client(port, _):
+        return [
+            await fetch(port, "/unknown"),
+            await fetch(port, "/generate?model=missing"),
+            await fetch(port, "/generate?model=a&words=abc"),
+            await fetch(port, "/generate?model=a&words=0"),
+            await fetch(port, "/generate?model=a", method="POST"),
+        ]
+
+    responses = run_with_server(client, a=create_test_model(), b=create_test_model())
+
+    assert [404, 404, 400, 400, 405] == [status for status, _ in responses]
+    assert all("error" in body for _, body in responses)
+
+
+def test_sentences_share_word_budget():
+    import pytest
+    from remarkov.server import RequestError
+
+    server = ModelServer({"sample": create_test_model()}, max_words=20)
+
+    try:
+        body = server._generate_sentences({"sentences": "2"})
+        assert len(list(default_tokenizer(body["text"]))) <= 20
+
+        with pytest.raises(RequestError) as error:
+            server._generate_sentences({"sentences": "20"})
+
+        assert 400 == error.value.status
+    finally:
+        server.close()
+
+
+def test_models():
+    async def client(port, _):
+        return await fetch(port, "/models")
+
+    _, body = run_with_server(client, b=create_test_model(), a=create_test_model())
+
+    assert ["a", "b"] == body["models"]
+
+
+def test_parse_model_argument():
+    assert ("news", "/tmp/a.json") == parse_model_argument("news=/tmp/a.json")
+    assert ("model", "/tmp/model.json") == parse_model_argument("/tmp/model.json")
@@ -0,0 +1,62 @@
+import pytest
+
+from remarkov.stats import branching_bucket, entropy
+from remarkov import create_model
+
+
+def test_branching_bucket():
+    assert "1" == branching_bucket(1)
+    assert "2-3" == branching_bucket(2)
+    assert "2-3" == branching_bucket(3)
+    assert "4-7" == branching_bucket(5)
+    assert "8-15" == branching_bucket(8)
+
+
+def test_entropy():
+    assert 0 == entropy([7])
+    assert 1 == pytest.approx(entropy([3, 3]))
+    assert 2 == pytest.approx(entropy([1, 1, 1, 1]))
+
+
+@pytest.mark.parametrize("intern", [False, True])
+def test_stats(intern):
+    model = create_model(intern=intern)
+    model.add_text("a b. a b. a c.")
+
+    stats = model.stats().to_dict()
+
+    assert 4 == stats["states"]
+    assert 5 == stats["distinct_transitions"]
+    assert 8 == stats["total_transitions"]
+    assert 4 == stats["vocabulary_size"]
+    assert 1 == stats["start_states"]
+    assert 3 == stats["start_state_declarations"]
+    assert 3 == stats["start_state_duplication"]
+    assert {"1": 3, "2-3": 1} == stats["branching"]
+    assert 0 == stats["entropy_bits"]["min"]
+    assert entropy([2, 1]) == pytest.approx(stats["entropy_bits"]["max"])
+    assert stats["memory_bytes"]["total"] == sum(
+        size for name, size in stats["memory_bytes"].items() if "total" != name
+    )
+
+
+def test_stats_frozen():
+    model = create_model()
+    model.add_text("a b. a b. a c.")
+
+    stats = model.stats().to_dict()
+    frozen_stats = model.freeze().stats().to_dict()
+
+    assert frozen_stats["frozen"]
+    assert frozen_stats["branching"] == stats["branching"]
+    assert frozen_stats["total_transitions"] == stats["total_transitions"]
+    assert "cum_weights" in frozen_stats["memory_bytes"]
+    assert frozen_stats["memory_bytes"]["total"] < stats["memory_bytes"]["total"]
+
+
+def test_stats_empty_model():
+    stats = create_model().stats().to_dict()
+
+    assert 0 == stats["states"]
+    assert stats["entropy_bits"] is None
+    assert stats["start_state_duplication"] is None
@@ -0,0 +1,250 @@
+import os
+import pytest
+import random
+import tempfile
+
+from remarkov.error import InvalidModelFile, InvalidStorage
+from remarkov.model import Transitions
+from remarkov.storage import SqliteTransitions, open_transitions
+from remarkov import create_model, load_model
+from tests import build_model
+
+SOURCE = "The cat sat on the mat. The dog sat on the cat. A bird sang."
+
+
+@pytest.mark.parametrize("order", [1, 2])
+def test_same_transitions_as_memory(order):
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        memory = build_model(SOURCE, order=order)
+        stored = build_model(SOURCE, order=order, storage=storage)
+
+        assert isinstance(stored.transitions, SqliteTransitions)
+        assert dict(memory.transitions) == dict(stored.transitions.items())
+        assert dict(memory.transitions.start_states) == dict(
+            stored.transitions.start_states.items()
+        )
+        assert len(memory.transitions) == len(stored.transitions)
+
+        stored.transitions.close()
+
+
+def test_tokens_with_separators():
+    source = 'a\x1fb c. d "e", f.'
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        memory = build_model(source, order=2)
+        stored = build_model(
+            source, order=2, storage=f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        )
+
+        assert ("a\x1fb", "c") in dict(stored.transitions.items())
+        assert dict(memory.transitions) == dict(stored.transitions.items())
+        assert dict(memory.transitions.start_states) == dict(
+            stored.transitions.start_states.items()
+        )
+
+        stored.transitions.close()
+
+
+def test_batched_inserts():
+    with tempfile.TemporaryDirectory() as tempdir:
+        transitions = SqliteTransitions(
+            os.path.join(tempdir, "model.db"), order=1, batch_size=2
+        )
+
+        for token in ["b", "c", "b"]:
+            transitions.declare(("a",), token)
+
+        # the last declaration is still pending but reads include it.
+        assert 1 == len(transitions._pending)
+        assert {"b": 2, "c": 1} == transitions[("a",)]
+        assert not transitions._pending
+
+        transitions.close()
+
+
+def test_reopen_database():
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        memory = build_model(SOURCE, order=2)
+        stored = build_model(SOURCE, order=2, storage=storage)
+        stored.transitions.close()
+
+        loaded = load_model(storage)
+
+        assert 2 == loaded.order
+        assert dict(memory.transitions) == dict(loaded.transitions.items())
+
+        # new text is added to the existing transitions.
+        loaded.add_text(SOURCE)
+        memory.add_text(SOURCE)
+
+        assert dict(memory.transitions) == dict(loaded.transitions.items())
+
+        loaded.transitions.close()
+
+
+def test_order_mismatch():
+    with tempfile.TemporaryDirectory() as tempdir:
+        fname = os.path.join(tempdir, "model.db")
+        SqliteTransitions(fname, order=1).close()
+
+        with pytest.raises(InvalidModelFile):
+            SqliteTransitions(fname, order=2)
+
+        with pytest.raises(InvalidModelFile):
+            load_model(f"sqlite:{os.path.join(tempdir, 'empty.db')}")
+
+
+def test_generate():
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        memory = build_model(SOURCE)
+        stored = build_model(SOURCE, storage=storage)
+        tokens = {token for state in memory.transitions for token in state}
+
+        assert stored.generate(50, seed=3).text() == stored.generate(50, seed=3).text()
+        assert 50 == len(list(stored._generate_stream_with_limit(50)))
+        assert set(stored._generate_stream_with_limit(50)) <= tokens
+
+        sentences = stored.generate_sentences(3, max_tokens=20).text()
+        assert sentences.endswith(".")
+
+        stored.transitions.close()
+
+
+@pytest.mark.parametrize("order", [1, 2])
+def test_distances(order):
+    from remarkov.storage import SqliteDistances
+    from remarkov.termination import compute_distances
+    from remarkov.tokenizer import PUNCT_TERMINATION
+
+    rng = random.Random(7)
+    source = " ".join(rng.choice("a b c d e f . ! ?".split()) for _ in range(500))
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        memory = build_model(source, order=order)
+
+        stored = create_model(order=order)
+        stored.transitions = SqliteTransitions(
+            os.path.join(tempdir, "model.db"), order=order, batch_size=3
+        )
+        stored.add_text(source)
+
+        index = stored.transitions.analyze_termination(PUNCT_TERMINATION)
+
+        assert isinstance(index.distances, SqliteDistances)
+        assert compute_distances(memory.transitions.items(), PUNCT_TERMINATION) == {
+            state: index.distances[state] for state in index.distances
+        }
+        assert len(memory.transitions.analyze_termination(PUNCT_TERMINATION)) == len(
+            index
+        )
+
+        stored.transitions.close()
+
+
+def test_sampler_cache():
+    with tempfile.TemporaryDirectory() as tempdir:
+        transitions = SqliteTransitions(
+            os.path.join(tempdir, "model.db"), order=1, cache_size=2
+        )
+
+        for token in "abcd":
+            transitions.declare((token,), "x")
+
+        for token in "abcd":
+            transitions.sample((token,), random.random)
+
+        assert [("c",), ("d",)] == list(transitions._cache)
+
+        with pytest.raises(KeyError):
+            transitions.sample(("z",), random.random)
+
+        # new transitions invalidate cached samplers.
+        transitions.declare(("d",), "y")
+        assert not transitions._cache
+
+        transitions.close()
+
+
+def test_sampler_cache_threads():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        transitions = SqliteTransitions(
+            os.path.join(tempdir, "model.db"), order=1, cache_size=4
+        )
+        states = [(str(i),) for i in range(32)]
+
+        for state in states:
+            transitions.declare(state, "x")
+
+        errors = []
+
+        def work(seed: int):
+            rng = random.Random(seed)
+
+            try:
+                for _ in range(500):
+                    assert "x" == transitions.sample(rng.choice(states), rng.random)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        assert [] == errors
+        assert len(transitions._cache) <= 4
+
+        transitions.close()
+
+
+def test_prune():
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        memory = build_model(SOURCE)
+        stored = build_model(SOURCE, storage=storage)
+
+        memory_report = memory.prune(min_count=2, top_k=1)
+        stored_report = stored.prune(min_count=2, top_k=1)
+
+        assert dict(memory.transitions) == dict(stored.transitions.items())
+        assert dict(memory.transitions.start_states) == dict(
+            stored.transitions.start_states.items()
+        )
+        assert memory_report.removed_states == stored_report.removed_states
+        assert memory_report.removed_transitions == stored_report.removed_transitions
+
+        stored.transitions.close()
+
+
+def test_stats():
+    with tempfile.TemporaryDirectory() as tempdir:
+        storage = f"sqlite:{os.path.join(tempdir, 'model.db')}"
+        memory = build_model(SOURCE)
+        stored = build_model(SOURCE, storage=storage)
+        memory_stats, stored_stats = memory.stats(), stored.stats()
+
+        assert memory_stats.states == stored_stats.states
+        assert memory_stats.total_transitions == stored_stats.total_transitions
+        assert 0 < stored_stats.memory["database"]
+
+        stored.transitions.close()
+
+
+def test_open_transitions():
+    assert isinstance(open_transitions(None, 1), Transitions)
+    assert isinstance(open_transitions("memory", 1), Transitions)
+
+    with pytest.raises(InvalidStorage):
+        open_transitions("redis:localhost", 1)
+
+    with pytest.raises(AssertionError):
+        create_model(intern=True, storage="sqlite::memory:")
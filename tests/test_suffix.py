@@ -0,0 +1,209 @@
+import pytest
+
+from array import array
+
+from remarkov.error import PruningNotSupported
+from remarkov.suffix import (
+    SEPARATOR,
+    SuffixTransitions,
+    build_suffix_array,
+    with_order,
+)
+from remarkov.tokenizer import default_tokenizer
+from remarkov import create_model
+from tests import build_model
+
+SOURCE = "The cat sat on the mat. The dog sat on the cat! A bird sang? The end"
+TEXTS = [SOURCE, "Another short text."]
+
+
+def test_build_suffix_array():
+    corpus = array("i", [3, 1, 2, 1, 2, SEPARATOR, 1, 2, SEPARATOR])
+    suffixes = build_suffix_array(corpus)
+
+    def suffix(position):
+        return corpus[position:].tolist()
+
+    assert sorted(range(len(corpus)), key=suffix) == suffixes.tolist()
+    assert [] == build_suffix_array(array("i")).tolist()
+
+
+@pytest.mark.parametrize("order", [1, 2, 3])
+def test_same_transitions_as_memory(order):
+    model = build_model(*TEXTS, order=order, intern=True)
+    indexed = build_model(*TEXTS, order=order, storage="suffix")
+
+    assert isinstance(indexed.transitions, SuffixTransitions)
+    assert dict(model.transitions) == dict(indexed.transitions.items())
+    assert model.transitions.start_states == dict(
+        indexed.transitions.start_states.items()
+    )
+    assert len(model.transitions) == len(indexed.transitions)
+
+    for state, successors in model.transitions.items():
+        assert successors == indexed.transitions[state]
+
+
+def test_any_order():
+    indexed = build_model(SOURCE, order=1, storage="suffix")
+
+    for order in [2, 4]:
+        model = build_model(SOURCE, order=order, intern=True)
+
+        reordered = with_order(indexed, order)
+
+        assert dict(model.transitions) == dict(reordered.transitions.items())
+        assert model.transitions.start_states == dict(
+            reordered.transitions.start_states.items()
+        )
+
+
+def test_any_order_start_states():
+    texts = ["? a ? a e ! c c d a d d ! . . ?", "a ! c d ! a ? . d ! ? . !"]
+    indexed = build_model(*texts, order=1, storage="suffix")
+
+    for order in [1, 2, 3]:
+        model = build_model(*texts, order=order, intern=True)
+
+        reordered = with_order(indexed, order)
+
+        assert model.transitions.start_states == dict(
+            reordered.transitions.start_states.items()
+        )
+
+    # lower orders would miss start states without successor at the higher order.
+    indexed = build_model(texts[0], order=2, storage="suffix")
+
+    with pytest.raises(AssertionError):
+        with_order(indexed, 1)
+
+
+@pytest.mark.parametrize("order", [1, 2, 3])
+def test_distances(order):
+    import random
+
+    from remarkov.suffix import SuffixDistances
+
+    rng = random.Random(7)
+    source = " ".join(rng.choice("a b c d e f . ! ?".split()) for _ in range(500))
+
+    model = build_model(source, order=order, intern=True)
+    indexed = build_model(source, order=order, storage="suffix")
+
+    terminators = model._stored_terminators()
+    expected = model.transitions.analyze_termination(terminators)
+    index = indexed.transitions.analyze_termination(terminators)
+
+    assert isinstance(index.distances, SuffixDistances)
+    assert dict(expected.distances) == dict(index.distances.items())
+    assert (-2,) * order not in index.distances
+
+    # derived models share the corpus but have distances of their own order.
+    base = build_model(source, order=1, storage="suffix")
+    reordered = with_order(base, order).transitions.analyze_termination(terminators)
+
+    assert dict(index.distances.items()) == dict(reordered.distances.items())
+
+
+def test_merge():
+    model = build_model(*TEXTS, order=2, intern=True)
+    indexed = create_model(order=2, storage="suffix").merge(model)
+
+    assert dict(model.transitions) == dict(indexed.transitions.items())
+    assert model.transitions.start_states == dict(
+        indexed.transitions.start_states.items()
+    )
+
+
+def test_generate():
+    indexed = build_model(*TEXTS, order=2, storage="suffix")
+    words = set(default_tokenizer(SOURCE + " Another short text."))
+
+    text = indexed.generate(50, seed=1).text()
+    assert text == indexed.generate(50, seed=1).text()
+    assert set(default_tokenizer(text)) <= words
+
+    sentences = indexed.generate_sentences(3, seed=1, max_tokens=20).text()
+    assert sentences[-1] in ".!?"
+
+
+def test_sample_dead_end():
+    indexed = build_model(*TEXTS, order=1, storage="suffix")
+    end = indexed.vocabulary.ids["end"]
+
+    with pytest.raises(KeyError):
+        indexed.transitions.sample((end,))
+
+    assert (end,) not in indexed.transitions
+
+
+def test_stats():
+    model = build_model(*TEXTS, order=2, intern=True)
+    indexed = build_model(*TEXTS, order=2, storage="suffix")
+    model_stats, indexed_stats = model.stats(), indexed.stats()
+
+    assert model_stats.states == indexed_stats.states
+    assert model_stats.total_transitions == indexed_stats.total_transitions
+    assert 0 < indexed_stats.memory["suffix_array"]
+
+
+def test_prune():
+    indexed = build_model(*TEXTS, order=1, storage="suffix")
+
+    with pytest.raises(PruningNotSupported):
+        indexed.prune(min_count=2)
+
+
+def test_start_states_counted_once():
+    model = build_model(*TEXTS, order=1, intern=True)
+    indexed = build_model(*TEXTS, order=1, storage="suffix")
+    counts = indexed.transitions.start_states._counts()
+
+    assert counts is indexed.transitions.start_states._counts()
+    assert dict(model.transitions.start_states) == counts
+
+    indexed.add_text("Yet another text.")
+
+    assert counts is not indexed.transitions.start_states._counts()
+    assert len(counts) + 1 == len(indexed.transitions.start_states)
+
+
+def test_cache_threads():
+    import random
+    import sys
+    import threading
+
+    transitions = SuffixTransitions(order=1, cache_size=2)
+    states = [(i,) for i in range(4)]
+
+    for state in states:
+        transitions.declare(state, 100)
+
+    errors = []
+
+    def work(seed: int):
+        rng = random.Random(seed)
+
+        try:
+            for _ in range(50000):
+                lower, upper = transitions._bounds(rng.choice(states))
+                assert upper - lower == 1
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    interval = sys.getswitchinterval()
+    # switch threads often to provoke interleaved cache updates.
+    sys.setswitchinterval(1e-6)
+
+    try:
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert [] == errors
+    assert len(transitions._cache) <= 2
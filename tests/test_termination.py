@@ -0,0 +1,122 @@
+import pytest
+
+from remarkov.error import NoSentenceTerminator, TokenBudgetExceeded
+from remarkov.termination import compute_distances
+from remarkov.tokenizer import PUNCT_TERMINATION, default_tokenizer
+from remarkov import create_model
+
+
+def count_sentences(text: str) -> int:
+    return sum(c in PUNCT_TERMINATION for c in text)
+
+
+def test_compute_distances():
+    model = create_model()
+    model.add_text("a b c . d e")
+
+    distances = compute_distances(model.transitions.items(), PUNCT_TERMINATION)
+
+    assert {("a",): 3, ("b",): 2, ("c",): 1} == distances
+
+
+def test_compute_distances_takes_shortest_path():
+    model = create_model()
+    model.add_text("a b c d . a d .")
+
+    distances = compute_distances(model.transitions.items(), PUNCT_TERMINATION)
+
+    assert 2 == distances[("a",)]
+    assert 3 == distances[("b",)]
+
+
+def test_compute_distances_higher_order():
+    model = create_model(order=2)
+    model.add_text("a b c . d e f")
+
+    distances = compute_distances(model.transitions.items(), PUNCT_TERMINATION)
+
+    assert {("a", "b"): 2, ("b", "c"): 1} == distances
+
+
+def test_generation_avoids_endless_paths():
+    model = create_model()
+    # `trap` only leads to itself and never terminates.
+    model.add_text("start loop . start trap trap trap trap trap")
+
+    for seed in range(50):
+        text = model.generate_sentences(3, seed=seed).text()
+        assert 3 == count_sentences(text)
+        assert "trap" not in text
+
+
+def test_generation_without_terminator_fails():
+    model = create_model()
+    model.add_text("this text never ends")
+
+    with pytest.raises(NoSentenceTerminator):
+        model.generate_sentences(1).text()
+
+    with pytest.raises(NoSentenceTerminator):
+        model.generate_sentences_many(2, 1)
+
+
+def test_generation_within_budget():
+    model = create_model()
+    # `b` can repeat itself for a long time.
+    model.add_text("a " + "b " * 50 + "c . a c .")
+
+    for seed in range(50):
+        tokens = default_tokenizer(
+            model.generate_sentences(2, seed=seed, max_tokens=4).text()
+        )
+        lengths, length = [], 0
+
+        for token in tokens:
+            length += 1
+
+            if token in PUNCT_TERMINATION:
+                lengths.append(length)
+                length = 0
+
+        assert 2 == len(lengths) and 0 == length
+        assert all(length <= 4 for length in lengths)
+
+
+def test_generation_with_too_small_budget():
+    model = create_model()
+    model.add_text("a b c d .")
+
+    with pytest.raises(TokenBudgetExceeded):
+        model.generate_sentences(1, max_tokens=3).text()
+
+    assert "a b c d." == model.generate_sentences(1, max_tokens=5).text()
+
+
+def test_generation_with_terminator_in_start_state():
+    model = create_model(order=2)
+    model.add_text("a . b c . d e .")
+
+    for sentence_amount in range(1, 10):
+        text = model.generate_sentences(sentence_amount, seed=1).text()
+        assert sentence_amount == count_sentences(text), text
+
+
+def test_termination_index_is_cached():
+    model = create_model()
+    model.add_text("a b .")
+
+    index = model.transitions.analyze_termination(PUNCT_TERMINATION)
+    assert index is model.transitions.analyze_termination(PUNCT_TERMINATION)
+
+    model.add_text("c d .")
+    assert index is not model.transitions.analyze_termination(PUNCT_TERMINATION)
+    assert ("c",) in model.transitions.analyze_termination(PUNCT_TERMINATION)
+
+
+def test_frozen_generation_within_budget():
+    model = create_model()
+    model.add_text("a " + "b " * 50 + "c . a c .")
+    frozen = model.freeze()
+
+    for result in frozen.generate_sentences_many(20, 2, seed=3, max_tokens=4):
+        assert 2 == count_sentences(result.text())
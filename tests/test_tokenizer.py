@@ -1,6 +1,16 @@
 import pytest
 
-from remarkov.tokenizer import create_ngram_tokenizer, default_tokenizer
+from io import StringIO
+from remarkov.tokenizer import (
+    NO_WHITESPACE_AFTER,
+    NO_WHITESPACE_BEFORE,
+    PUNCT,
+    PUNCT_TERMINATION,
+    create_ngram_tokenizer,
+    default_tokenizer,
+    read_chunks,
+    tokenize_chunks,
+)
 
 
 def test_default_tokenizer_empty_input():
@@ -71,3 +81,50 @@ def test_ngram_tokenizer_padding():
 def test_ngram_invalid_length():
     with pytest.raises(AssertionError):
         create_ngram_tokenizer(0)
+
+
+def chunked(text: str, size: int):
+    return [text[offset : offset + size] for offset in range(0, len(text), size)]
+
+
+CHUNK_TEXT = 'Say:Hello. What??No way!\n"Avoid   this" (link it)\r\n[Footnote here] end'
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 1000])
+def test_tokenize_chunks_default(size):
+    token_stream = tokenize_chunks(chunked(CHUNK_TEXT, size))
+    assert list(default_tokenizer(CHUNK_TEXT)) == list(token_stream)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 1000])
+def test_tokenize_chunks_ngram(size):
+    tokenizer = create_ngram_tokenizer(3)
+    token_stream = tokenize_chunks(chunked(CHUNK_TEXT, size), tokenizer)
+    assert list(tokenizer(CHUNK_TEXT)) == list(token_stream)
+
+
+def test_tokenize_chunks_custom_tokenizer():
+    # tokenizers without a token boundary see the whole text.
+    token_stream = tokenize_chunks(["ab", "c", "d"], lambda text: iter([text]))
+    assert ["abcd"] == list(token_stream)
+
+
+def test_read_chunks():
+    assert ["abc", "def", "g"] == list(read_chunks(StringIO("abcdefg"), 3))
+
+
+def test_default_tokenizer_keeps_tabs():
+    token_stream = default_tokenizer("a\tb c")
+    assert ["a\tb", "c"] == list(token_stream)
+
+
+def test_default_tokenizer_is_iterator():
+    token_stream = default_tokenizer("a b")
+    assert "a" == next(token_stream)
+    assert ["b"] == list(token_stream)
+
+
+def test_punctuation_lookups():
+    assert "." in PUNCT_TERMINATION and "," not in PUNCT_TERMINATION
+    assert {"(", "["} == set(NO_WHITESPACE_AFTER)
+    assert PUNCT_TERMINATION <= NO_WHITESPACE_BEFORE <= PUNCT
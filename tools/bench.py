@@ -0,0 +1,314 @@
+#!/usr/bin/python3
+
+"""
+A benchmark suite for building, persisting and generating with remarkov. This generates a synthetic corpus,
+times each operation and prints the results as JSON to stdout.
+
+Each operation is run `--repeat` times and the fastest run is reported. Peak memory is measured in an extra run
+with `tracemalloc` so that tracing does not distort the timings. Pass a previous output to `--compare` to print
+the relative throughput of each operation to stderr.
+"""
+
+from typing import Callable, List, Optional
+
+WORDS_PER_SENTENCE = (4, 20)
+
+
+def info(msg: str):
+    import sys
+
+    print(msg, file=sys.stderr)
+
+
+def build_argument_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--words", type=int, default=200000, help="amount of words in the corpus"
+    )
+    parser.add_argument(
+        "--vocabulary", type=int, default=5000, help="amount of distinct words"
+    )
+    parser.add_argument(
+        "--order",
+        type=int,
+        nargs="+",
+        default=[1, 2],
+        help="chain orders to benchmark",
+    )
+    parser.add_argument(
+        "--generate", type=int, default=100000, help="amount of words to generate"
+    )
+    parser.add_argument(
+        "--sentences", type=int, default=2000, help="amount of sentences to generate"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="amount of runs per operation"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the corpus and generation"
+    )
+    parser.add_argument(
+        "--only", type=str, nargs="+", help="only run operations with these names"
+    )
+    parser.add_argument(
+        "--compare", type=str, help="JSON output of a previous run to compare with"
+    )
+
+    return parser
+
+
+def generate_word(rng, length: int) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+
+
+def generate_corpus(words: int, vocabulary: int, seed: int) -> str:
+    """
+    Creates `words` words of text drawn from `vocabulary` distinct words with a Zipf-like distribution.
+    Sentences are capitalized and separated by punctuation.
+    """
+
+    import random
+
+    rng = random.Random(seed)
+    dictionary = [generate_word(rng, rng.randint(1, 10)) for _ in range(vocabulary)]
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+
+    sentences, remaining = [], words
+
+    while 0 < remaining:
+        length = min(remaining, rng.randint(*WORDS_PER_SENTENCE))
+        sentence = rng.choices(dictionary, weights, k=length)
+
+        if 6 < length:
+            sentence[length // 2] += ","
+
+        sentences.append(" ".join(sentence).capitalize() + rng.choice(".!?"))
+        remaining -= length
+
+    return " ".join(sentences)
+
+
+class Benchmark:
+    """
+    A timed operation. `run` receives the result of `setup` and returns the amount of processed items.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        unit: str,
+        run: Callable,
+        setup: Callable = lambda: None,
+        order: Optional[int] = None,
+    ):
+        self.name = name
+        self.unit = unit
+        self.run = run
+        self.setup = setup
+        self.order = order
+
+    def measure(self, repeat: int) -> dict:
+        import gc
+        import time
+        import tracemalloc
+
+        seconds, items = None, 0
+
+        for _ in range(repeat):
+            data = self.setup()
+            gc.collect()
+
+            start = time.perf_counter()
+            items = self.run(data)
+            elapsed = time.perf_counter() - start
+
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+        data = self.setup()
+        gc.collect()
+
+        tracemalloc.start()
+        self.run(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "name": self.name,
+            "order": self.order,
+            "seconds": seconds,
+            "items": items,
+            "unit": self.unit,
+            "throughput": items / seconds if seconds else None,
+            "peak_bytes": peak,
+        }
+
+
+def create_benchmarks(text: str, args) -> List[Benchmark]:
+    from remarkov import create_model, parse_model
+    from remarkov.tokenizer import create_ngram_tokenizer, default_tokenizer
+
+    ngram_tokenizer = create_ngram_tokenizer(3)
+    tokens = sum(1 for _ in default_tokenizer(text))
+
+    benchmarks = [
+        Benchmark(
+            "default_tokenizer",
+            "tokens",
+            lambda _: sum(1 for _ in default_tokenizer(text)),
+        ),
+        Benchmark(
+            "ngram_tokenizer",
+            "tokens",
+            lambda _: sum(1 for _ in ngram_tokenizer(text)),
+        ),
+    ]
+
+    for order in args.order:
+        model = create_model(order=order)
+        model.add_text(text)
+
+        def add_text(empty_model):
+            empty_model.add_text(text)
+            return tokens
+
+        def to_json(version: int, model=model) -> Callable:
+            return lambda _: len(model.to_json(version=version))
+
+        def parse(version: int, raw: str) -> Callable:
+            def run(_):
+                parse_model(raw, version=version)
+                return len(raw)
+
+            return run
+
+        def generate(_, model=model):
+            result = model.generate(args.generate, seed=args.seed)
+            return sum(1 for _ in result.output_stream)
+
+        def generate_sentences(_, model=model):
+            model.generate_sentences(args.sentences, seed=args.seed).text()
+            return args.sentences
+
+        benchmarks.append(
+            Benchmark(
+                "add_text",
+                "tokens",
+                add_text,
+                setup=lambda order=order: create_model(order=order),
+                order=order,
+            )
+        )
+
+        for version in [1, 2]:
+            raw = model.to_json(version=version)
+
+            benchmarks += [
+                Benchmark(
+                    f"to_json_v{version}", "bytes", to_json(version), order=order
+                ),
+                Benchmark(
+                    f"parse_model_v{version}", "bytes", parse(version, raw), order=order
+                ),
+            ]
+
+        benchmarks += [
+            Benchmark("generate", "tokens", generate, order=order),
+            Benchmark(
+                "generate_sentences", "sentences", generate_sentences, order=order
+            ),
+        ]
+
+    if args.only:
+        benchmarks = [
+            benchmark for benchmark in benchmarks if benchmark.name in args.only
+        ]
+
+    return benchmarks
+
+
+def describe(result: dict) -> str:
+    if result["order"] is None:
+        return result["name"]
+
+    return f"{result['name']} (order {result['order']})"
+
+
+def compare(output: dict, path: str):
+    """
+    Prints the throughput of each result relative to the result with the same name and order in the file at
+    `path`.
+    """
+
+    from json import load
+
+    with open(path, "r") as fin:
+        baseline = load(fin)
+
+    if baseline["config"] != output["config"]:
+        info("The configuration differs from the baseline. Results may differ.")
+
+    previous = {
+        (result["name"], result["order"]): result for result in baseline["results"]
+    }
+
+    for result in output["results"]:
+        before = previous.get((result["name"], result["order"]))
+
+        if before is None or not before["throughput"] or not result["throughput"]:
+            continue
+
+        speedup = result["throughput"] / before["throughput"]
+        memory = result["peak_bytes"] / max(1, before["peak_bytes"])
+
+        info(f"{describe(result)}: {speedup:.2f}x throughput, {memory:.2f}x peak")
+
+
+def main():
+    import platform
+
+    from json import dumps
+    from remarkov import __version__
+
+    parser = build_argument_parser()
+    args = parser.parse_args()
+
+    text = generate_corpus(args.words, args.vocabulary, args.seed)
+    info(f"Generated a corpus of {args.words} words and {len(text)} characters.")
+
+    results = []
+
+    for benchmark in create_benchmarks(text, args):
+        result = benchmark.measure(args.repeat)
+        results.append(result)
+        info(
+            f"{describe(result)}: {result['seconds']:.4f}s, "
+            f"{result['throughput']:.0f} {result['unit']}/s, "
+            f"peak {result['peak_bytes']} bytes"
+        )
+
+    output = {
+        "config": {
+            "remarkov": __version__,
+            "python": platform.python_version(),
+            "words": args.words,
+            "vocabulary": args.vocabulary,
+            "orders": args.order,
+            "generate": args.generate,
+            "sentences": args.sentences,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    if args.compare:
+        compare(output, args.compare)
+
+    print(dumps(output, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -42,17 +42,15 @@ def download_and_save_dataset(url: str) -> str:
     return fout.name
 
 
-def generate_samples(amount: int, order: int, text: str) -> List[str]:
-    from remarkov import create_model
+def generate_samples(amount: int, order: int, model) -> List[str]:
+    chain = model.to_model(order)
 
-    model = create_model(order=order)
-    model.add_text(text)
-
-    return [model.generate_sentences().text() for _ in range(amount)]
+    return [chain.generate_sentences().text() for _ in range(amount)]
 
 
 def build_samples(path: str, max_order: int, samples_per_model: int) -> dict:
     from zipfile import ZipFile
+    from remarkov.multi import MultiOrderModel
 
     OUTPUT = {}
 
@@ -72,11 +70,15 @@ def build_samples(path: str, max_order: int, samples_per_model: int) -> dict:
             with dataset.open(dataset_file) as fin:
                 text = fin.read().decode("utf-8")
 
+            # build the chains of all orders at once instead of tokenizing the text once per order.
+            model = MultiOrderModel(max_order=max_order)
+            model.add_text(text)
+
             for order in range(1, max_order + 1):
                 info(
                     f"Generating {samples_per_model} samples using order {order} from {dataset_file}."
                 )
-                samples = generate_samples(samples_per_model, order, text)
+                samples = generate_samples(samples_per_model, order, model)
                 info(samples)
 
                 showcase_sample_data["samples"][str(order)] = samples